@@ -34,6 +34,7 @@ function errorToMessage(e: any): string {
       VALIDATION_ERROR: "请检查参数范围（prediction_length/quantiles 等）。",
       MODEL_NOT_READY: "服务依赖或模型未就绪：检查后端依赖与 CHRONOS_MODEL_PATH。",
       MODEL_LOAD_FAILED: "模型加载失败：检查模型目录是否包含 config.json/model.safetensors。",
+      SERVICE_BUSY: "服务繁忙：推理队列已满，请稍后重试（或改用 /async 异步接口）。",
     };
     const hint = code && hints[String(code)] ? `\n建议：${hints[String(code)]}` : "";
     return code ? `[${code}] ${msg}${hint}` : msg;
@@ -4,14 +4,20 @@ API 路由聚合
 对外接口（与 CDD 对齐）：
 - POST /zeroshot
 - POST /finetune
+- POST /backtest：多窗口滚动回测
+- /models/cache：微调模型内存缓存管理
+- /cache/results、/cache/series：预测结果缓存 / 序列级预测缓存的统计与清空
 """
 
 from fastapi import APIRouter
 
-from app.api.routes import finetune_forecast, zero_shot_forecast, jobs
+from app.api.routes import backtest, cache, finetune_forecast, zero_shot_forecast, jobs, models
 
 api_router = APIRouter()
 
 api_router.include_router(zero_shot_forecast.router, prefix="/zeroshot")
 api_router.include_router(finetune_forecast.router, prefix="/finetune")
+api_router.include_router(backtest.router, prefix="/backtest")
 api_router.include_router(jobs.router, prefix="/jobs")
+api_router.include_router(models.router, prefix="/models")
+api_router.include_router(cache.router, prefix="/cache")
@@ -0,0 +1,147 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import File, Query, UploadFile
+
+from app.services.forecast_metrics import validate_metrics_mode
+from app.services.forecast_output import validate_output_format
+from app.services.table_parser import detect_upload_format
+
+
+# 预测路由（同步 / 流式 / 异步入口与回测）共用的参数声明：用 Depends() 注入，避免各入口的参数与说明逐渐不一致
+
+
+class UploadParams:
+    """
+    上传文件部分与表格输入的列声明。
+    """
+
+    def __init__(
+        self,
+        file: UploadFile = File(
+            ..., description="输入文件：Markdown（包含 ```json ... ``` 输入）或 history_data 表（.parquet / .arrow / .csv）"
+        ),
+        test_file: Optional[UploadFile] = File(
+            default=None, description="可选：test_data 表（仅表格输入；/backtest 中拼接到 history_data 之后参与回测）"
+        ),
+        covariates_file: Optional[UploadFile] = File(default=None, description="可选：covariates 表（仅表格输入）"),
+        known_covariates_names: Optional[List[str]] = Query(
+            default=None, description="表格输入的已知协变量列（Markdown 输入写在 JSON 中）"
+        ),
+        category_cov_name: Optional[List[str]] = Query(
+            default=None, description="表格输入的类别型协变量列（Markdown 输入写在 JSON 中）"
+        ),
+    ) -> None:
+        self.file = file
+        self.test_file = test_file
+        self.covariates_file = covariates_file
+        self.known_covariates_names = known_covariates_names
+        self.category_cov_name = category_cov_name
+
+    @property
+    def input_format(self) -> str:
+        return detect_upload_format(self.file.filename)
+
+    def kwargs(self) -> Dict[str, Any]:
+        """
+        -> *_from_upload 的输入参数（格式按文件扩展名识别；内容为上传文件流）。
+        """
+        return {
+            "input_format": self.input_format,
+            "test_content": self.test_file.file if self.test_file is not None else None,
+            "test_format": (
+                detect_upload_format(self.test_file.filename, where="test_file") if self.test_file is not None else None
+            ),
+            "covariates_content": self.covariates_file.file if self.covariates_file is not None else None,
+            "covariates_format": (
+                detect_upload_format(self.covariates_file.filename, where="covariates_file")
+                if self.covariates_file is not None
+                else None
+            ),
+            "known_covariates_names": self.known_covariates_names,
+            "category_cov_name": self.category_cov_name,
+        }
+
+    async def read_kwargs(self) -> Dict[str, Any]:
+        """
+        与 kwargs 相同，但各文件部分整体读入字节（异步任务的参数会持久化以便重启后重放）。
+        """
+        out = self.kwargs()
+        if self.test_file is not None:
+            out["test_content"] = await self.test_file.read()
+        if self.covariates_file is not None:
+            out["covariates_content"] = await self.covariates_file.read()
+        return out
+
+
+class ForecastParams:
+    """
+    zero-shot 与微调预测共用的预测参数。
+    """
+
+    def __init__(
+        self,
+        prediction_length: int = Query(..., gt=0, description="预测步长"),
+        quantiles: List[float] = Query(default=[0.1, 0.5, 0.9], description="输出分位数"),
+        metrics: List[str] = Query(
+            default=["WQL", "WAPE"], description="评估指标（可选：WQL,WAPE,MASE,COVERAGE,IC,IR）"
+        ),
+        freq: Optional[str] = Query(default=None, description="时间频率（如 D/H/W/M；不填则尝试推断）"),
+        with_cov: bool = Query(default=False, description="是否使用协变量（covariates + known_covariates_names）"),
+    ) -> None:
+        self.prediction_length = prediction_length
+        self.quantiles = quantiles
+        self.metrics = metrics
+        self.freq = freq
+        self.with_cov = with_cov
+
+    def kwargs(self) -> Dict[str, Any]:
+        return {
+            "prediction_length": self.prediction_length,
+            "quantiles": self.quantiles,
+            "metrics": self.metrics,
+            "with_cov": self.with_cov,
+            "freq": self.freq,
+        }
+
+
+def output_format_param(
+    output_format: str = Query(
+        default="records",
+        alias="format",
+        description="predictions 格式：records（逐行记录，默认）/ columnar（每个 item_id 一个对象 + 并列数组）",
+    ),
+) -> str:
+    return validate_output_format(output_format)
+
+
+def metrics_mode_param(
+    metrics_mode: str = Query(
+        default="inline",
+        description=(
+            "指标计算方式：inline（随预测一起返回，默认）/ deferred（预测先返回，指标在任务队列中计算，"
+            "metrics 为任务句柄，结果见 /jobs/{job_id}）"
+        ),
+    ),
+) -> str:
+    return validate_metrics_mode(metrics_mode)
+
+
+class JobParams:
+    """
+    异步任务入口的调度参数。
+    """
+
+    def __init__(
+        self,
+        priority: Optional[str] = Query(
+            default=None, description="任务优先级（interactive / batch；默认 zeroshot 为 interactive，finetune 为 batch）"
+        ),
+        timeout_seconds: Optional[float] = Query(
+            default=None, gt=0, description="任务超时（秒；不填使用服务端默认值，且不能超过服务端上限）"
+        ),
+    ) -> None:
+        self.priority = priority
+        self.timeout_seconds = timeout_seconds
+
+    def kwargs(self) -> Dict[str, Any]:
+        return {"priority": self.priority, "timeout_seconds": self.timeout_seconds}
@@ -0,0 +1,61 @@
+import logging
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, status
+
+from app.api.routes._common import UploadParams
+from app.core.exceptions import DataException, ErrorCode, ModelException, ServiceBusyException
+from app.services.backtest import backtest_from_upload
+from app.services.inference_executor import inference_executor
+from app.services.response_codec import json_response
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Backtest"])
+
+
+@router.post("/")
+async def backtest(
+    request: Request,
+    upload: UploadParams = Depends(),
+    prediction_length: int = Query(..., gt=0, description="每个回测窗口的预测步长"),
+    num_windows: int = Query(default=3, gt=0, description="回测窗口数（不超过服务端上限 BACKTEST_MAX_WINDOWS）"),
+    step: Optional[int] = Query(default=None, gt=0, description="相邻窗口起点的间隔步数（默认等于 prediction_length）"),
+    quantiles: List[float] = Query(default=[0.1, 0.5, 0.9], description="输出分位数"),
+    metrics: List[str] = Query(default=["WQL", "WAPE"], description="评估指标（可选：WQL,WAPE,MASE,COVERAGE）"),
+    freq: Optional[str] = Query(default=None, description="时间频率（如 D/H/W/M；不填则尝试推断）"),
+    with_cov: bool = Query(default=False, description="是否使用协变量（各窗口的已知协变量取自 history_data）"),
+    context_length: int = Query(default=512, gt=0, description="上下文长度（zero-shot 回测，用于比较不同上下文长度）"),
+    model_id: Optional[str] = Query(default=None, description="已有微调模型 ID（不填则使用 zero-shot 常驻引擎）"),
+) -> Any:
+    """
+    多窗口滚动回测：全部窗口的上下文合并为一次批量推理，返回逐窗口指标（windows）与各窗口平均（aggregate）。
+    """
+    upload_kwargs = upload.kwargs()
+    try:
+        result = await inference_executor.run(
+            backtest_from_upload,
+            upload.file.file,
+            **upload_kwargs,
+            prediction_length=prediction_length,
+            num_windows=num_windows,
+            step=step,
+            quantiles=quantiles,
+            metrics=metrics,
+            with_cov=with_cov,
+            freq=freq,
+            context_length=context_length,
+            model_id=model_id,
+        )
+        return await json_response(request, result)
+    except (DataException, ModelException, ServiceBusyException):
+        raise
+    except Exception as exc:
+        logger.exception("回测失败")
+        raise ModelException(
+            error_code=ErrorCode.MODEL_PREDICT_FAILED,
+            message="回测失败",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            details={"reason": str(exc)},
+        ) from exc
@@ -0,0 +1,41 @@
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.services.result_cache import forecast_result_cache
+from app.services.series_cache import series_forecast_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Cache"])
+
+
+@router.get("/results")
+async def get_result_cache() -> Dict[str, Any]:
+    """
+    查看预测结果缓存（条目数、内存占用、命中 / 未命中次数）。
+    """
+    return forecast_result_cache.stats()
+
+
+@router.delete("/results")
+async def clear_result_cache() -> Dict[str, Any]:
+    removed = forecast_result_cache.clear()
+    logger.info("预测结果缓存已清空: removed=%d", removed)
+    return {"removed": removed}
+
+
+@router.get("/series")
+async def get_series_cache() -> Dict[str, Any]:
+    """
+    查看 zero-shot 序列级预测缓存（条目数、内存占用、按序列计的命中 / 未命中次数）。
+    """
+    return series_forecast_cache.stats()
+
+
+@router.delete("/series")
+async def clear_series_cache() -> Dict[str, Any]:
+    removed = series_forecast_cache.clear()
+    logger.info("序列级预测缓存已清空: removed=%d", removed)
+    return {"removed": removed}
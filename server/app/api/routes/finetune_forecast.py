@@ -1,60 +1,97 @@
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, File, Query, UploadFile, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
 
-from app.core.exceptions import DataException, ErrorCode, ModelException
+from app.api.routes._common import (
+    ForecastParams,
+    JobParams,
+    UploadParams,
+    metrics_mode_param,
+    output_format_param,
+)
+from app.core.exceptions import DataException, ErrorCode, ModelException, ServiceBusyException
 from app.models.finetune_models import FineTuneResponse
-from app.services.finetune_forecast import finetune_forecast_from_markdown_bytes
+from app.services.finetune_forecast import finetune_forecast_from_upload
+from app.services.inference_executor import inference_executor
 from app.services.job_queue import job_queue, job_record_to_dict
+from app.services.forecast_metrics import attach_deferred_metrics
+from app.services.forecast_output import FRAME_FORMAT
+from app.services.forecast_stream import NDJSON_MEDIA_TYPE, open_forecast_stream
+from app.services.response_codec import RESULT_MEDIA_TYPES, forecast_response, negotiate_result_format
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Finetune Forecast"])
 
+# 重启后按 kind 找回执行函数，恢复未完成的异步任务
+job_queue.register_handler("finetune", finetune_forecast_from_upload)
+
+
+class FinetuneParams:
+    """
+    微调与模型参数（同步、流式与异步入口共用）。
+    """
+
+    def __init__(
+        self,
+        finetune_num_steps: int = Query(default=1000, gt=0, description="微调步数"),
+        finetune_learning_rate: float = Query(default=1e-4, gt=0, description="微调学习率"),
+        finetune_batch_size: int = Query(default=32, gt=0, description="微调 batch size"),
+        context_length: int = Query(default=512, gt=0, description="上下文长度（默认 512，会自动按最短序列长度截断）"),
+        save_model: bool = Query(default=True, description="是否保存微调模型并返回 model_id"),
+        model_id: Optional[str] = Query(default=None, description="已有微调模型 ID（传入则直接加载预测）"),
+    ) -> None:
+        self.finetune_num_steps = finetune_num_steps
+        self.finetune_learning_rate = finetune_learning_rate
+        self.finetune_batch_size = finetune_batch_size
+        self.context_length = context_length
+        self.save_model = save_model
+        self.model_id = model_id
+
+    def kwargs(self) -> Dict[str, Any]:
+        return {
+            "finetune_num_steps": self.finetune_num_steps,
+            "finetune_learning_rate": self.finetune_learning_rate,
+            "finetune_batch_size": self.finetune_batch_size,
+            "context_length": self.context_length,
+            "save_model": self.save_model,
+            "model_id": self.model_id,
+        }
+
 
 @router.post("/", response_model=FineTuneResponse)
 async def finetune_forecast(
-    file: UploadFile = File(..., description="Markdown 文件（包含 ```json ... ``` 输入）"),
-    prediction_length: int = Query(..., gt=0, description="预测步长"),
-    quantiles: List[float] = Query(default=[0.1, 0.5, 0.9], description="输出分位数"),
-    metrics: List[str] = Query(default=["WQL", "WAPE"], description="评估指标（可选：WQL,WAPE,IC,IR）"),
-    freq: Optional[str] = Query(default=None, description="时间频率（如 D/H/W/M；不填则尝试推断）"),
-    with_cov: bool = Query(default=False, description="是否使用协变量（covariates + known_covariates_names）"),
-    finetune_num_steps: int = Query(default=1000, gt=0, description="微调步数"),
-    finetune_learning_rate: float = Query(default=1e-4, gt=0, description="微调学习率"),
-    finetune_batch_size: int = Query(default=32, gt=0, description="微调 batch size"),
-    context_length: int = Query(default=512, gt=0, description="上下文长度（默认 512，会自动按最短序列长度截断）"),
-    save_model: bool = Query(default=True, description="是否保存微调模型并返回 model_id"),
-    model_id: Optional[str] = Query(default=None, description="已有微调模型 ID（传入则直接加载预测）"),
-) -> Dict[str, Any]:
-    if not file.filename.lower().endswith(".md"):
-        raise DataException(
-            error_code=ErrorCode.VALIDATION_ERROR,
-            message="仅支持上传 .md Markdown 文件",
-            status_code=status.HTTP_400_BAD_REQUEST,
-            details={"filename": file.filename},
-        )
+    request: Request,
+    upload: UploadParams = Depends(),
+    forecast: ForecastParams = Depends(),
+    finetune: FinetuneParams = Depends(),
+    output_format: str = Depends(output_format_param),
+    metrics_mode: str = Depends(metrics_mode_param),
+) -> Any:
+    upload_kwargs = upload.kwargs()
+    # Accept 为 Arrow / Parquet 时 predictions 保留为 DataFrame，直接编码为二进制表（format 参数不再生效）
+    result_format = negotiate_result_format(request.headers.get("accept"))
+    if result_format in RESULT_MEDIA_TYPES:
+        output_format = FRAME_FORMAT
 
-    content = await file.read()
     try:
-        result = finetune_forecast_from_markdown_bytes(
-            content,
-            prediction_length=prediction_length,
-            quantiles=quantiles,
-            metrics=metrics,
-            with_cov=with_cov,
-            freq=freq,
-            finetune_num_steps=finetune_num_steps,
-            finetune_learning_rate=finetune_learning_rate,
-            finetune_batch_size=finetune_batch_size,
-            context_length=context_length,
-            save_model=save_model,
-            model_id=model_id,
+        # 推理在独立的有界线程池中执行，不阻塞事件循环；队列满时抛出 ServiceBusyException（503）
+        # 直接从上传文件流解析（Markdown 增量解析），避免整份输入在内存中保留多份副本
+        result = await inference_executor.run(
+            finetune_forecast_from_upload,
+            upload.file.file,
+            **upload_kwargs,
+            **forecast.kwargs(),
+            **finetune.kwargs(),
+            output_format=output_format,
+            metrics_mode=metrics_mode,
         )
-        return result
-    except (DataException, ModelException):
+        attach_deferred_metrics(result, source="finetune")
+        return await forecast_response(request, result, result_format=result_format)
+    except (DataException, ModelException, ServiceBusyException):
         raise
     except Exception as exc:
         logger.exception("finetune 预测失败")
@@ -66,52 +103,55 @@ async def finetune_forecast(
         ) from exc
 
 
+@router.post("/stream", response_class=StreamingResponse)
+async def finetune_forecast_stream(
+    upload: UploadParams = Depends(),
+    forecast: ForecastParams = Depends(),
+    finetune: FinetuneParams = Depends(),
+) -> StreamingResponse:
+    """
+    NDJSON 流式返回，行格式同 /zeroshot/stream；model_id 等字段在最后的 metrics 行中。
+    """
+    upload_kwargs = upload.kwargs()
+    lines = await open_forecast_stream(
+        finetune_forecast_from_upload,
+        upload.file.file,
+        **upload_kwargs,
+        **forecast.kwargs(),
+        **finetune.kwargs(),
+    )
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.post("/async")
 async def finetune_forecast_async(
-    file: UploadFile = File(..., description="Markdown 文件（包含 ```json ... ``` 输入）"),
-    prediction_length: int = Query(..., gt=0, description="预测步长"),
-    quantiles: List[float] = Query(default=[0.1, 0.5, 0.9], description="输出分位数"),
-    metrics: List[str] = Query(default=["WQL", "WAPE"], description="评估指标（可选：WQL,WAPE,IC,IR）"),
-    freq: Optional[str] = Query(default=None, description="时间频率（如 D/H/W/M；不填则尝试推断）"),
-    with_cov: bool = Query(default=False, description="是否使用协变量（covariates + known_covariates_names）"),
-    finetune_num_steps: int = Query(default=1000, gt=0, description="微调步数"),
-    finetune_learning_rate: float = Query(default=1e-4, gt=0, description="微调学习率"),
-    finetune_batch_size: int = Query(default=32, gt=0, description="微调 batch size"),
-    context_length: int = Query(default=512, gt=0, description="上下文长度（默认 512，会自动按最短序列长度截断）"),
-    save_model: bool = Query(default=True, description="是否保存微调模型并返回 model_id"),
-    model_id: Optional[str] = Query(default=None, description="已有微调模型 ID（传入则直接加载预测）"),
+    upload: UploadParams = Depends(),
+    forecast: ForecastParams = Depends(),
+    finetune: FinetuneParams = Depends(),
+    output_format: str = Depends(output_format_param),
+    job: JobParams = Depends(),
 ) -> Dict[str, Any]:
-    if not file.filename.lower().endswith(".md"):
-        raise DataException(
-            error_code=ErrorCode.VALIDATION_ERROR,
-            message="仅支持上传 .md Markdown 文件",
-            status_code=status.HTTP_400_BAD_REQUEST,
-            details={"filename": file.filename},
-        )
-
-    content = await file.read()
+    # 异步任务的参数会持久化以便重启后重放，这里整体读入字节
+    upload_kwargs = await upload.read_kwargs()
+    content = await upload.file.read()
     record = job_queue.submit(
         "finetune",
-        finetune_forecast_from_markdown_bytes,
+        finetune_forecast_from_upload,
         content,
-        prediction_length=prediction_length,
-        quantiles=quantiles,
-        metrics=metrics,
-        with_cov=with_cov,
-        freq=freq,
-        finetune_num_steps=finetune_num_steps,
-        finetune_learning_rate=finetune_learning_rate,
-        finetune_batch_size=finetune_batch_size,
-        context_length=context_length,
-        save_model=save_model,
-        model_id=model_id,
+        **upload_kwargs,
+        **forecast.kwargs(),
+        **finetune.kwargs(),
+        output_format=output_format,
+        **job.kwargs(),
         params={
-            "prediction_length": prediction_length,
-            "with_cov": with_cov,
-            "quantiles": quantiles,
-            "metrics": metrics,
-            "save_model": save_model,
-            "model_id": model_id,
+            "prediction_length": forecast.prediction_length,
+            "with_cov": forecast.with_cov,
+            "input_format": upload_kwargs["input_format"],
+            "quantiles": forecast.quantiles,
+            "metrics": forecast.metrics,
+            "save_model": finetune.save_model,
+            "model_id": finetune.model_id,
+            "format": output_format,
         },
     )
     result = job_record_to_dict(record)
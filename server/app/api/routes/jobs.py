@@ -1,19 +1,44 @@
 import logging
 from typing import Any, Dict
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Request, status
 
 from app.core.exceptions import DataException, ErrorCode
 from app.services.job_queue import job_queue, job_record_to_dict
+from app.services.response_codec import job_response
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Jobs"])
 
 
+@router.get("/stats")
+async def get_job_stats() -> Dict[str, Any]:
+    """
+    查看任务队列状态：worker 数、各类型并发上限、排队 / 运行中的任务数以及存储中按状态的任务数。
+    """
+    return await job_queue.stats_async()
+
+
 @router.get("/{job_id}")
-async def get_job(job_id: str) -> Dict[str, Any]:
-    record = job_queue.get(job_id)
+async def get_job(job_id: str, request: Request) -> Any:
+    """
+    查询任务状态；已成功的任务可通过 Accept 请求 Arrow / Parquet 结果，Accept-Encoding 请求压缩 JSON。
+    """
+    record = await job_queue.get_async(job_id)
+    if record is None:
+        raise DataException(
+            error_code=ErrorCode.NOT_FOUND,
+            message="未找到对应的任务",
+            status_code=status.HTTP_404_NOT_FOUND,
+            details={"job_id": job_id},
+        )
+    return await job_response(request, job_record_to_dict(record))
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    record = await job_queue.cancel_async(job_id)
     if record is None:
         raise DataException(
             error_code=ErrorCode.NOT_FOUND,
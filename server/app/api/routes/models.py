@@ -0,0 +1,41 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.services.model_cache import predictor_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Models"])
+
+
+@router.get("/cache")
+async def get_model_cache() -> Dict[str, Any]:
+    """
+    查看当前常驻内存的微调模型（含估算内存占用、命中次数、pin 状态）。
+    """
+    return predictor_cache.stats()
+
+
+@router.post("/cache/{model_id}/pin")
+async def pin_model(model_id: str) -> Dict[str, Any]:
+    """
+    pin 热点模型：未加载时立即加载，并且不参与 LRU 淘汰。
+    """
+    entry = await asyncio.to_thread(predictor_cache.pin, model_id)
+    logger.info("微调模型已 pin: model_id=%s", model_id)
+    return {"model_id": model_id, "pinned": True, "size_bytes": entry.size_bytes}
+
+
+@router.delete("/cache/{model_id}/pin")
+async def unpin_model(model_id: str) -> Dict[str, Any]:
+    was_pinned = predictor_cache.unpin(model_id)
+    return {"model_id": model_id, "pinned": False, "was_pinned": was_pinned}
+
+
+@router.delete("/cache/{model_id}")
+async def evict_model(model_id: str) -> Dict[str, Any]:
+    evicted = predictor_cache.invalidate(model_id)
+    return {"model_id": model_id, "evicted": evicted}
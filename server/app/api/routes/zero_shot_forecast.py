@@ -1,50 +1,75 @@
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict
 
-from fastapi import APIRouter, File, Query, UploadFile, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
 
-from app.core.exceptions import DataException, ErrorCode, ModelException
+from app.api.routes._common import (
+    ForecastParams,
+    JobParams,
+    UploadParams,
+    metrics_mode_param,
+    output_format_param,
+)
+from app.core.exceptions import DataException, ErrorCode, ModelException, ServiceBusyException
 from app.models.zero_shot_models import ForecastResponse
-from app.services.zero_shot_forecast import zeroshot_forecast_from_markdown_bytes
+from app.services.zero_shot_forecast import zeroshot_forecast_from_upload
+from app.services.inference_executor import inference_executor
 from app.services.job_queue import job_queue, job_record_to_dict
+from app.services.forecast_metrics import attach_deferred_metrics
+from app.services.forecast_output import FRAME_FORMAT
+from app.services.forecast_stream import NDJSON_MEDIA_TYPE, open_forecast_stream
+from app.services.response_codec import RESULT_MEDIA_TYPES, forecast_response, negotiate_result_format
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Zero-shot Forecast"])
 
+# 重启后按 kind 找回执行函数，恢复未完成的异步任务
+job_queue.register_handler("zeroshot", zeroshot_forecast_from_upload)
+
+
+def context_length_param(
+    context_length: int = Query(
+        default=512,
+        gt=0,
+        description="上下文长度（默认 512；每条序列取最后 context_length 个点，AutoGluon 回退路径会按最短序列长度截断）",
+    ),
+) -> int:
+    return context_length
+
 
 @router.post("/", response_model=ForecastResponse)
 async def zeroshot_forecast(
-    file: UploadFile = File(..., description="Markdown 文件（包含 ```json ... ``` 输入）"),
-    prediction_length: int = Query(..., gt=0, description="预测步长"),
-    quantiles: List[float] = Query(default=[0.1, 0.5, 0.9], description="输出分位数"),
-    metrics: List[str] = Query(default=["WQL", "WAPE"], description="评估指标（可选：WQL,WAPE,IC,IR）"),
-    freq: Optional[str] = Query(default=None, description="时间频率（如 D/H/W/M；不填则尝试推断）"),
-    with_cov: bool = Query(default=False, description="是否使用协变量（covariates + known_covariates_names）"),
-    context_length: int = Query(default=512, gt=0, description="上下文长度（默认 512，会自动按最短序列长度截断）"),
-) -> Dict[str, Any]:
-    if not file.filename.lower().endswith(".md"):
-        raise DataException(
-            error_code=ErrorCode.VALIDATION_ERROR,
-            message="仅支持上传 .md Markdown 文件",
-            status_code=status.HTTP_400_BAD_REQUEST,
-            details={"filename": file.filename},
-        )
+    request: Request,
+    upload: UploadParams = Depends(),
+    forecast: ForecastParams = Depends(),
+    context_length: int = Depends(context_length_param),
+    output_format: str = Depends(output_format_param),
+    metrics_mode: str = Depends(metrics_mode_param),
+) -> Any:
+    upload_kwargs = upload.kwargs()
+    # Accept 为 Arrow / Parquet 时 predictions 保留为 DataFrame，直接编码为二进制表（format 参数不再生效）
+    result_format = negotiate_result_format(request.headers.get("accept"))
+    if result_format in RESULT_MEDIA_TYPES:
+        output_format = FRAME_FORMAT
 
-    content = await file.read()
     try:
-        result = zeroshot_forecast_from_markdown_bytes(
-            content,
-            prediction_length=prediction_length,
-            quantiles=quantiles,
-            metrics=metrics,
-            with_cov=with_cov,
-            freq=freq,
+        # 推理在独立的有界线程池中执行，不阻塞事件循环；队列满时抛出 ServiceBusyException（503）
+        # 直接从上传文件流解析（Markdown 增量解析），避免整份输入在内存中保留多份副本
+        result = await inference_executor.run(
+            zeroshot_forecast_from_upload,
+            upload.file.file,
+            **upload_kwargs,
+            **forecast.kwargs(),
             context_length=context_length,
+            output_format=output_format,
+            metrics_mode=metrics_mode,
         )
-        return result
-    except (DataException, ModelException):
+        attach_deferred_metrics(result, source="zeroshot")
+        return await forecast_response(request, result, result_format=result_format)
+    except (DataException, ModelException, ServiceBusyException):
         raise
     except Exception as exc:
         logger.exception("zeroshot 预测失败")
@@ -56,40 +81,54 @@ async def zeroshot_forecast(
         ) from exc
 
 
+@router.post("/stream", response_class=StreamingResponse)
+async def zeroshot_forecast_stream(
+    upload: UploadParams = Depends(),
+    forecast: ForecastParams = Depends(),
+    context_length: int = Depends(context_length_param),
+) -> StreamingResponse:
+    """
+    NDJSON 流式返回：每个 item_id 一行 `{"type": "prediction", ...}`（字段同 format=columnar），
+    最后一行 `{"type": "metrics", ...}` 为指标与其余结果字段；预测发出后的失败以 `{"type": "error", ...}` 结尾。
+    """
+    upload_kwargs = upload.kwargs()
+    lines = await open_forecast_stream(
+        zeroshot_forecast_from_upload,
+        upload.file.file,
+        **upload_kwargs,
+        **forecast.kwargs(),
+        context_length=context_length,
+    )
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+
 @router.post("/async")
 async def zeroshot_forecast_async(
-    file: UploadFile = File(..., description="Markdown 文件（包含 ```json ... ``` 输入）"),
-    prediction_length: int = Query(..., gt=0, description="预测步长"),
-    quantiles: List[float] = Query(default=[0.1, 0.5, 0.9], description="输出分位数"),
-    metrics: List[str] = Query(default=["WQL", "WAPE"], description="评估指标（可选：WQL,WAPE,IC,IR）"),
-    freq: Optional[str] = Query(default=None, description="时间频率（如 D/H/W/M；不填则尝试推断）"),
-    with_cov: bool = Query(default=False, description="是否使用协变量（covariates + known_covariates_names）"),
-    context_length: int = Query(default=512, gt=0, description="上下文长度（默认 512，会自动按最短序列长度截断）"),
+    upload: UploadParams = Depends(),
+    forecast: ForecastParams = Depends(),
+    context_length: int = Depends(context_length_param),
+    output_format: str = Depends(output_format_param),
+    job: JobParams = Depends(),
 ) -> Dict[str, Any]:
-    if not file.filename.lower().endswith(".md"):
-        raise DataException(
-            error_code=ErrorCode.VALIDATION_ERROR,
-            message="仅支持上传 .md Markdown 文件",
-            status_code=status.HTTP_400_BAD_REQUEST,
-            details={"filename": file.filename},
-        )
-
-    content = await file.read()
+    # 异步任务的参数会持久化以便重启后重放，这里整体读入字节
+    upload_kwargs = await upload.read_kwargs()
+    content = await upload.file.read()
     record = job_queue.submit(
         "zeroshot",
-        zeroshot_forecast_from_markdown_bytes,
+        zeroshot_forecast_from_upload,
         content,
-        prediction_length=prediction_length,
-        quantiles=quantiles,
-        metrics=metrics,
-        with_cov=with_cov,
-        freq=freq,
+        **upload_kwargs,
+        **forecast.kwargs(),
         context_length=context_length,
+        output_format=output_format,
+        **job.kwargs(),
         params={
-            "prediction_length": prediction_length,
-            "with_cov": with_cov,
-            "quantiles": quantiles,
-            "metrics": metrics,
+            "prediction_length": forecast.prediction_length,
+            "with_cov": forecast.with_cov,
+            "input_format": upload_kwargs["input_format"],
+            "quantiles": forecast.quantiles,
+            "metrics": forecast.metrics,
+            "format": output_format,
         },
     )
     result = job_record_to_dict(record)
@@ -67,6 +67,97 @@ class Settings:
         os.getenv("FINETUNED_MODEL_CLEANUP_INTERVAL_HOURS", "24")
     )
 
+    # ========= 常驻 Zero-shot 引擎 =========
+    # 开启后 zero-shot 直接复用进程内已加载的 Chronos-2 pipeline（不再每次 fit），失败时回退 AutoGluon 路径
+    ZEROSHOT_RESIDENT_ENGINE: bool = os.getenv("ZEROSHOT_RESIDENT_ENGINE", "true").lower() == "true"
+
+    # 是否在应用启动时预加载权重（否则在首个 zero-shot 请求时加载）
+    ZEROSHOT_PRELOAD: bool = os.getenv("ZEROSHOT_PRELOAD", "false").lower() == "true"
+
+    # 单次 predict 的 batch size（按序列条数）
+    ZEROSHOT_BATCH_SIZE: int = int(os.getenv("ZEROSHOT_BATCH_SIZE", "256"))
+
+    # 跨请求微批（可选）：在窗口期内合并参数兼容的 zero-shot 请求为一次 predict
+    ZEROSHOT_MICRO_BATCH_ENABLED: bool = os.getenv("ZEROSHOT_MICRO_BATCH_ENABLED", "false").lower() == "true"
+    ZEROSHOT_MICRO_BATCH_WINDOW_MS: int = int(os.getenv("ZEROSHOT_MICRO_BATCH_WINDOW_MS", "20"))
+    # 单个微批的序列数上限，达到后立即执行，不再等待窗口结束
+    ZEROSHOT_MICRO_BATCH_MAX_SERIES: int = int(os.getenv("ZEROSHOT_MICRO_BATCH_MAX_SERIES", "1024"))
+
+    # ========= 微调模型内存缓存（按 model_id 的 LRU） =========
+    # 已加载 predictor 的内存预算（按模型目录大小估算）与条目上限；任一为 0 表示关闭缓存（pin 的模型仍常驻）
+    FINETUNED_MODEL_CACHE_MAX_MB: int = int(os.getenv("FINETUNED_MODEL_CACHE_MAX_MB", "4096"))
+    FINETUNED_MODEL_CACHE_MAX_ENTRIES: int = int(os.getenv("FINETUNED_MODEL_CACHE_MAX_ENTRIES", "32"))
+
+    # ========= 预测结果缓存（按输入与参数哈希） =========
+    # 相同数据 + 相同参数的重复请求直接返回缓存结果（响应中 cached=true）；TTL 为 0 或内存 / 磁盘层均未启用时关闭
+    RESULT_CACHE_TTL_SECONDS: float = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+    # 内存层（LRU）：预测 DataFrame 的内存预算与条目上限，任一为 0 表示不使用内存层
+    RESULT_CACHE_MAX_MB: int = int(os.getenv("RESULT_CACHE_MAX_MB", "256"))
+    RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+    # 磁盘层（可选）：置空不启用；超出容量上限（MB，0 表示不限制）时删除最旧的条目
+    RESULT_CACHE_DIR: str = os.getenv("RESULT_CACHE_DIR", "")
+    RESULT_CACHE_DISK_MAX_MB: int = int(os.getenv("RESULT_CACHE_DISK_MAX_MB", "2048"))
+
+    # ========= zero-shot 序列级预测缓存 =========
+    # 按单条序列的上下文窗口 + 已知协变量 + 预测参数缓存常驻引擎的预测，请求中只有变化的序列重新推理；任一为 0 表示关闭
+    SERIES_CACHE_MAX_MB: int = int(os.getenv("SERIES_CACHE_MAX_MB", "512"))
+    SERIES_CACHE_MAX_ENTRIES: int = int(os.getenv("SERIES_CACHE_MAX_ENTRIES", "500000"))
+    SERIES_CACHE_TTL_SECONDS: float = float(os.getenv("SERIES_CACHE_TTL_SECONDS", "172800"))
+
+    # ========= 同步推理执行器（/zeroshot、/finetune、MCP 工具） =========
+    # 推理在独立线程池中执行，避免阻塞事件循环；超过「并发 + 等待队列」上限时直接返回 503 + Retry-After
+    INFERENCE_MAX_CONCURRENCY: int = int(os.getenv("INFERENCE_MAX_CONCURRENCY", "2"))
+    INFERENCE_MAX_QUEUE: int = int(os.getenv("INFERENCE_MAX_QUEUE", "8"))
+    INFERENCE_RETRY_AFTER_SECONDS: int = int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "5"))
+
+    # ========= 异步任务队列（/zeroshot/async、/finetune/async） =========
+    # worker 总数；每种任务类型再单独限制并发，避免长时间微调占满全部 worker
+    JOB_QUEUE_WORKERS: int = int(os.getenv("JOB_QUEUE_WORKERS", "4"))
+    JOB_CONCURRENCY_ZEROSHOT: int = int(os.getenv("JOB_CONCURRENCY_ZEROSHOT", "3"))
+    JOB_CONCURRENCY_FINETUNE: int = int(os.getenv("JOB_CONCURRENCY_FINETUNE", "1"))
+    # metrics_mode=deferred 时推迟计算的指标任务（临时任务，不随重启恢复）
+    JOB_CONCURRENCY_METRICS: int = int(os.getenv("JOB_CONCURRENCY_METRICS", "2"))
+    # 优先级老化：batch 任务每等待该秒数，有效优先级提升一个通道（防止被 interactive 任务饿死）
+    JOB_PRIORITY_AGING_SECONDS: float = float(os.getenv("JOB_PRIORITY_AGING_SECONDS", "60"))
+    # 单个任务的墙钟超时（秒，0 表示不限制）：超时后在下一个检查点停止（微调按 step 检查）
+    JOB_TIMEOUT_SECONDS_ZEROSHOT: float = float(os.getenv("JOB_TIMEOUT_SECONDS_ZEROSHOT", "600"))
+    JOB_TIMEOUT_SECONDS_FINETUNE: float = float(os.getenv("JOB_TIMEOUT_SECONDS_FINETUNE", "3600"))
+    JOB_TIMEOUT_SECONDS_METRICS: float = float(os.getenv("JOB_TIMEOUT_SECONDS_METRICS", "600"))
+    # 执行后端：thread（默认，API 进程内线程）/ process（独立工作进程，训练不占用 API 进程的 GIL 与内存）
+    JOB_EXECUTION_BACKEND: str = os.getenv("JOB_EXECUTION_BACKEND", "thread").lower()
+    # process 后端下走工作进程的任务类型（逗号分隔，默认 finetune；可选 zeroshot，其他类型告警后仍在线程中执行）
+    JOB_PROCESS_KINDS: list[str] = [
+        k.strip() for k in os.getenv("JOB_PROCESS_KINDS", "finetune").split(",") if k.strip()
+    ]
+    JOB_PROCESS_WORKERS: int = int(os.getenv("JOB_PROCESS_WORKERS", "2"))
+    # 工作进程回收：执行满 N 个任务或 RSS 超过阈值（MB）后退出并按需重新拉起（0 表示不限制）
+    JOB_PROCESS_MAX_JOBS_PER_WORKER: int = int(os.getenv("JOB_PROCESS_MAX_JOBS_PER_WORKER", "10"))
+    JOB_PROCESS_MAX_RSS_MB: int = int(os.getenv("JOB_PROCESS_MAX_RSS_MB", "8192"))
+    # 任务持久化（SQLite）：置空则只保存在内存中（重启丢失）
+    JOB_STORE_PATH: str = os.getenv(
+        "JOB_STORE_PATH",
+        str(_server_dir / "app" / "models" / "model_save" / "job_store" / "jobs.sqlite3"),
+    )
+    # 已结束任务的保留时长（小时，0 表示不清理）与清理周期（分钟）
+    JOB_RESULT_TTL_HOURS: float = float(os.getenv("JOB_RESULT_TTL_HOURS", "24"))
+    JOB_PURGE_INTERVAL_MINUTES: float = float(os.getenv("JOB_PURGE_INTERVAL_MINUTES", "10"))
+    # 优雅停机：等待运行中任务完成的最长秒数，超时后强制停止（未完成任务下次启动时重新入队）
+    JOB_DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("JOB_DRAIN_TIMEOUT_SECONDS", "30"))
+
+    # ========= 预测结果响应编码 =========
+    # 客户端 Accept-Encoding 支持 zstd（需安装 zstandard）/ gzip 时压缩 JSON 响应；小于该字节数不压缩
+    RESPONSE_COMPRESS_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+    RESPONSE_GZIP_LEVEL: int = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+    RESPONSE_ZSTD_LEVEL: int = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+
+    # ========= 评估指标 =========
+    # WQL/WAPE/MASE 的逐 item 细分（<指标>_by_item）只在 holdout 序列数不超过该值时返回，避免响应过大
+    METRICS_BY_ITEM_MAX_ITEMS: int = int(os.getenv("METRICS_BY_ITEM_MAX_ITEMS", "1000"))
+
+    # ========= 滚动回测（/backtest） =========
+    # 单次请求的回测窗口数上限；所有窗口的上下文合并为一次批量推理，窗口越多单次推理的序列越多
+    BACKTEST_MAX_WINDOWS: int = int(os.getenv("BACKTEST_MAX_WINDOWS", "20"))
+
     # ========= 预测默认参数配置 =========
     # 默认分位数（如果请求里没传，可以用这个）
     default_quantiles: tuple[float, ...] = (0.1, 0.5, 0.9)
@@ -54,6 +54,7 @@ async def app_exception_handler(request: Request, exc: BaseAppException) -> JSON
     return JSONResponse(
         status_code=exc.status_code,
         content=error_dict,
+        headers=getattr(exc, "headers", None),
     )
 
 
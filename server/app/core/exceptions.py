@@ -37,6 +37,7 @@ class ErrorCode(str, Enum):
     UNAUTHORIZED = "UNAUTHORIZED"                # 未认证
     FORBIDDEN = "FORBIDDEN"                      # 无权限
     NOT_FOUND = "NOT_FOUND"                      # 路由 / 资源不存在
+    SERVICE_BUSY = "SERVICE_BUSY"                # 推理队列已满，稍后重试（配合 Retry-After）
 
     # ---------- 数据层（和你的预测路由强相关） ----------
     DATA_EMPTY = "DATA_EMPTY"                    # history_data 为空
@@ -121,3 +122,19 @@ class ModelException(BaseAppException):
         details: Optional[Dict[str, Any]] = None,
     ) -> None:
         super().__init__(error_code, message, status_code, details)
+
+
+class ServiceBusyException(BaseAppException):
+    """
+    服务繁忙（推理并发与等待队列均已占满），快速失败并通过 Retry-After 告知客户端重试时间
+    """
+    def __init__(
+        self,
+        message: str = "服务繁忙，请稍后重试",
+        retry_after_seconds: int = 5,
+        status_code: int = int(HTTPStatus.SERVICE_UNAVAILABLE),
+        details: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        super().__init__(ErrorCode.SERVICE_BUSY, message, status_code, details)
+        self.retry_after_seconds = retry_after_seconds
+        self.headers = {"Retry-After": str(int(retry_after_seconds))}
@@ -14,7 +14,10 @@ from app.core.config import settings
 from app.api.main import api_router
 from app.api.routes import health
 from app.services.model_cleanup import cleanup_finetuned_models
+from app.services.inference_executor import inference_executor
 from app.services.job_queue import job_queue
+from app.services.device import choose_device
+from app.services.zero_shot_engine import get_zeroshot_engine
 
 
 
@@ -37,8 +40,11 @@ async def _cleanup_loop() -> None:
         await asyncio.sleep(interval_seconds)
 
 
-async def _job_worker_loop() -> None:
-    await job_queue.worker()
+async def _preload_zeroshot_engine() -> None:
+    try:
+        await asyncio.to_thread(get_zeroshot_engine(choose_device(prefer_cuda=True)).load)
+    except Exception as exc:
+        logger.warning("zero-shot 引擎预加载失败（首个请求时将重试）: %s", exc)
 
 @asynccontextmanager
 async def lifespan(app:FastAPI):
@@ -50,10 +56,11 @@ async def lifespan(app:FastAPI):
     logger.info("="*40)
 
     cleanup_task: asyncio.Task | None = None
-    job_task: asyncio.Task | None = None
     if settings.FINETUNED_MODEL_RETENTION_DAYS > 0 and settings.FINETUNED_MODEL_CLEANUP_INTERVAL_HOURS > 0:
         cleanup_task = asyncio.create_task(_cleanup_loop())
-    job_task = asyncio.create_task(_job_worker_loop())
+    job_queue.start()
+    if settings.ZEROSHOT_RESIDENT_ENGINE and settings.ZEROSHOT_PRELOAD:
+        await _preload_zeroshot_engine()
 
     if settings.ENABLE_MCP:
         from app.mcp.server import mcp
@@ -91,12 +98,8 @@ async def lifespan(app:FastAPI):
                     await cleanup_task
                 except asyncio.CancelledError:
                     pass
-            if job_task is not None:
-                job_task.cancel()
-                try:
-                    await job_task
-                except asyncio.CancelledError:
-                    pass
+            await job_queue.stop(drain_timeout=settings.JOB_DRAIN_TIMEOUT_SECONDS)
+            inference_executor.shutdown()
             logger.info("Application shutdown")
     else:
         logger.info("=" * 40)
@@ -124,12 +127,8 @@ async def lifespan(app:FastAPI):
                 await cleanup_task
             except asyncio.CancelledError:
                 pass
-        if job_task is not None:
-            job_task.cancel()
-            try:
-                await job_task
-            except asyncio.CancelledError:
-                pass
+        await job_queue.stop(drain_timeout=settings.JOB_DRAIN_TIMEOUT_SECONDS)
+        inference_executor.shutdown()
         logger.info("Application shutdown")
 
 
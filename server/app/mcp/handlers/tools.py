@@ -3,6 +3,7 @@ import json
 from typing import Any, Dict, List, Optional
 
 from app.services.finetune_forecast import finetune_forecast_from_markdown_bytes
+from app.services.inference_executor import inference_executor
 from app.services.zero_shot_forecast import zeroshot_forecast_from_markdown_bytes
 
 logger = logging.getLogger(__name__)
@@ -34,7 +35,8 @@ def register_tools(mcp) -> None :
             device,
         )
 
-        result = zeroshot_forecast_from_markdown_bytes(
+        result = await inference_executor.run(
+            zeroshot_forecast_from_markdown_bytes,
             markdown.encode("utf-8"),
             prediction_length=prediction_length,
             quantiles=quantiles,
@@ -72,7 +74,8 @@ def register_tools(mcp) -> None :
             save_model,
         )
 
-        result = finetune_forecast_from_markdown_bytes(
+        result = await inference_executor.run(
+            finetune_forecast_from_markdown_bytes,
             markdown.encode("utf-8"),
             prediction_length=prediction_length,
             quantiles=quantiles,
@@ -43,10 +43,11 @@ class MarkdownPayload(BaseModel):
 
 
 class ForecastResponse(BaseModel):
-    predictions: List[Dict[str, Any]] = Field(..., description="预测结果（行记录）")
+    predictions: List[Dict[str, Any]] = Field(..., description="预测结果（行记录；format=columnar 时为每个 item_id 一个对象）")
     prediction_shape: List[int] = Field(..., description="预测结果 DataFrame 形状")
     prediction_length: int = Field(..., description="预测步长")
     quantiles: List[float] = Field(..., description="输出分位数")
     metrics: Optional[Dict[str, Any]] = Field(default=None, description="评估指标（需提供 test_data）")
     model_used: str = Field(..., description="使用的模型标识")
     generated_at: str = Field(..., description="生成时间 ISO 字符串")
+    cached: bool = Field(default=False, description="是否命中结果缓存（命中时 generated_at 为缓存写入时间）")
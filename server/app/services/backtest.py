@@ -0,0 +1,359 @@
+"""
+多窗口滚动回测（rolling-origin backtest）。
+
+K 个窗口的 holdout 区间从序列末尾按 step 向前滚动；每个窗口的上下文作为一条独立序列
+（item_id + 窗口序号）一次性拼好，全部窗口合并为一次批量推理，而不是 K 次 fit / predict。
+指标由 metric_engine 逐窗口计算，再汇总为各窗口的平均值。
+"""
+
+from __future__ import annotations
+
+import logging
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.core.exceptions import DataException, ErrorCode, ModelException
+from app.services.device import choose_device
+from app.services.forecast_metrics import PredictFn, build_eval_frame
+from app.services.job_context import report_stage
+from app.services.metric_engine import EVAL_METRICS, compute_holdout_metrics, metric_result_keys, seasonal_period
+from app.services.metrics_helpers import (
+    filter_metric_result,
+    normalize_metrics_request,
+    replace_pred_timestamps_with_holdout,
+)
+from app.services.model_cache import predictor_cache
+from app.services.process import ParsedMarkdownInput
+from app.services.table_parser import UploadSource, parse_upload
+from app.services.zero_shot_engine import get_zeroshot_engine
+from app.services.zero_shot_forecast import (
+    _lazy_import_autogluon,
+    _validate_quantiles,
+    make_autogluon_predict_fn,
+    make_engine_predict_fn,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BacktestWindows:
+    # 全部窗口的上下文 / holdout，item_id 为窗口序列 ID（原 item_id + "#w<窗口序号>"）
+    context_df: pd.DataFrame
+    holdout_df: pd.DataFrame
+    # holdout_df 各行所属的窗口序号
+    holdout_window: np.ndarray
+    windows: List[Dict[str, Any]]
+    warnings: List[Dict[str, Any]]
+
+
+def build_backtest_windows(
+    series_df: pd.DataFrame,
+    *,
+    prediction_length: int,
+    num_windows: int,
+    step: int,
+    min_context: int,
+) -> BacktestWindows:
+    """
+    构造 K 个回测窗口：窗口 k（0 为最早）的 holdout 为各 item 倒数第 (K-1-k)*step 步之前的 prediction_length 个点，
+    其之前的全部点为上下文。上下文不足 min_context 个点的 item 在该窗口中跳过。
+    """
+    df = series_df.sort_values(["item_id", "timestamp"], kind="stable").reset_index(drop=True)
+    item_ids = df["item_id"].astype(str).to_numpy(dtype=object)
+    grouped = df.groupby("item_id", sort=False)
+    pos = grouped.cumcount().to_numpy()
+    length = grouped["timestamp"].transform("size").to_numpy()
+
+    contexts: List[pd.DataFrame] = []
+    holdouts: List[pd.DataFrame] = []
+    holdout_window: List[np.ndarray] = []
+    windows: List[Dict[str, Any]] = []
+    warnings: List[Dict[str, Any]] = []
+    for k in range(num_windows):
+        offset = (num_windows - 1 - k) * step
+        holdout_start = length - offset - prediction_length
+        eligible = holdout_start >= min_context
+        skipped = pd.unique(item_ids[~eligible])
+        if len(skipped):
+            warnings.append(
+                {
+                    "window": k,
+                    "reason": "series_too_short_skipped",
+                    "items": skipped.tolist(),
+                    "required_min_length": int(min_context + prediction_length + offset),
+                }
+            )
+        if not eligible.any():
+            continue
+
+        suffix = f"#w{k}"
+        context_mask = eligible & (pos < holdout_start)
+        holdout_mask = eligible & (pos >= holdout_start) & (pos < length - offset)
+        contexts.append(df.loc[context_mask].assign(item_id=item_ids[context_mask] + suffix))
+        holdout = df.loc[holdout_mask].assign(item_id=item_ids[holdout_mask] + suffix)
+        holdouts.append(holdout)
+        holdout_window.append(np.full(len(holdout), k))
+        windows.append(
+            {
+                "window": k,
+                "offset": int(offset),
+                "num_items": int(holdout["item_id"].nunique()),
+                "holdout_start": str(holdout["timestamp"].min()),
+                "holdout_end": str(holdout["timestamp"].max()),
+            }
+        )
+
+    if not windows:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="时间序列过短，无法构造任何回测窗口；请减少 num_windows / step 或提供更长的 history_data",
+            details={
+                "min_series_length": int(length.min()) if len(length) else 0,
+                "required_min_length": int(min_context + prediction_length),
+                "num_windows": num_windows,
+                "step": step,
+            },
+        )
+    return BacktestWindows(
+        context_df=pd.concat(contexts, ignore_index=True),
+        holdout_df=pd.concat(holdouts, ignore_index=True),
+        holdout_window=np.concatenate(holdout_window),
+        windows=windows,
+        warnings=warnings,
+    )
+
+
+def _mean_metrics(per_window: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    各窗口指标的平均：标量取均值；逐预测步列表按位置取均值（忽略 None）；COVERAGE 按分位数取均值。
+    """
+    out: Dict[str, Any] = {}
+    keys = {key for metrics in per_window for key in metrics}
+    for key in sorted(keys):
+        values = [metrics[key] for metrics in per_window if metrics.get(key) is not None]
+        if not values:
+            continue
+        if isinstance(values[0], dict):
+            levels = {level for value in values for level in value}
+            out[key] = {level: float(np.mean([v[level] for v in values if level in v])) for level in sorted(levels)}
+        elif isinstance(values[0], list):
+            width = max(len(v) for v in values)
+            matrix = np.full((len(values), width), np.nan)
+            for i, v in enumerate(values):
+                matrix[i, : len(v)] = [np.nan if x is None else x for x in v]
+            counts = np.isfinite(matrix).sum(axis=0)
+            sums = np.nansum(matrix, axis=0)
+            out[key] = [float(total / count) if count else None for total, count in zip(sums, counts)]
+        else:
+            out[key] = float(np.mean(values))
+    return out
+
+
+def _validate_backtest_params(metrics: List[str], num_windows: int, step: int) -> None:
+    if not metrics:
+        raise DataException(error_code=ErrorCode.VALIDATION_ERROR, message="回测至少需要一个指标")
+    unsupported = [m for m in metrics if m not in EVAL_METRICS]
+    if unsupported:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="回测仅支持 WQL/WAPE/MASE/COVERAGE 指标",
+            details={"unsupported": unsupported, "allowed": list(EVAL_METRICS)},
+        )
+    if num_windows <= 0 or num_windows > settings.BACKTEST_MAX_WINDOWS:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="num_windows 超过服务限制",
+            details={"num_windows": num_windows, "max": settings.BACKTEST_MAX_WINDOWS},
+        )
+    if step <= 0:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="step 必须为正整数",
+            details={"step": step},
+        )
+
+
+def backtest_from_upload(
+    content: UploadSource,
+    *,
+    prediction_length: int,
+    num_windows: int,
+    step: Optional[int] = None,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    device: str | None = None,
+    freq: Optional[str] = None,
+    context_length: int = 512,
+    model_id: Optional[str] = None,
+    input_format: str = "markdown",
+    test_content: Optional[UploadSource] = None,
+    test_format: Optional[str] = None,
+    covariates_content: Optional[UploadSource] = None,
+    covariates_format: Optional[str] = None,
+    known_covariates_names: Optional[List[str]] = None,
+    category_cov_name: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    上传内容（与 /zeroshot/ 相同的输入）-> 滚动回测结果。test_data 若提供，拼接到 history_data 之后参与回测。
+    """
+    report_stage("parsing")
+    parsed = parse_upload(
+        content,
+        input_format=input_format,
+        prediction_length=prediction_length,
+        with_cov=with_cov,
+        freq_override=freq,
+        max_series=settings.MAX_SERIES,
+        max_points_per_series=settings.MAX_POINTS_PER_SERIES,
+        max_prediction_length=settings.max_prediction_length,
+        max_upload_bytes=settings.MAX_UPLOAD_BYTES,
+        test_source=test_content,
+        test_format=test_format,
+        covariates_source=covariates_content,
+        covariates_format=covariates_format,
+        known_covariates_names=known_covariates_names,
+        category_cov_name=category_cov_name,
+    )
+    return backtest_from_parsed(
+        parsed,
+        prediction_length=prediction_length,
+        num_windows=num_windows,
+        step=step,
+        quantiles=quantiles,
+        metrics=metrics,
+        with_cov=with_cov,
+        device=device,
+        context_length=context_length,
+        model_id=model_id,
+    )
+
+
+def backtest_from_parsed(
+    parsed: ParsedMarkdownInput,
+    *,
+    prediction_length: int,
+    num_windows: int,
+    step: Optional[int] = None,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    device: str | None = None,
+    context_length: int = 512,
+    model_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    - 未传 model_id：常驻 zero-shot 引擎（经微批合并与序列级缓存）
+    - 传入 model_id：已保存的微调模型（从进程级缓存租用），用于对比微调前后的回测指标
+    """
+    quantiles = _validate_quantiles(quantiles)
+    metrics = normalize_metrics_request(metrics)
+    step = int(step) if step is not None else int(prediction_length)
+    _validate_backtest_params(metrics, num_windows, step)
+
+    selected_device = device if device in {"cpu", "cuda"} else None
+    if selected_device is None:
+        selected_device = choose_device(prefer_cuda=True)
+
+    windows = build_backtest_windows(
+        build_eval_frame(parsed),
+        prediction_length=prediction_length,
+        num_windows=num_windows,
+        step=step,
+        # 每个窗口至少保留 prediction_length 个上下文点（与 IC/IR 的 2 × prediction_length 长度要求一致）
+        min_context=prediction_length,
+    )
+    known_cov_df = None
+    if with_cov and parsed.known_covariates_names:
+        known_cov_df = windows.holdout_df[["item_id", "timestamp", *parsed.known_covariates_names]]
+
+    with ExitStack() as stack:
+        predict_fn: PredictFn
+        if model_id:
+            predictor = stack.enter_context(predictor_cache.lease(model_id, quantiles=quantiles))
+            pred_len = getattr(predictor, "prediction_length", None)
+            if pred_len is not None and int(pred_len) != int(prediction_length):
+                raise DataException(
+                    error_code=ErrorCode.VALIDATION_ERROR,
+                    message="model_id 对应模型的 prediction_length 与请求不一致",
+                    details={"model_prediction_length": int(pred_len), "request_prediction_length": prediction_length},
+                )
+            TimeSeriesDataFrame, _ = _lazy_import_autogluon()
+            predict_fn = make_autogluon_predict_fn(predictor, TimeSeriesDataFrame)
+            model_used = "autogluon-chronos2-finetuned"
+        else:
+            predict_fn = make_engine_predict_fn(
+                get_zeroshot_engine(selected_device),
+                prediction_length=prediction_length,
+                quantiles=quantiles,
+                context_length=context_length,
+                freq=parsed.freq,
+            )
+            model_used = "chronos2-zeroshot-resident"
+
+        report_stage("predicting")
+        logger.info(
+            "滚动回测: windows=%d, series=%d, model=%s",
+            len(windows.windows),
+            windows.context_df["item_id"].nunique(),
+            model_id or model_used,
+        )
+        try:
+            # 全部窗口的上下文一次送入模型
+            pred_df = predict_fn(windows.context_df, known_cov_df)
+        except (DataException, ModelException):
+            raise
+        except Exception as exc:
+            raise ModelException(
+                error_code=ErrorCode.MODEL_PREDICT_FAILED,
+                message="回测预测失败",
+                details={"reason": str(exc)},
+            ) from exc
+
+    report_stage("metrics")
+    pred_df = replace_pred_timestamps_with_holdout(pred_df, windows.holdout_df)
+    season_length = seasonal_period(parsed.freq)
+    keys = metric_result_keys(metrics, by_item=False)
+    warnings = list(windows.warnings)
+    window_results: List[Dict[str, Any]] = []
+    for window in windows.windows:
+        holdout_k = windows.holdout_df[windows.holdout_window == window["window"]]
+        try:
+            metrics_k = compute_holdout_metrics(
+                holdout_k,
+                pred_df,
+                quantiles=quantiles,
+                metrics=metrics,
+                train_df=windows.context_df,
+                season_length=season_length,
+                by_item=False,
+            )
+        except Exception as exc:
+            warnings.append({"window": window["window"], "reason": "evaluate_failed", "detail": str(exc)})
+            continue
+        window_results.append({**window, "metrics": filter_metric_result(metrics_k, keys)})
+
+    result: Dict[str, Any] = {
+        "windows": window_results,
+        "aggregate": _mean_metrics([w["metrics"] for w in window_results]),
+        "num_windows": len(window_results),
+        "step": step,
+        "prediction_length": prediction_length,
+        "quantiles": quantiles,
+        "metrics_requested": metrics,
+        "context_length": context_length,
+        "model_used": model_used,
+        "generated_at": pd.Timestamp.now().isoformat(),
+    }
+    if model_id:
+        result["model_id"] = model_id
+    if warnings:
+        result["warnings"] = warnings
+    return result
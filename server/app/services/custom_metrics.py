@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
@@ -21,12 +21,91 @@ def _safe_spearman(x: np.ndarray, y: np.ndarray) -> Optional[float]:
     return float(corr)
 
 
+def _group_sort(codes: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """
+    按组号对已排好的下标 order 做稳定重排；组号能放进 uint16 时 numpy 走基数排序。
+    """
+    keys = codes[order]
+    if len(keys) and int(keys.max()) <= np.iinfo(np.uint16).max:
+        keys = keys.astype(np.uint16)
+    return order[np.argsort(keys, kind="stable")]
+
+
+def _grouped_average_rank(codes: np.ndarray, values: np.ndarray, value_order: np.ndarray) -> np.ndarray:
+    """
+    组内平均秩（等价于 groupby(codes).rank(method="average")）。
+
+    value_order 为 values 的全局 argsort：按组稳定重排后即为组内有序，比 lexsort 快，
+    且同一列在不同分组方式下可复用；并列值的先后不影响平均秩。
+    """
+    n = len(values)
+    order = _group_sort(codes, value_order)
+    sorted_codes = codes[order]
+    sorted_values = values[order]
+    positions = np.arange(n)
+    new_group = np.empty(n, dtype=bool)
+    new_group[:1] = True
+    np.not_equal(sorted_codes[1:], sorted_codes[:-1], out=new_group[1:])
+    new_run = new_group.copy()
+    new_run[1:] |= sorted_values[1:] != sorted_values[:-1]
+    # 并列值（同组同值）为一个 run，取 run 内位置的平均值
+    run_starts = positions[new_run]
+    run_ends = np.append(run_starts[1:], n) - 1
+    run_id = np.cumsum(new_run) - 1
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    ranks = np.empty(n, dtype=float)
+    ranks[order] = (run_starts[run_id] + run_ends[run_id]) / 2.0 - group_start + 1.0
+    return ranks
+
+
+def _grouped_rank_corr(
+    codes: np.ndarray,
+    n_groups: int,
+    x: np.ndarray,
+    y: np.ndarray,
+    x_order: np.ndarray,
+    y_order: np.ndarray,
+) -> np.ndarray:
+    """
+    按组（codes 为 0..n_groups-1）一次性计算 Spearman 相关：组内平均秩后对秩做 Pearson。
+
+    与逐组 _safe_spearman 等价：组内少于 2 个点或任一侧秩全相同时为 NaN。
+    """
+    xr = _grouped_average_rank(codes, x, x_order)
+    yr = _grouped_average_rank(codes, y, y_order)
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    # 组内平均秩的均值恒为 (n + 1) / 2，直接中心化，避免原始矩公式在大组下的精度损失
+    center = ((n + 1.0) / 2.0)[codes]
+    dx = xr - center
+    dy = yr - center
+    sxy = np.bincount(codes, weights=dx * dy, minlength=n_groups)
+    sxx = np.bincount(codes, weights=dx * dx, minlength=n_groups)
+    syy = np.bincount(codes, weights=dy * dy, minlength=n_groups)
+    corr = np.full(n_groups, np.nan)
+    valid = (n >= 2) & (sxx > 0) & (syy > 0)
+    corr[valid] = sxy[valid] / np.sqrt(sxx[valid] * syy[valid])
+    return corr
+
+
+def _has_multiple_items(codes: np.ndarray, n_groups: int, item_codes: np.ndarray) -> np.ndarray:
+    """
+    每组是否至少包含 2 个不同 item：与组内首个 item 比较，无需排序或去重。
+    """
+    first_item = np.full(n_groups, -1, dtype=np.int64)
+    # 花式赋值重复下标时后写入者生效，倒序写入即得到每组首次出现的 item
+    first_item[codes[::-1]] = item_codes[::-1]
+    differs = item_codes != first_item[codes]
+    return np.bincount(codes, weights=differs, minlength=n_groups) > 0
+
+
 @dataclass(frozen=True)
 class IcIrResult:
     ic: Optional[float]
     ir: Optional[float]
     ic_by_timestamp: List[float]
     method: str
+    # 按预测步（每个 item 的第 1..H 个 holdout 点）计算的截面 IC；无法计算的步为 None
+    ic_by_horizon: List[Optional[float]] = field(default_factory=list)
 
 
 def compute_ic_ir(
@@ -44,6 +123,10 @@ def compute_ic_ir(
     - IC_t: cross-sectional Spearman correlation between y_pred and y_true across item_id at each timestamp t
     - IC: mean(IC_t) over timestamps where correlation is defined
     - IR: mean(IC_t) / std(IC_t) over timestamps (std with ddof=1)
+    - ic_by_horizon: the same cross-sectional IC grouped by horizon step (position within each item) instead of
+      by timestamp, so series that end on different dates are still compared step by step
+
+    All per-group correlations are computed in one vectorized pass (group-wise ranks + bincount moments).
 
     Fallback: if cross-sectional IC cannot be computed (e.g., only 1 series), compute overall Spearman across all points.
     """
@@ -54,17 +137,35 @@ def compute_ic_ir(
 
     # Ensure timestamp is comparable for grouping
     work[timestamp_col] = pd.to_datetime(work[timestamp_col], errors="coerce")
-    work = work.dropna(subset=[timestamp_col])
+    work = work.dropna(subset=[timestamp_col]).reset_index(drop=True)
     if work.empty:
         return IcIrResult(ic=None, ir=None, ic_by_timestamp=[], method="empty")
 
-    ic_list: List[float] = []
-    for _, g in work.groupby(timestamp_col, sort=True):
-        if g[item_id_col].nunique() < 2:
-            continue
-        corr = _safe_spearman(g[y_pred_col].to_numpy(), g[y_true_col].to_numpy())
-        if corr is not None:
-            ic_list.append(corr)
+    y_pred = work[y_pred_col].to_numpy(dtype=float)
+    y_true = work[y_true_col].to_numpy(dtype=float)
+    item_codes, _ = pd.factorize(work[item_id_col])
+    pred_order = np.argsort(y_pred)
+    true_order = np.argsort(y_true)
+
+    ts_codes, ts_uniques = pd.factorize(work[timestamp_col], sort=True)
+    ic_ts = _grouped_rank_corr(ts_codes, len(ts_uniques), y_pred, y_true, pred_order, true_order)
+    # 截面只有一个 item 的时间点不参与（与逐组实现一致）
+    ic_ts[~_has_multiple_items(ts_codes, len(ts_uniques), item_codes)] = np.nan
+    ic_list = [float(v) for v in ic_ts[~np.isnan(ic_ts)]]
+
+    # 预测步 = 每个 item 内按时间排序的位置
+    order = _group_sort(item_codes, _group_sort(ts_codes, np.arange(len(ts_codes))))
+    sorted_items = item_codes[order]
+    first = np.empty(len(order), dtype=bool)
+    first[:1] = True
+    np.not_equal(sorted_items[1:], sorted_items[:-1], out=first[1:])
+    positions = np.arange(len(order))
+    step_codes = np.empty(len(order), dtype=np.int64)
+    step_codes[order] = positions - np.maximum.accumulate(np.where(first, positions, 0))
+    n_steps = int(step_codes.max()) + 1
+    ic_step = _grouped_rank_corr(step_codes, n_steps, y_pred, y_true, pred_order, true_order)
+    ic_step[~_has_multiple_items(step_codes, n_steps, item_codes)] = np.nan
+    ic_by_horizon = [None if np.isnan(v) else float(v) for v in ic_step]
 
     if ic_list:
         ic = float(np.mean(ic_list))
@@ -73,9 +174,20 @@ def compute_ic_ir(
             ir = ic / std if std > 0 else None
         else:
             ir = None
-        return IcIrResult(ic=ic, ir=ir, ic_by_timestamp=ic_list, method="cross_sectional_by_timestamp")
+        return IcIrResult(
+            ic=ic,
+            ir=ir,
+            ic_by_timestamp=ic_list,
+            method="cross_sectional_by_timestamp",
+            ic_by_horizon=ic_by_horizon,
+        )
 
     # Fallback: overall Spearman across all points
-    corr_all = _safe_spearman(work[y_pred_col].to_numpy(), work[y_true_col].to_numpy())
-    return IcIrResult(ic=corr_all, ir=None, ic_by_timestamp=[], method="overall_spearman_fallback")
-
+    corr_all = _safe_spearman(y_pred, y_true)
+    return IcIrResult(
+        ic=corr_all,
+        ir=None,
+        ic_by_timestamp=[],
+        method="overall_spearman_fallback",
+        ic_by_horizon=ic_by_horizon,
+    )
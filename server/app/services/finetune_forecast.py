@@ -1,30 +1,41 @@
+import functools
 import logging
 import shutil
 import tempfile
+import threading
 import time
 import uuid
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 import pandas as pd
 import re
 
 from app.core.config import settings
 from app.core.exceptions import DataException, ErrorCode, ModelException
-from app.services.forecast_output import filter_prediction_df_quantiles, resolve_quantile_columns
-from app.services.evaluate_metrics import normalize_evaluate_result
-from app.services.metrics_helpers import (
-    filter_metric_result,
-    normalize_metrics_request,
-    merge_holdout_predictions,
-    replace_pred_timestamps_with_future,
-    replace_pred_timestamps_with_holdout,
-    select_prediction_column,
-    split_holdout_frame,
+from app.services.forecast_metrics import (
+    DeferredMetrics,
+    compute_forecast_metrics,
+    compute_or_defer_metrics,
+    make_holdout_evaluate_fn,
+    share_holdout_predictions,
+    validate_metrics_mode,
+)
+from app.services.forecast_output import PredictionsCallback, format_predictions, validate_output_format
+from app.services.job_context import JobContext, check_cancelled, current_job, report_stage
+from app.services.metrics_helpers import normalize_metrics_request
+from app.services.model_cache import model_dir_for, predictor_cache
+from app.services.process import ParsedMarkdownInput, parse_markdown_bytes
+from app.services.result_cache import cached_forecast_result, forecast_cache_key, forecast_result_cache
+from app.services.table_parser import UploadSource, parse_upload
+from app.services.zero_shot_forecast import (
+    _finalize_prediction_frame,
+    _lazy_import_autogluon,
+    _validate_quantiles,
+    autogluon_validation_predictions,
+    make_autogluon_predict_fn,
 )
-from app.services.custom_metrics import compute_ic_ir
-from app.services.process import extract_json_from_markdown, parse_markdown_payload
-from app.services.zero_shot_forecast import _lazy_import_autogluon, _validate_quantiles
 from app.services.device import choose_device
 
 
@@ -41,6 +52,53 @@ def _get_model_retention_info(model_dir: Path) -> tuple[str, int]:
     return saved_at, days_left
 
 
+def _make_progress_callback(ctx: JobContext, TrainerCallback: Any) -> Any:
+    """
+    HuggingFace TrainerCallback：逐步汇报微调进度，收到取消 / 超时信号后在当前 step 结束时停止训练。
+    """
+
+    class _JobProgressCallback(TrainerCallback):
+        def on_step_end(self, args, state, control, **kwargs):  # type: ignore[override]
+            ctx.set_step(state.global_step, state.max_steps)
+            if ctx.should_stop():
+                control.should_training_stop = True
+            return control
+
+    return _JobProgressCallback()
+
+
+_trainer_hook_lock = threading.Lock()
+
+
+def install_trainer_progress_hook() -> bool:
+    """
+    让本进程中新建的 transformers.Trainer 自动挂上任务进度回调；transformers 不可用时返回 False。
+
+    AutoGluon 的 Chronos / Chronos2 模型在内部创建 Trainer，没有传入自定义回调的参数
+    （fine_tune_trainer_kwargs 只会转成 TrainingArguments），因此包装 Trainer.__init__：
+    构造完成后按当前线程绑定的任务（current_job）调用 Trainer.add_callback，未绑定任务的训练不受影响。
+    """
+    try:
+        from transformers import Trainer, TrainerCallback  # type: ignore
+    except Exception:
+        return False
+    with _trainer_hook_lock:
+        if getattr(Trainer.__init__, "_job_progress_hook", False):
+            return True
+        original_init = Trainer.__init__
+
+        @functools.wraps(original_init)
+        def _init_with_job_progress(self, *args, **kwargs):
+            original_init(self, *args, **kwargs)
+            ctx = current_job()
+            if ctx is not None:
+                self.add_callback(_make_progress_callback(ctx, TrainerCallback))
+
+        _init_with_job_progress._job_progress_hook = True  # type: ignore[attr-defined]
+        Trainer.__init__ = _init_with_job_progress
+    return True
+
+
 def finetune_forecast_from_markdown_bytes(
     markdown_bytes: bytes,
     *,
@@ -57,35 +115,126 @@ def finetune_forecast_from_markdown_bytes(
     save_model: bool = True,
     model_id: Optional[str] = None,
 ) -> Dict[str, Any]:
-    if len(markdown_bytes) > settings.MAX_UPLOAD_BYTES:
-        raise DataException(
-            error_code=ErrorCode.VALIDATION_ERROR,
-            message="上传文件超过大小限制",
-            details={"max_upload_bytes": settings.MAX_UPLOAD_BYTES},
-        )
+    report_stage("parsing")
+    parsed = parse_markdown_bytes(
+        markdown_bytes,
+        prediction_length=prediction_length,
+        with_cov=with_cov,
+        freq_override=freq,
+        max_series=settings.MAX_SERIES,
+        max_points_per_series=settings.MAX_POINTS_PER_SERIES,
+        max_prediction_length=settings.max_prediction_length,
+        max_upload_bytes=settings.MAX_UPLOAD_BYTES,
+    )
+    return finetune_forecast_from_parsed(
+        parsed,
+        prediction_length=prediction_length,
+        quantiles=quantiles,
+        metrics=metrics,
+        with_cov=with_cov,
+        device=device,
+        finetune_num_steps=finetune_num_steps,
+        finetune_learning_rate=finetune_learning_rate,
+        finetune_batch_size=finetune_batch_size,
+        context_length=context_length,
+        save_model=save_model,
+        model_id=model_id,
+    )
 
-    try:
-        markdown_text = markdown_bytes.decode("utf-8")
-    except UnicodeDecodeError as exc:
-        raise DataException(
-            error_code=ErrorCode.DATA_FORMAT_ERROR,
-            message="Markdown 文件编码错误，请使用 UTF-8 编码",
-        ) from exc
-
-    payload = extract_json_from_markdown(markdown_text)
-    parsed = parse_markdown_payload(
-        payload,
+
+def finetune_forecast_from_upload(
+    content: UploadSource,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    device: str | None = None,
+    freq: Optional[str] = None,
+    finetune_num_steps: int = 1000,
+    finetune_learning_rate: float = 1e-4,
+    finetune_batch_size: int = 32,
+    context_length: int = 512,
+    save_model: bool = True,
+    model_id: Optional[str] = None,
+    input_format: str = "markdown",
+    test_content: Optional[UploadSource] = None,
+    test_format: Optional[str] = None,
+    covariates_content: Optional[UploadSource] = None,
+    covariates_format: Optional[str] = None,
+    known_covariates_names: Optional[List[str]] = None,
+    category_cov_name: Optional[List[str]] = None,
+    output_format: str = "records",
+    on_predictions: Optional[PredictionsCallback] = None,
+    metrics_mode: str = "inline",
+) -> Dict[str, Any]:
+    """
+    上传内容（Markdown / Parquet / Arrow / CSV；bytes 或文件对象）-> 预测结果。
+
+    路由的同步、异步与流式入口共用；input_format 默认 markdown，与 finetune_forecast_from_markdown_bytes 的调用方式兼容。
+    on_predictions：预测后处理完成、计算指标之前回调一次（流式接口用），此时结果中的 predictions 为空列表。
+    metrics_mode=deferred：不计算指标，结果中的 deferred_metrics 由路由层提交到任务队列（见 attach_deferred_metrics）。
+    """
+    output_format = validate_output_format(output_format, allow_frame=True)
+    report_stage("parsing")
+    parsed = parse_upload(
+        content,
+        input_format=input_format,
         prediction_length=prediction_length,
         with_cov=with_cov,
         freq_override=freq,
         max_series=settings.MAX_SERIES,
         max_points_per_series=settings.MAX_POINTS_PER_SERIES,
         max_prediction_length=settings.max_prediction_length,
+        max_upload_bytes=settings.MAX_UPLOAD_BYTES,
+        test_source=test_content,
+        test_format=test_format,
+        covariates_source=covariates_content,
+        covariates_format=covariates_format,
+        known_covariates_names=known_covariates_names,
+        category_cov_name=category_cov_name,
+    )
+    return finetune_forecast_from_parsed(
+        parsed,
+        prediction_length=prediction_length,
+        quantiles=quantiles,
+        metrics=metrics,
+        with_cov=with_cov,
+        device=device,
+        finetune_num_steps=finetune_num_steps,
+        finetune_learning_rate=finetune_learning_rate,
+        finetune_batch_size=finetune_batch_size,
+        context_length=context_length,
+        save_model=save_model,
+        model_id=model_id,
+        output_format=output_format,
+        on_predictions=on_predictions,
+        metrics_mode=metrics_mode,
     )
 
 
+def finetune_forecast_from_parsed(
+    parsed: ParsedMarkdownInput,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    device: str | None = None,
+    finetune_num_steps: int = 1000,
+    finetune_learning_rate: float = 1e-4,
+    finetune_batch_size: int = 32,
+    context_length: int = 512,
+    save_model: bool = True,
+    model_id: Optional[str] = None,
+    output_format: str = "records",
+    on_predictions: Optional[PredictionsCallback] = None,
+    metrics_mode: str = "inline",
+) -> Dict[str, Any]:
     quantiles = _validate_quantiles(quantiles)
+    output_format = validate_output_format(output_format, allow_frame=True)
     metrics = normalize_metrics_request(metrics)
+    metrics_mode = validate_metrics_mode(metrics_mode) if metrics else "inline"
 
     selected_device = device if device in {"cpu", "cuda"} else None
     if selected_device is None:
@@ -99,6 +248,36 @@ def finetune_forecast_from_markdown_bytes(
                 details={"finetune_num_steps": finetune_num_steps, "max": settings.MAX_FINETUNE_STEPS},
             )
 
+    # 仅缓存已有模型（model_id）的预测：重新微调每次都会产生新模型，不复用结果
+    cache_key: Optional[str] = None
+    if model_id and forecast_result_cache.enabled and model_dir_for(model_id).exists():
+        cache_key = forecast_cache_key(
+            "finetune",
+            parsed,
+            prediction_length=prediction_length,
+            quantiles=quantiles,
+            metrics=metrics,
+            with_cov=with_cov,
+            context_length=context_length,
+            model_id=model_id,
+        )
+        cached = forecast_result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("finetune 预测命中结果缓存: model_id=%s, key=%s", model_id, cache_key[:12])
+            result = cached_forecast_result(
+                cached,
+                freq=parsed.freq,
+                prediction_length=prediction_length,
+                quantiles=quantiles,
+                output_format=output_format,
+                on_predictions=on_predictions,
+            )
+            result["model_saved_at"], result["model_retention_days_left"] = _get_model_retention_info(
+                model_dir_for(model_id)
+            )
+            return result
+
+    report_stage("loading")
     TimeSeriesDataFrame, TimeSeriesPredictor = _lazy_import_autogluon()
 
     train_data = TimeSeriesDataFrame.from_data_frame(
@@ -115,373 +294,250 @@ def finetune_forecast_from_markdown_bytes(
             timestamp_column="timestamp",
         )
 
-    predictor: Any
     model_id_used: Optional[str] = None
-    temp_dir_ctx: Optional[tempfile.TemporaryDirectory] = None
-
     model_saved_at: Optional[str] = None
     model_retention_days_left: Optional[int] = None
 
-    if model_id:
-        model_id_used = model_id
-        model_dir = Path(settings.FINETUNED_MODELS_DIR) / model_id
-        if not model_dir.exists():
-            raise ModelException(
-                error_code=ErrorCode.MODEL_LOAD_FAILED,
-                message="未找到对应的微调模型（model_id 不存在）",
-                details={"model_id": model_id, "model_dir": str(model_dir)},
-            )
+    with ExitStack() as stack:
+        predictor: Any
+        if model_id:
+            model_id_used = model_id
+            model_dir = model_dir_for(model_id)
+            # 命中进程级缓存时跳过磁盘反序列化；lease 返回按本次 quantiles 设置的浅拷贝，不改写共享对象
+            predictor = stack.enter_context(predictor_cache.lease(model_id, quantiles=quantiles))
+
+            pred_len = getattr(predictor, "prediction_length", None)
+            if pred_len is not None and int(pred_len) != int(prediction_length):
+                raise DataException(
+                    error_code=ErrorCode.VALIDATION_ERROR,
+                    message="model_id 对应模型的 prediction_length 与请求不一致",
+                    details={"model_prediction_length": int(pred_len), "request_prediction_length": prediction_length},
+                )
+
+            model_saved_at, model_retention_days_left = _get_model_retention_info(model_dir)
+        else:
+            predictor_path = stack.enter_context(tempfile.TemporaryDirectory(prefix="ag-finetune-"))
+            try:
+                predictor = TimeSeriesPredictor(
+                    prediction_length=prediction_length,
+                    target="target",
+                    eval_metric="WQL",
+                    known_covariates_names=parsed.known_covariates_names or None,
+                    freq=parsed.freq,
+                    quantile_levels=quantiles,
+                    path=predictor_path,
+                )
+            except TypeError:
+                predictor = TimeSeriesPredictor(
+                    prediction_length=prediction_length,
+                    target="target",
+                    eval_metric="WQL",
+                    known_covariates_names=parsed.known_covariates_names or None,
+                    freq=parsed.freq,
+                )
+                if hasattr(predictor, "path"):
+                    predictor.path = predictor_path  # type: ignore[attr-defined]
+                if hasattr(predictor, "quantile_levels"):
+                    predictor.quantile_levels = quantiles  # type: ignore[attr-defined]
+
+            model_path = settings.CHRONOS_MODEL_PATH
+            if not model_path:
+                raise ModelException(
+                    error_code=ErrorCode.MODEL_LOAD_FAILED,
+                    message="未配置 Chronos-2 模型路径（CHRONOS_MODEL_PATH）",
+                )
+
+            min_series_len = int(parsed.history_df.groupby("item_id").size().min())
+            context_length_auto = min(int(context_length), min_series_len)
+
+            last_fit_exc: Optional[Exception] = None
+            job_ctx = current_job()
+            if job_ctx is not None and not install_trainer_progress_hook():
+                logger.warning("transformers 不可用，微调过程中的取消 / 超时只在阶段边界生效")
+            # 不把任务截止时间作为 AutoGluon 的 time_limit：AutoGluon 会按预算提前结束训练并正常返回，
+            # 任务将以不足 finetune_num_steps 的模型被记为 succeeded。截止时刻由逐 step 回调停止训练
+            report_stage("finetuning")
+
+            for model_name in [settings.AG_CHRONOS_MODEL_NAME, "Chronos2", "Chronos"]:
+                if not model_name:
+                    continue
+
+                hps: Dict[str, Any] = {
+                    "ag_args": {"name_suffix": "_Finetuned"},
+                    "model_path": model_path,
+                    "fine_tune": True,
+                    "device": selected_device,
+                    "fine_tune_steps": int(finetune_num_steps),
+                    "fine_tune_lr": float(finetune_learning_rate),
+                    "fine_tune_batch_size": int(finetune_batch_size),
+                }
+                hps["context_length"] = int(context_length_auto)
+
+                try:
+                    try:
+                        predictor.fit(
+                            train_data=train_data,
+                            enable_ensemble=False,
+                            hyperparameters={model_name: [hps]},
+                            num_val_windows=1,
+                        )
+                    except TypeError:
+                        predictor.fit(
+                            train_data=train_data,
+                            enable_ensemble=False,
+                            hyperparameters={model_name: [hps]},
+                        )
+                    break
+                except Exception as exc:
+                    # 已取消 / 超时的任务不再换模型名重试
+                    check_cancelled()
+                    last_fit_exc = exc
+                    logger.warning("AutoGluon finetune fit 失败，尝试下一个模型名: %s, reason=%s", model_name, exc)
+                    continue
+            else:
+                m = _MIN_OBS_RE.search(str(last_fit_exc)) if last_fit_exc else None
+                if m:
+                    required = int(m.group(1))
+                    raise DataException(
+                        error_code=ErrorCode.VALIDATION_ERROR,
+                        message=(
+                            "时间序列过短，无法用于当前 prediction_length 的模型窗口构造；"
+                            "请提供更长的 history_data，或降低 prediction_length。"
+                        ),
+                        details={
+                            "required_min_observations": required,
+                            "min_series_length": min_series_len,
+                            "prediction_length": prediction_length,
+                        },
+                    )
+
+                raise ModelException(
+                    error_code=ErrorCode.MODEL_LOAD_FAILED,
+                    message="AutoGluon Chronos 微调初始化失败（请检查 autogluon 版本与模型权重路径）",
+                    details={"model_path": model_path, "reason": str(last_fit_exc) if last_fit_exc else None},
+                )
+
+        # 回调停止训练后 fit 正常返回：此处抛出 JobCancelled，任务记为 cancelled / timed_out 而不是 succeeded
+        report_stage("predicting")
         try:
-            predictor = TimeSeriesPredictor.load(str(model_dir))
+            pred = predictor.predict(
+                data=train_data,
+                known_covariates=known_covariates,
+            )
         except Exception as exc:
             raise ModelException(
-                error_code=ErrorCode.MODEL_LOAD_FAILED,
-                message="微调模型加载失败",
-                details={"model_id": model_id, "model_dir": str(model_dir), "reason": str(exc)},
+                error_code=ErrorCode.MODEL_PREDICT_FAILED,
+                message="模型预测失败",
+                details={"reason": str(exc)},
             ) from exc
 
-        pred_len = getattr(predictor, "prediction_length", None)
-        if pred_len is not None and int(pred_len) != int(prediction_length):
-            raise DataException(
-                error_code=ErrorCode.VALIDATION_ERROR,
-                message="model_id 对应模型的 prediction_length 与请求不一致",
-                details={"model_prediction_length": int(pred_len), "request_prediction_length": prediction_length},
-            )
-
-        if hasattr(predictor, "quantile_levels"):
-            predictor.quantile_levels = quantiles  # type: ignore[attr-defined]
+        output_pred_df = _finalize_prediction_frame(
+            pred.reset_index(), parsed, prediction_length=prediction_length, quantiles=quantiles
+        )
 
-        model_saved_at, model_retention_days_left = _get_model_retention_info(model_dir)
-    else:
-        temp_dir_ctx = tempfile.TemporaryDirectory(prefix="ag-finetune-")
-        predictor_path = temp_dir_ctx.name
-        try:
-            predictor = TimeSeriesPredictor(
+        if on_predictions is not None:
+            on_predictions(output_pred_df, parsed.freq)
+        report_stage("metrics")
+        # 只有本次新训练的模型，其 fit 验证窗口才对应当前 history_data；model_id 加载的模型需重新预测
+        validation_pred_df = None
+        if metrics and model_id_used is None:
+            validation_pred_df = autogluon_validation_predictions(predictor)
+
+        def _metrics_with(metrics_predictor: Any) -> Dict[str, Any]:
+            predict_fn = share_holdout_predictions(
+                make_autogluon_predict_fn(metrics_predictor, TimeSeriesDataFrame),
                 prediction_length=prediction_length,
-                target="target",
-                eval_metric="WQL",
-                known_covariates_names=parsed.known_covariates_names or None,
-                freq=parsed.freq,
-                quantile_levels=quantiles,
-                path=predictor_path,
+                history_df=parsed.history_df,
+                validation_pred_df=validation_pred_df,
+                known_covariates_names=parsed.known_covariates_names if with_cov else None,
             )
-        except TypeError:
-            predictor = TimeSeriesPredictor(
+            return compute_forecast_metrics(
+                parsed=parsed,
+                metrics=metrics,
                 prediction_length=prediction_length,
-                target="target",
-                eval_metric="WQL",
-                known_covariates_names=parsed.known_covariates_names or None,
-                freq=parsed.freq,
+                with_cov=with_cov,
+                evaluate_fn=make_holdout_evaluate_fn(
+                    predict_fn,
+                    prediction_length=prediction_length,
+                    quantiles=quantiles,
+                    freq=parsed.freq,
+                    known_covariates_names=parsed.known_covariates_names if with_cov else None,
+                ),
+                predict_fn=predict_fn,
             )
-            if hasattr(predictor, "path"):
-                predictor.path = predictor_path  # type: ignore[attr-defined]
-            if hasattr(predictor, "quantile_levels"):
-                predictor.quantile_levels = quantiles  # type: ignore[attr-defined]
-
-        model_path = settings.CHRONOS_MODEL_PATH
-        if not model_path:
-            raise ModelException(
-                error_code=ErrorCode.MODEL_LOAD_FAILED,
-                message="未配置 Chronos-2 模型路径（CHRONOS_MODEL_PATH）",
-            )
-
-        min_series_len = int(parsed.history_df.groupby("item_id").size().min())
-        context_length_auto = min(int(context_length), min_series_len)
-
-        last_fit_exc: Optional[Exception] = None
-
-        for model_name in [settings.AG_CHRONOS_MODEL_NAME, "Chronos2", "Chronos"]:
-            if not model_name:
-                continue
-
-            hps: Dict[str, Any] = {
-                "ag_args": {"name_suffix": "_Finetuned"},
-                "model_path": model_path,
-                "fine_tune": True,
-                "device": selected_device,
-                "fine_tune_steps": int(finetune_num_steps),
-                "fine_tune_lr": float(finetune_learning_rate),
-                "fine_tune_batch_size": int(finetune_batch_size),
-            }
-            hps["context_length"] = int(context_length_auto)
-
-            try:
-                try:
-                    predictor.fit(
-                        train_data=train_data,
-                        enable_ensemble=False,
-                        hyperparameters={model_name: [hps]},
-                        num_val_windows=1,
-                    )
-                except TypeError:
-                    predictor.fit(
-                        train_data=train_data,
-                        enable_ensemble=False,
-                        hyperparameters={model_name: [hps]},
-                    )
-                break
-            except Exception as exc:
-                last_fit_exc = exc
-                logger.warning("AutoGluon finetune fit 失败，尝试下一个模型名: %s, reason=%s", model_name, exc)
-                continue
-        else:
-            m = _MIN_OBS_RE.search(str(last_fit_exc)) if last_fit_exc else None
-            if m:
-                required = int(m.group(1))
-                raise DataException(
-                    error_code=ErrorCode.VALIDATION_ERROR,
-                    message=(
-                        "时间序列过短，无法用于当前 prediction_length 的模型窗口构造；"
-                        "请提供更长的 history_data，或降低 prediction_length。"
-                    ),
-                    details={
-                        "required_min_observations": required,
-                        "min_series_length": min_series_len,
-                        "prediction_length": prediction_length,
-                    },
-                )
 
-            raise ModelException(
-                error_code=ErrorCode.MODEL_LOAD_FAILED,
-                message="AutoGluon Chronos 微调初始化失败（请检查 autogluon 版本与模型权重路径）",
-                details={"model_path": model_path, "reason": str(last_fit_exc) if last_fit_exc else None},
-            )
+        metrics_obj: Union[Dict[str, Any], DeferredMetrics, None] = None
+        if metrics_mode != "deferred":
+            metrics_obj = _metrics_with(predictor)
 
-    try:
-        pred = predictor.predict(
-            data=train_data,
-            known_covariates=known_covariates,
-        )
-    except Exception as exc:
-        raise ModelException(
-            error_code=ErrorCode.MODEL_PREDICT_FAILED,
-            message="模型预测失败",
-            details={"reason": str(exc)},
-        ) from exc
-
-    output_pred_df = pred.reset_index()
-    output_pred_df = replace_pred_timestamps_with_future(
-        output_pred_df,
-        parsed.history_df,
-        prediction_length=prediction_length,
-        freq=parsed.freq,
-    )
-    _, missing = resolve_quantile_columns(output_pred_df, quantiles=quantiles)
-    if missing:
-        raise ModelException(
-            error_code=ErrorCode.MODEL_PREDICT_FAILED,
-            message="模型未返回部分请求分位数，请调整 quantiles 或检查 AutoGluon/模型版本是否支持",
-            details={
-                "missing_quantiles": missing,
-                "available_columns": list(output_pred_df.columns),
-            },
-        )
-    output_pred_df = filter_prediction_df_quantiles(
-        output_pred_df, quantiles=quantiles, keep_mean=True, strict=True
-    )
-    if "timestamp" in output_pred_df.columns:
-        output_pred_df["timestamp"] = output_pred_df["timestamp"].astype(str)
-
-    metrics_obj: Optional[Dict[str, Any]] = None
-    requested = set(metrics)
-    if not requested:
-        metrics_obj = {"skipped": True, "reason": "no_metrics_requested"}
-    else:
-        metrics_out: Dict[str, Any] = {}
-        warnings: List[Dict[str, Any]] = []
-
-        eval_df = parsed.history_df
-        if parsed.test_df is not None and not parsed.test_df.empty:
-            eval_df = pd.concat([parsed.history_df, parsed.test_df], ignore_index=True)
-            eval_df = eval_df.sort_values(["item_id", "timestamp"]).reset_index(drop=True)
-
-        series_lengths = eval_df.groupby("item_id").size()
-        has_enough_length = (series_lengths >= (prediction_length + 1)).all()
-
-        eval_metrics_requested = requested.intersection({"WQL", "WAPE"})
-        if eval_metrics_requested and has_enough_length:
+        model_id_out: Optional[str] = model_id_used
+        if model_id_used is None and save_model:
+            report_stage("saving")
+            model_id_out = str(uuid.uuid4())
+            out_dir = Path(settings.FINETUNED_MODELS_DIR) / model_id_out
+            out_dir.mkdir(parents=True, exist_ok=False)
             try:
-                eval_tsdf = TimeSeriesDataFrame.from_data_frame(
-                    eval_df,
-                    id_column="item_id",
-                    timestamp_column="timestamp",
-                )
                 try:
-                    eval_res = predictor.evaluate(
-                        eval_tsdf,
-                        metrics=sorted(eval_metrics_requested),
-                    )
+                    predictor.save(str(out_dir))
                 except TypeError:
-                    eval_res = predictor.evaluate(eval_tsdf)
-                metrics_out.update(filter_metric_result(normalize_evaluate_result(eval_res), eval_metrics_requested))
+                    # Some versions only support predictor.save() with no args (save to predictor.path).
+                    predictor.save()
+                    src_dir = Path(getattr(predictor, "path", ""))
+                    if src_dir and src_dir.exists() and src_dir != out_dir:
+                        for child in src_dir.iterdir():
+                            shutil.move(str(child), str(out_dir / child.name))
+                model_saved_at, model_retention_days_left = _get_model_retention_info(out_dir)
             except Exception as exc:
-                warnings.append({"metric": "WQL/WAPE", "reason": "evaluate_failed", "detail": str(exc)})
-        elif eval_metrics_requested and not has_enough_length:
-            warnings.append(
-                {
-                    "metric": "WQL/WAPE",
-                    "reason": "time_series_too_short_for_evaluate",
-                    "min_series_length": int(series_lengths.min()) if not series_lengths.empty else 0,
-                    "required_min_length": int(prediction_length + 1),
-                }
-            )
-
-        custom_requested = requested.intersection({"IC", "IR"})
-        history_lengths = parsed.history_df.groupby("item_id").size()
-        required_len = int(prediction_length * 2)
-        eligible_items = history_lengths[history_lengths >= required_len].index.tolist()
-        if custom_requested and eligible_items:
-            dropped_items = set(history_lengths.index.tolist()) - set(eligible_items)
-            if dropped_items:
-                warnings.append(
-                    {
-                        "metric": "IC/IR",
-                        "reason": "series_too_short_dropped",
-                        "items": list(dropped_items),
-                        "required_min_length": required_len,
-                    }
+                raise ModelException(
+                    error_code=ErrorCode.MODEL_LOAD_FAILED,
+                    message="微调模型保存失败",
+                    details={"reason": str(exc)},
+                ) from exc
+
+        if metrics_mode == "deferred":
+            if model_id_out is not None:
+                # 已落盘的模型：任务执行时再从进程级缓存租用（保存可能已移走临时目录中的文件）
+                def _compute_from_saved(saved_id: str = model_id_out) -> Dict[str, Any]:
+                    with predictor_cache.lease(saved_id, quantiles=quantiles) as saved_predictor:
+                        return _metrics_with(saved_predictor)
+
+                metrics_obj = compute_or_defer_metrics(_compute_from_saved, metrics_mode=metrics_mode)
+            else:
+                # 未保存的模型只存在于临时目录：由 DeferredMetrics 接管，指标算完后删除
+                metrics_obj = compute_or_defer_metrics(
+                    lambda: _metrics_with(predictor), metrics_mode=metrics_mode, stack=stack
                 )
-            try:
-                history_for_metrics = parsed.history_df[parsed.history_df["item_id"].isin(eligible_items)].copy()
-                train_df, holdout_df = split_holdout_frame(history_for_metrics, prediction_length)
-                if train_df.empty or holdout_df.empty:
-                    warnings.append({"metric": "IC/IR", "reason": "holdout_split_empty"})
-                else:
-                    train_tsdf = TimeSeriesDataFrame.from_data_frame(
-                        train_df,
-                        id_column="item_id",
-                        timestamp_column="timestamp",
-                    )
 
-                    holdout_df = holdout_df.copy()
-                    holdout_df["timestamp"] = pd.to_datetime(holdout_df["timestamp"], errors="coerce")
-                    holdout_df = holdout_df.dropna(subset=["timestamp"])
-                    holdout_df["item_id"] = holdout_df["item_id"].astype(str)
-
-                    known_covariates_eval = None
-                    if with_cov and parsed.known_covariates_names:
-                        missing = [c for c in parsed.known_covariates_names if c not in holdout_df.columns]
-                        if missing:
-                            warnings.append(
-                                {"metric": "IC/IR", "reason": "holdout_missing_covariates", "missing": missing}
-                            )
-                        else:
-                            cov_df = holdout_df[["item_id", "timestamp", *parsed.known_covariates_names]].copy()
-                            if cov_df[parsed.known_covariates_names].isna().any().any():
-                                warnings.append({"metric": "IC/IR", "reason": "holdout_covariates_has_nan"})
-                            else:
-                                known_covariates_eval = TimeSeriesDataFrame.from_data_frame(
-                                    cov_df,
-                                    id_column="item_id",
-                                    timestamp_column="timestamp",
-                                )
-
-                    if with_cov and parsed.known_covariates_names and known_covariates_eval is None:
-                        pass
-                    else:
-                        holdout_pred = predictor.predict(
-                            data=train_tsdf,
-                            known_covariates=known_covariates_eval,
-                        )
-                        holdout_pred_df = holdout_pred.reset_index()
-                        holdout_pred_df = replace_pred_timestamps_with_holdout(holdout_pred_df, holdout_df)
-                        holdout_pred_df["timestamp"] = pd.to_datetime(
-                            holdout_pred_df["timestamp"], errors="coerce"
-                        )
-                        holdout_pred_df = holdout_pred_df.dropna(subset=["timestamp"])
-                        holdout_pred_df["item_id"] = holdout_pred_df["item_id"].astype(str)
-                        pred_col = select_prediction_column(holdout_pred_df)
-
-                        if pred_col is None:
-                            warnings.append({"metric": "IC/IR", "reason": "prediction_column_missing"})
-                        else:
-                            merged = merge_holdout_predictions(holdout_df, holdout_pred_df, pred_col)
-                            if merged.empty:
-                                warnings.append({"metric": "IC/IR", "reason": "holdout_merge_empty"})
-                            else:
-                                ic_ir = compute_ic_ir(
-                                    df=merged,
-                                    y_true_col="target",
-                                    y_pred_col=pred_col,
-                                )
-                                if "IC" in custom_requested:
-                                    metrics_out["IC"] = ic_ir.ic if ic_ir.ic is not None else 0.0
-                                    if ic_ir.ic is None:
-                                        warnings.append({"metric": "IC", "reason": "ic_undefined_set_zero"})
-                                if "IR" in custom_requested:
-                                    metrics_out["IR"] = ic_ir.ir if ic_ir.ir is not None else 0.0
-                                    if ic_ir.ir is None:
-                                        warnings.append({"metric": "IR", "reason": "ir_undefined_set_zero"})
-            except Exception as exc:
-                warnings.append({"metric": "IC/IR", "reason": "evaluate_failed", "detail": str(exc)})
-        elif custom_requested and not eligible_items:
-            warnings.append(
-                {
-                    "metric": "IC/IR",
-                    "reason": "time_series_too_short_for_evaluate",
-                    "min_series_length": int(history_lengths.min()) if not history_lengths.empty else 0,
-                    "required_min_length": required_len,
-                }
-            )
-            metrics_out["IC"] = 0.0
-            metrics_out["IR"] = 0.0
-
-        if custom_requested:
-            if "IC" in custom_requested and "IC" not in metrics_out:
-                metrics_out["IC"] = 0.0
-                warnings.append({"metric": "IC", "reason": "ic_missing_set_zero"})
-            if "IR" in custom_requested and "IR" not in metrics_out:
-                metrics_out["IR"] = 0.0
-                warnings.append({"metric": "IR", "reason": "ir_missing_set_zero"})
-
-        if metrics_out:
-            if warnings:
-                metrics_out["warnings"] = warnings
-            metrics_obj = metrics_out
-        else:
-            metrics_obj = {
-                "skipped": True,
-                "reason": "metrics_unavailable",
-                "detail": warnings,
-            }
-
-    model_id_out: Optional[str] = model_id_used
-    if model_id_used is None and save_model:
-        model_id_out = str(uuid.uuid4())
-        out_dir = Path(settings.FINETUNED_MODELS_DIR) / model_id_out
-        out_dir.mkdir(parents=True, exist_ok=False)
-        try:
-            try:
-                predictor.save(str(out_dir))
-            except TypeError:
-                # Some versions only support predictor.save() with no args (save to predictor.path).
-                predictor.save()
-                src_dir = Path(getattr(predictor, "path", ""))
-                if src_dir and src_dir.exists() and src_dir != out_dir:
-                    for child in src_dir.iterdir():
-                        shutil.move(str(child), str(out_dir / child.name))
-            model_saved_at, model_retention_days_left = _get_model_retention_info(out_dir)
-        except Exception as exc:
-            raise ModelException(
-                error_code=ErrorCode.MODEL_LOAD_FAILED,
-                message="微调模型保存失败",
-                details={"reason": str(exc)},
-            ) from exc
+    extra = {"model_used": "autogluon-chronos2-finetuned", "model_id": model_id_out}
+    deferred: Optional[DeferredMetrics] = None
+    if isinstance(metrics_obj, DeferredMetrics):
+        deferred, metrics_obj = metrics_obj, {"deferred": True}
+        if cache_key is not None:
+            # 指标算完后再写入结果缓存，命中时总是带完整指标
+            key, pred_df = cache_key, output_pred_df
+            deferred.add_done_callback(lambda m: forecast_result_cache.put(key, pred_df, m, extra))
+    elif cache_key is not None:
+        forecast_result_cache.put(cache_key, output_pred_df, metrics_obj, extra)
 
     result: Dict[str, Any] = {
-        "predictions": output_pred_df.to_dict(orient="records"),
+        "predictions": (
+            format_predictions(output_pred_df, output_format=output_format, freq=parsed.freq)
+            if on_predictions is None
+            else []
+        ),
         "prediction_shape": list(output_pred_df.shape),
         "prediction_length": prediction_length,
         "quantiles": quantiles,
         "metrics": metrics_obj,
         "model_used": "autogluon-chronos2-finetuned",
         "generated_at": pd.Timestamp.now().isoformat(),
+        "cached": False,
     }
     if model_id_out is not None:
         result["model_id"] = model_id_out
     if model_saved_at is not None:
         result["model_saved_at"] = model_saved_at
         result["model_retention_days_left"] = model_retention_days_left
-    if temp_dir_ctx is not None:
-        temp_dir_ctx.cleanup()
+    if deferred is not None:
+        result["deferred_metrics"] = deferred
     return result
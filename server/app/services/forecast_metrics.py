@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import logging
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.exceptions import DataException, ErrorCode
+from app.services.custom_metrics import compute_ic_ir
+from app.services.job_context import report_stage
+from app.services.job_queue import job_queue
+from app.services.metric_engine import (
+    EVAL_METRICS,
+    compute_holdout_metrics,
+    metric_result_keys,
+    seasonal_period,
+)
+from app.services.metrics_helpers import (
+    filter_metric_result,
+    merge_holdout_predictions,
+    replace_pred_timestamps_with_holdout,
+    select_prediction_column,
+    split_holdout_frame,
+)
+from app.services.process import ParsedMarkdownInput
+
+
+logger = logging.getLogger(__name__)
+
+# evaluate_fn(eval_df, metric_names) -> 原始指标 dict（WQL/WAPE/MASE/COVERAGE 及细分）
+EvaluateFn = Callable[[pd.DataFrame, List[str]], Dict[str, Any]]
+# predict_fn(train_df, known_covariates_df) -> reset_index 后的预测 DataFrame
+PredictFn = Callable[[pd.DataFrame, Optional[pd.DataFrame]], pd.DataFrame]
+
+
+# inline：指标算完后随预测一起返回；deferred：预测先返回，指标作为临时任务在任务队列中计算
+METRICS_MODES = ("inline", "deferred")
+
+
+def validate_metrics_mode(metrics_mode: Optional[str]) -> str:
+    mode = (metrics_mode or "inline").strip().lower()
+    if mode not in METRICS_MODES:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="metrics_mode 仅支持 inline / deferred",
+            details={"metrics_mode": metrics_mode, "supported": list(METRICS_MODES)},
+        )
+    return mode
+
+
+class DeferredMetrics:
+    """
+    推迟计算的指标（metrics_mode=deferred）：作为任务函数在任务队列中调用，返回 {"metrics": ...}。
+
+    cleanup 接管预测阶段打开的资源（AutoGluon 临时 predictor 目录等），指标算完或任务在排队中被取消（discard）时释放；
+    add_done_callback 登记指标算完后的回调（写结果缓存等）。
+    """
+
+    def __init__(self, compute: Callable[[], Dict[str, Any]], *, cleanup: Optional[ExitStack] = None) -> None:
+        self._compute = compute
+        self._cleanup = cleanup if cleanup is not None else ExitStack()
+        self._done_callbacks: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_done_callback(self, fn: Callable[[Dict[str, Any]], None]) -> None:
+        self._done_callbacks.append(fn)
+
+    def __call__(self) -> Dict[str, Any]:
+        report_stage("metrics")
+        try:
+            metrics_obj = self._compute()
+        finally:
+            self.discard()
+        for fn in self._done_callbacks:
+            fn(metrics_obj)
+        return {"metrics": metrics_obj}
+
+    def discard(self) -> None:
+        self._cleanup.close()
+
+
+def compute_or_defer_metrics(
+    compute: Callable[[], Dict[str, Any]],
+    *,
+    metrics_mode: str,
+    stack: Optional[ExitStack] = None,
+) -> Union[Dict[str, Any], DeferredMetrics]:
+    """
+    inline 时直接计算；deferred 时返回 DeferredMetrics，并从 stack 中接管仍需保留到指标算完的资源。
+    """
+    if metrics_mode != "deferred":
+        return compute()
+    return DeferredMetrics(compute, cleanup=stack.pop_all() if stack is not None else None)
+
+
+def attach_deferred_metrics(result: Dict[str, Any], *, source: str) -> Dict[str, Any]:
+    """
+    路由层（事件循环线程）调用：把结果中的 DeferredMetrics 提交为临时任务，metrics 替换为任务句柄。
+    """
+    deferred = result.pop("deferred_metrics", None)
+    if deferred is None:
+        return result
+    record = job_queue.submit("metrics", deferred, persist=False, params={"source": source})
+    result["metrics"] = {"deferred": True, "job_id": record.job_id, "status_url": f"/jobs/{record.job_id}"}
+    return result
+
+
+def build_eval_frame(parsed: ParsedMarkdownInput) -> pd.DataFrame:
+    """
+    WQL/WAPE 的评估数据：history_data（+ test_data，若提供）。
+    """
+    eval_df = parsed.history_df
+    if parsed.test_df is not None and not parsed.test_df.empty:
+        eval_df = pd.concat([parsed.history_df, parsed.test_df], ignore_index=True)
+        eval_df = eval_df.sort_values(["item_id", "timestamp"]).reset_index(drop=True)
+    return eval_df
+
+
+def share_holdout_predictions(
+    predict_fn: PredictFn,
+    *,
+    prediction_length: int,
+    history_df: Optional[pd.DataFrame] = None,
+    validation_pred_df: Optional[pd.DataFrame] = None,
+    known_covariates_names: Optional[List[str]] = None,
+) -> PredictFn:
+    """
+    包装 predict_fn，使同一请求内各指标共用 holdout 预测：按切分（各序列训练段的末尾时间点 + 是否带已知协变量）记忆预测结果，
+    WQL/WAPE/MASE/COVERAGE 与 IC/IR 的切分相同（未提供 test_data）时只预测一次。
+
+    validation_pred_df 为 fit（num_val_windows=1）时在 history_df 最后 prediction_length 步上的验证预测，
+    提供时预先写入，holdout 预测直接复用，不再调用模型。
+    """
+    # 请求内的普通 dict：同一请求的各切分都来自同一份输入，训练段末尾时间点相同即为同一切分，无需哈希整段数据
+    memo: Dict[Any, pd.DataFrame] = {}
+
+    if validation_pred_df is not None and history_df is not None:
+        train_df, holdout_df = split_holdout_frame(history_df, prediction_length)
+        if _covers_holdout(validation_pred_df, holdout_df):
+            memo[_split_key(train_df, bool(known_covariates_names))] = validation_pred_df
+            logger.info(
+                "复用 fit 阶段验证窗口预测计算 holdout 指标: series=%d", validation_pred_df["item_id"].nunique()
+            )
+
+    def _predict(train_df: pd.DataFrame, known_cov_df: Optional[pd.DataFrame]) -> pd.DataFrame:
+        key = _split_key(train_df, known_cov_df is not None)
+        if key not in memo:
+            memo[key] = predict_fn(train_df, known_cov_df)
+        return memo[key]
+
+    return _predict
+
+
+def _split_key(train_df: pd.DataFrame, with_known_cov: bool) -> Any:
+    last = train_df.groupby(train_df["item_id"].astype(str), sort=True)["timestamp"].max()
+    return len(train_df), tuple(zip(last.index, last.astype(str))), with_known_cov
+
+
+def _covers_holdout(pred_df: pd.DataFrame, holdout_df: pd.DataFrame) -> bool:
+    """
+    验证窗口预测是否与 holdout 段逐行对应（item_id + timestamp 完全一致）。
+    """
+    if pred_df.empty or not {"item_id", "timestamp"}.issubset(pred_df.columns) or len(pred_df) != len(holdout_df):
+        return False
+    pred_keys = pd.MultiIndex.from_arrays(
+        [pred_df["item_id"].astype(str), pd.to_datetime(pred_df["timestamp"], errors="coerce")]
+    )
+    holdout_keys = pd.MultiIndex.from_arrays(
+        [holdout_df["item_id"].astype(str), pd.to_datetime(holdout_df["timestamp"], errors="coerce")]
+    )
+    return bool(pred_keys.sort_values().equals(holdout_keys.sort_values()))
+
+
+def make_holdout_evaluate_fn(
+    predict_fn: PredictFn,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    freq: Optional[str],
+    known_covariates_names: Optional[List[str]] = None,
+) -> EvaluateFn:
+    """
+    evaluate_fn 的通用实现：留出每个 item 最后 prediction_length 步，predict_fn 预测一次后由 metric_engine 计算全部指标。
+
+    known_covariates_names 非空时从 holdout 段取已知协变量（仅 with_cov 时传入）。
+    """
+
+    def _evaluate(eval_df: pd.DataFrame, metric_names: List[str]) -> Dict[str, Any]:
+        train_df, holdout_df = split_holdout_frame(eval_df, prediction_length)
+        known_cov_df = None
+        if known_covariates_names:
+            known_cov_df = holdout_df[["item_id", "timestamp", *known_covariates_names]]
+        holdout_pred_df = replace_pred_timestamps_with_holdout(predict_fn(train_df, known_cov_df), holdout_df)
+        return compute_holdout_metrics(
+            holdout_df,
+            holdout_pred_df,
+            quantiles=quantiles,
+            metrics=metric_names,
+            train_df=train_df,
+            season_length=seasonal_period(freq),
+            by_item=holdout_df["item_id"].nunique() <= settings.METRICS_BY_ITEM_MAX_ITEMS,
+        )
+
+    return _evaluate
+
+
+def compute_forecast_metrics(
+    *,
+    parsed: ParsedMarkdownInput,
+    metrics: List[str],
+    prediction_length: int,
+    with_cov: bool,
+    evaluate_fn: EvaluateFn,
+    predict_fn: PredictFn,
+) -> Dict[str, Any]:
+    """
+    计算 WQL/WAPE/MASE/COVERAGE/IC/IR 并组装为接口返回的 metrics 对象。
+
+    模型相关的两步通过回调注入，zeroshot / finetune 共用同一套切分、告警与兜底逻辑：
+    - evaluate_fn：在 eval_df 上留出最后 prediction_length 步计算 WQL/WAPE/MASE/COVERAGE
+    - predict_fn：对 holdout 训练段做预测，用于 IC/IR
+
+    两个回调应基于同一个 share_holdout_predictions 包装后的 predict_fn，holdout 预测只做一次。
+    """
+    requested: Set[str] = set(metrics)
+    if not requested:
+        return {"skipped": True, "reason": "no_metrics_requested"}
+
+    metrics_out: Dict[str, Any] = {}
+    warnings: List[Dict[str, Any]] = []
+
+    # evaluate_fn holds out the last prediction_length steps of each series.
+    # If user provides test_data, concatenate to history_data for a more faithful evaluation.
+    eval_df = build_eval_frame(parsed)
+
+    series_lengths = eval_df.groupby("item_id").size()
+    has_enough_length = (series_lengths >= (prediction_length + 1)).all()
+
+    # WQL / WAPE / MASE / COVERAGE
+    eval_metrics_requested = requested.intersection(EVAL_METRICS)
+    eval_label = "/".join(m for m in EVAL_METRICS if m in eval_metrics_requested)
+    if eval_metrics_requested and has_enough_length:
+        try:
+            eval_res = evaluate_fn(eval_df, sorted(eval_metrics_requested))
+            metrics_out.update(filter_metric_result(eval_res, metric_result_keys(eval_metrics_requested)))
+            for name in sorted(eval_metrics_requested - set(metrics_out)):
+                warnings.append({"metric": name, "reason": "metric_undefined"})
+        except Exception as exc:
+            warnings.append({"metric": eval_label, "reason": "evaluate_failed", "detail": str(exc)})
+    elif eval_metrics_requested and not has_enough_length:
+        warnings.append(
+            {
+                "metric": eval_label,
+                "reason": "time_series_too_short_for_evaluate",
+                "min_series_length": int(series_lengths.min()) if not series_lengths.empty else 0,
+                "required_min_length": int(prediction_length + 1),
+            }
+        )
+
+    # IC / IR (custom holdout split on history_data only)
+    custom_requested = requested.intersection({"IC", "IR"})
+    history_lengths = parsed.history_df.groupby("item_id").size()
+    required_len = int(prediction_length * 2)
+    eligible_items = history_lengths[history_lengths >= required_len].index.tolist()
+    if custom_requested and eligible_items:
+        dropped_items = set(history_lengths.index.tolist()) - set(eligible_items)
+        if dropped_items:
+            warnings.append(
+                {
+                    "metric": "IC/IR",
+                    "reason": "series_too_short_dropped",
+                    "items": list(dropped_items),
+                    "required_min_length": required_len,
+                }
+            )
+        try:
+            history_for_metrics = parsed.history_df[parsed.history_df["item_id"].isin(eligible_items)].copy()
+            train_df, holdout_df = split_holdout_frame(history_for_metrics, prediction_length)
+            if train_df.empty or holdout_df.empty:
+                warnings.append({"metric": "IC/IR", "reason": "holdout_split_empty"})
+            else:
+                holdout_df = holdout_df.copy()
+                holdout_df["timestamp"] = pd.to_datetime(holdout_df["timestamp"], errors="coerce")
+                holdout_df = holdout_df.dropna(subset=["timestamp"])
+                holdout_df["item_id"] = holdout_df["item_id"].astype(str)
+
+                known_covariates_eval: Optional[pd.DataFrame] = None
+                if with_cov and parsed.known_covariates_names:
+                    missing = [c for c in parsed.known_covariates_names if c not in holdout_df.columns]
+                    if missing:
+                        warnings.append(
+                            {"metric": "IC/IR", "reason": "holdout_missing_covariates", "missing": missing}
+                        )
+                    else:
+                        cov_df = holdout_df[["item_id", "timestamp", *parsed.known_covariates_names]].copy()
+                        if cov_df[parsed.known_covariates_names].isna().any().any():
+                            warnings.append({"metric": "IC/IR", "reason": "holdout_covariates_has_nan"})
+                        else:
+                            known_covariates_eval = cov_df
+
+                if not (with_cov and parsed.known_covariates_names and known_covariates_eval is None):
+                    holdout_pred_df = predict_fn(train_df, known_covariates_eval)
+                    holdout_pred_df = replace_pred_timestamps_with_holdout(holdout_pred_df, holdout_df)
+                    holdout_pred_df["timestamp"] = pd.to_datetime(holdout_pred_df["timestamp"], errors="coerce")
+                    holdout_pred_df = holdout_pred_df.dropna(subset=["timestamp"])
+                    holdout_pred_df["item_id"] = holdout_pred_df["item_id"].astype(str)
+                    pred_col = select_prediction_column(holdout_pred_df)
+
+                    if pred_col is None:
+                        warnings.append({"metric": "IC/IR", "reason": "prediction_column_missing"})
+                    else:
+                        merged = merge_holdout_predictions(holdout_df, holdout_pred_df, pred_col)
+                        if merged.empty:
+                            warnings.append({"metric": "IC/IR", "reason": "holdout_merge_empty"})
+                        else:
+                            ic_ir = compute_ic_ir(
+                                df=merged,
+                                y_true_col="target",
+                                y_pred_col=pred_col,
+                            )
+                            if "IC" in custom_requested:
+                                metrics_out["IC"] = ic_ir.ic if ic_ir.ic is not None else 0.0
+                                if ic_ir.ic is None:
+                                    warnings.append({"metric": "IC", "reason": "ic_undefined_set_zero"})
+                                if ic_ir.ic_by_horizon:
+                                    metrics_out["IC_by_horizon"] = ic_ir.ic_by_horizon
+                            if "IR" in custom_requested:
+                                metrics_out["IR"] = ic_ir.ir if ic_ir.ir is not None else 0.0
+                                if ic_ir.ir is None:
+                                    warnings.append({"metric": "IR", "reason": "ir_undefined_set_zero"})
+        except Exception as exc:
+            warnings.append({"metric": "IC/IR", "reason": "evaluate_failed", "detail": str(exc)})
+    elif custom_requested and not eligible_items:
+        warnings.append(
+            {
+                "metric": "IC/IR",
+                "reason": "time_series_too_short_for_evaluate",
+                "min_series_length": int(history_lengths.min()) if not history_lengths.empty else 0,
+                "required_min_length": required_len,
+            }
+        )
+        metrics_out["IC"] = 0.0
+        metrics_out["IR"] = 0.0
+
+    if custom_requested:
+        if "IC" in custom_requested and "IC" not in metrics_out:
+            metrics_out["IC"] = 0.0
+            warnings.append({"metric": "IC", "reason": "ic_missing_set_zero"})
+        if "IR" in custom_requested and "IR" not in metrics_out:
+            metrics_out["IR"] = 0.0
+            warnings.append({"metric": "IR", "reason": "ir_missing_set_zero"})
+
+    if metrics_out:
+        if warnings:
+            metrics_out["warnings"] = warnings
+        return metrics_out
+    return {
+        "skipped": True,
+        "reason": "metrics_unavailable",
+        "detail": warnings,
+    }
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from app.core.exceptions import DataException, ErrorCode
+
+
+# predictions 的输出格式：records 为逐行记录（默认），columnar 为每个 item_id 一个对象 + 并列数组
+PREDICTION_FORMATS = ("records", "columnar")
+# 内部格式：predictions 保留为 DataFrame，供路由直接编码为 Arrow / Parquet（不对外开放、不可持久化）
+FRAME_FORMAT = "frame"
+
+# 预测结果后处理完成、计算指标之前的回调 (pred_df, freq)，流式接口借此提前发出预测
+PredictionsCallback = Callable[[pd.DataFrame, str], None]
+
 
 def _quantile_to_candidate_colnames(q: float) -> List[str]:
     """
@@ -132,3 +144,52 @@ def filter_prediction_df_quantiles(
         out = out.rename(columns=rename_map)
 
     return out
+
+
+def validate_output_format(output_format: Optional[str], *, allow_frame: bool = False) -> str:
+    fmt = (output_format or "records").strip().lower()
+    if fmt not in PREDICTION_FORMATS and not (allow_frame and fmt == FRAME_FORMAT):
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="format 仅支持 records / columnar",
+            details={"format": output_format, "supported": list(PREDICTION_FORMATS)},
+        )
+    return fmt
+
+
+def iter_columnar_predictions(pred_df: pd.DataFrame, *, freq: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    预测结果 -> 逐个 item_id 产出对象：`start`（首个时间戳）、`freq` 与 mean / 各分位数的并列数组。
+
+    直接从 DataFrame 的 numpy 数组按 item 切片，不逐行构造 dict；item 顺序与行内顺序同 records 格式。
+    """
+    if pred_df.empty:
+        return
+    value_cols = [c for c in pred_df.columns if c not in ("item_id", "timestamp")]
+    item_codes, item_ids = pd.factorize(pred_df["item_id"], sort=False)
+    order = np.argsort(item_codes, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(item_codes[order]) != 0])
+    ends = np.r_[starts[1:], len(order)]
+    timestamps = pred_df["timestamp"].to_numpy()[order]
+    values = pred_df[value_cols].to_numpy(dtype=float)[order]
+
+    for item_id, start, end in zip(item_ids.tolist(), starts.tolist(), ends.tolist()):
+        obj: Dict[str, Any] = {"item_id": item_id, "start": timestamps[start]}
+        if freq:
+            obj["freq"] = freq
+        obj.update(zip(value_cols, values[start:end].T.tolist()))
+        yield obj
+
+
+def predictions_to_columnar(pred_df: pd.DataFrame, *, freq: Optional[str] = None) -> List[Dict[str, Any]]:
+    return list(iter_columnar_predictions(pred_df, freq=freq))
+
+
+def format_predictions(
+    pred_df: pd.DataFrame, *, output_format: str = "records", freq: Optional[str] = None
+) -> Any:
+    if output_format == FRAME_FORMAT:
+        return pred_df
+    if output_format == "columnar":
+        return predictions_to_columnar(pred_df, freq=freq)
+    return pred_df.to_dict(orient="records")
@@ -0,0 +1,114 @@
+"""
+NDJSON 流式预测响应。
+
+推理仍在 inference_executor 的有界线程池中执行；预测后处理完成（计算指标之前）即回调到事件循环，
+逐个 item_id 写出一行 `{"type": "prediction", ...}`，指标算完后再追加一行 `{"type": "metrics", ...}`。
+首字节不必等待指标，预测结果也不再整体转成 Python dict 列表。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Tuple
+
+import pandas as pd
+
+from app.core.exceptions import BaseAppException, ErrorCode
+from app.services.forecast_output import iter_columnar_predictions
+from app.services.inference_executor import inference_executor
+
+try:
+    import orjson as _orjson  # type: ignore
+except Exception:  # 可选依赖：未安装时使用标准库 json
+    _orjson = None
+
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# 多行合并为一个响应分块写出，避免每个 item 一次 ASGI send
+_CHUNK_BYTES = 64 * 1024
+
+
+def ndjson_line(obj: Dict[str, Any]) -> bytes:
+    if _orjson is not None:
+        return _orjson.dumps(obj, default=str) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+async def open_forecast_stream(func: Callable[..., Dict[str, Any]], *args: Any, **kwargs: Any) -> AsyncIterator[bytes]:
+    """
+    提交推理并等待预测结果就绪，返回 NDJSON 分块的异步迭代器。
+
+    func 需支持 on_predictions 回调（zeroshot / finetune 的 *_from_upload）。发出预测之前的异常
+    （参数校验、解析失败、队列已满、模型预测失败等）在这里直接抛出，由全局异常处理器返回标准错误响应；
+    之后的异常（例如指标阶段）已无法改变状态码，改为写出一行 `{"type": "error", ...}`。
+    """
+    loop = asyncio.get_running_loop()
+    ready: "asyncio.Future[Tuple[pd.DataFrame, str]]" = loop.create_future()
+
+    def _set_ready(value: Tuple[pd.DataFrame, str]) -> None:
+        if not ready.done():
+            ready.set_result(value)
+
+    def _on_predictions(pred_df: pd.DataFrame, freq: str) -> None:
+        # 在推理线程中调用，切回事件循环线程设置结果
+        loop.call_soon_threadsafe(_set_ready, (pred_df, freq))
+
+    task = asyncio.ensure_future(inference_executor.run(func, *args, on_predictions=_on_predictions, **kwargs))
+    await asyncio.wait({task, ready}, return_when=asyncio.FIRST_COMPLETED)
+    if not ready.done():
+        try:
+            task.result()
+        finally:
+            ready.cancel()
+    return _stream_lines(ready, task)
+
+
+async def _stream_lines(
+    ready: "asyncio.Future[Tuple[pd.DataFrame, str]]",
+    task: "asyncio.Future[Dict[str, Any]]",
+) -> AsyncIterator[bytes]:
+    try:
+        if ready.done() and not ready.cancelled():
+            pred_df, freq = ready.result()
+            buffer = bytearray()
+            for obj in iter_columnar_predictions(pred_df, freq=freq):
+                buffer += ndjson_line({"type": "prediction", **obj})
+                if len(buffer) >= _CHUNK_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+                    # 让出事件循环，避免大批量序列化阻塞其他请求
+                    await asyncio.sleep(0)
+            if buffer:
+                yield bytes(buffer)
+            del pred_df
+
+        try:
+            result = await task
+        except BaseAppException as exc:
+            logger.warning("流式预测失败 [%s]: %s, details=%s", exc.error_code.value, exc.message, exc.details)
+            yield ndjson_line({"type": "error", **exc.to_dict()})
+            return
+        except Exception as exc:
+            logger.exception("流式预测失败")
+            yield ndjson_line(
+                {
+                    "type": "error",
+                    "success": False,
+                    "error_code": ErrorCode.INTERNAL_ERROR.value,
+                    "message": "服务器内部错误",
+                    "details": {"reason": str(exc)},
+                }
+            )
+            return
+
+        trailer = {key: value for key, value in result.items() if key != "predictions"}
+        yield ndjson_line({"type": "metrics", **trailer})
+    finally:
+        if not task.done():
+            # 客户端提前断开：推理线程无法中断，结束后取走结果，避免未检索异常的告警
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.exceptions import ServiceBusyException
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 当前线程持有运行名额的执行器（仅在执行器线程内、持有名额期间非空）
+_slot_owner = threading.local()
+
+
+class InferenceExecutor:
+    """
+    同步推理接口专用的有界执行器。
+
+    - 最多 max_concurrency 个推理同时运行，另有 max_queue 个可排队等待
+    - 超出上限时立即抛出 ServiceBusyException（503 + Retry-After），不再无限堆积请求
+    - 占用计数跟随线程内的实际执行：客户端断开后，已开始的推理仍计入占用直至结束
+    - 每个已接收的请求都有自己的线程，运行名额由信号量控制；阻塞等待其他请求的任务（如微批合并）
+      可通过 yield_inference_slot() 暂时让出名额，等待期间不占用 max_concurrency
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, retry_after_seconds: int) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.retry_after_seconds = int(retry_after_seconds)
+        self._pool = ThreadPoolExecutor(max_workers=self.capacity, thread_name_prefix="inference")
+        self._slots = threading.Semaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._running = 0
+        self._yielded = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_concurrency + self.max_queue
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._inflight >= self.capacity:
+                self.rejected += 1
+                logger.warning("推理队列已满，拒绝请求: inflight=%d, capacity=%d", self._inflight, self.capacity)
+                raise ServiceBusyException(
+                    retry_after_seconds=self.retry_after_seconds,
+                    details={"max_concurrency": self.max_concurrency, "max_queue": self.max_queue},
+                )
+            self._inflight += 1
+
+    def _release(self, _: Any = None) -> None:
+        with self._lock:
+            self._inflight -= 1
+
+    def _take_slot(self) -> None:
+        self._slots.acquire()
+        with self._lock:
+            self._running += 1
+
+    def _give_slot(self) -> None:
+        with self._lock:
+            self._running -= 1
+        self._slots.release()
+
+    def _run_in_slot(self, fn: Callable[[], T]) -> T:
+        self._take_slot()
+        _slot_owner.executor = self
+        try:
+            return fn()
+        finally:
+            _slot_owner.executor = None
+            self._give_slot()
+
+    @contextmanager
+    def _yielded_slot(self) -> Iterator[None]:
+        with self._lock:
+            self._yielded += 1
+        self._give_slot()
+        _slot_owner.executor = None
+        try:
+            yield
+        finally:
+            self._take_slot()
+            _slot_owner.executor = self
+            with self._lock:
+                self._yielded -= 1
+
+    def submit(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        self._acquire()
+        try:
+            future = self._pool.submit(self._run_in_slot, functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight, running, yielded = self._inflight, self._running, self._yielded
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "inflight": inflight,
+            "running": running,
+            "yielded": yielded,
+            "queued": max(0, inflight - running - yielded),
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def yield_inference_slot() -> Iterator[None]:
+    """
+    在执行器线程中阻塞等待时让出运行名额，退出时重新排队取回名额；不在执行器线程中调用时为空操作。
+    """
+    executor: Optional[InferenceExecutor] = getattr(_slot_owner, "executor", None)
+    if executor is None:
+        yield
+        return
+    with executor._yielded_slot():
+        yield
+
+
+inference_executor = InferenceExecutor(
+    max_concurrency=settings.INFERENCE_MAX_CONCURRENCY,
+    max_queue=settings.INFERENCE_MAX_QUEUE,
+    retry_after_seconds=settings.INFERENCE_RETRY_AFTER_SECONDS,
+)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class JobCancelled(Exception):
+    """
+    任务被取消或超时后，由 check_cancelled 抛出；reason 为 cancelled / timed_out。
+    """
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class JobContext:
+    """
+    单个异步任务的运行上下文：取消信号、截止时间与进度。
+
+    任务函数运行在工作线程中，通过 current_job() / report_stage() / check_cancelled()
+    协作式地汇报进度并响应取消；不在任务中调用时这些函数均为空操作。
+    """
+
+    def __init__(self, job_id: str, timeout_seconds: Optional[float] = None) -> None:
+        self.job_id = job_id
+        self.started = time.monotonic()
+        self.deadline = self.started + float(timeout_seconds) if timeout_seconds else None
+        self._reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self.stage: Optional[str] = None
+        self.step: Optional[int] = None
+        self.total_steps: Optional[int] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        with self._lock:
+            if self._reason is None:
+                self._reason = reason
+
+    @property
+    def cancel_reason(self) -> Optional[str]:
+        if self._reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("timed_out")
+        return self._reason
+
+    def should_stop(self) -> bool:
+        return self.cancel_reason is not None
+
+    def remaining_seconds(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        reason = self.cancel_reason
+        if reason is not None:
+            raise JobCancelled(reason)
+
+    def set_stage(self, stage: str) -> None:
+        self.stage = stage
+        self.step = None
+        self.total_steps = None
+
+    def set_step(self, step: int, total_steps: Optional[int] = None) -> None:
+        self.step = int(step)
+        if total_steps:
+            self.total_steps = int(total_steps)
+
+    def update_progress(self, progress: Dict[str, Any]) -> None:
+        """
+        合并来自工作进程的进度快照（stage / step / total_steps）。
+        """
+        self.stage = progress.get("stage", self.stage)
+        self.step = progress.get("step", self.step)
+        self.total_steps = progress.get("total_steps", self.total_steps)
+
+    def progress(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "stage": self.stage,
+            "elapsed_seconds": round(time.monotonic() - self.started, 1),
+        }
+        if self.step is not None:
+            out["step"] = self.step
+        if self.total_steps is not None:
+            out["total_steps"] = self.total_steps
+        remaining = self.remaining_seconds()
+        if remaining is not None:
+            out["remaining_seconds"] = round(remaining, 1)
+        return out
+
+
+_current_job: contextvars.ContextVar[Optional[JobContext]] = contextvars.ContextVar("current_job", default=None)
+
+
+def current_job() -> Optional[JobContext]:
+    return _current_job.get()
+
+
+def bind_job(ctx: Optional[JobContext]) -> contextvars.Token:
+    return _current_job.set(ctx)
+
+
+def unbind_job(token: contextvars.Token) -> None:
+    _current_job.reset(token)
+
+
+def report_stage(stage: str) -> None:
+    """
+    进入新阶段前检查取消信号，再更新进度。
+    """
+    ctx = _current_job.get()
+    if ctx is None:
+        return
+    ctx.check()
+    ctx.set_stage(stage)
+
+
+def check_cancelled() -> None:
+    ctx = _current_job.get()
+    if ctx is not None:
+        ctx.check()
@@ -1,16 +1,33 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
 import logging
+import pickle
 import time
 import traceback
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+from app.core.exceptions import DataException, ErrorCode
+from app.services.job_context import JobCancelled, JobContext, bind_job, unbind_job
+from app.services.job_store import JobStore
+from app.services.process_pool import ProcessWorkerPool
 
 logger = logging.getLogger(__name__)
 
 
+# 优先级通道：数值越小越先执行；等待时间会逐步抬高低优先级任务，避免饿死
+PRIORITY_LANES: Dict[str, int] = {"interactive": 0, "batch": 1}
+DEFAULT_PRIORITY_BY_KIND: Dict[str, str] = {"zeroshot": "interactive", "finetune": "batch", "metrics": "batch"}
+# 可以交给工作进程执行的任务类型：func 与参数必须可 pickle，且不依赖 API 进程内的常驻状态。
+# metrics（DeferredMetrics 闭包）无法 pickle；zeroshot 在每个工作进程各加载一份常驻引擎，由工作进程回收限制内存
+PROCESS_CAPABLE_KINDS = frozenset({"finetune", "zeroshot"})
+
+
 @dataclass
 class JobRecord:
     job_id: str
@@ -22,59 +39,455 @@ class JobRecord:
     result: Optional[Any] = None
     error: Optional[Dict[str, Any]] = None
     params: Dict[str, Any] = field(default_factory=dict)
+    priority: str = "batch"
+    progress: Dict[str, Any] = field(default_factory=dict)
+    timeout_seconds: Optional[float] = None
+
+
+@dataclass
+class _PendingJob:
+    job_id: str
+    kind: str
+    priority: str
+    func: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    enqueued_at: float
+    seq: int
 
 
 class JobQueue:
-    def __init__(self) -> None:
-        self.queue: asyncio.Queue[Tuple[str, Callable[..., Any], tuple, dict]] = asyncio.Queue()
+    """
+    异步任务队列：N 个 worker 协程 + 按任务类型的并发上限 + 优先级通道。
+
+    - 调度时只考虑「所属类型仍有并发余量」的任务，长时间的 finetune 不会占满全部 worker
+    - 在可运行任务中选择有效优先级最高者：通道优先级 - 等待秒数 / aging_seconds
+      （interactive 任务可以插队，但 batch 任务等待越久越靠前，不会被饿死）
+    - 任务记录持久化在 JobStore 中：内存里只保留排队 / 运行中的任务，结束后的结果从存储读取并按 TTL 淘汰
+    - 存储写入（含 payload 的 pickle）由单个写线程按提交顺序执行，不阻塞事件循环
+    - 重启后，上次未完成且已注册 handler 的任务会重新入队
+    """
+
+    def __init__(
+        self,
+        *,
+        num_workers: int = 1,
+        kind_limits: Optional[Dict[str, int]] = None,
+        aging_seconds: float = 60.0,
+        kind_timeouts: Optional[Dict[str, float]] = None,
+        store: Optional[JobStore] = None,
+        process_pool: Optional[ProcessWorkerPool] = None,
+        process_kinds: Optional[Iterable[str]] = None,
+        result_ttl_seconds: float = 24 * 3600,
+        purge_interval_seconds: float = 600,
+    ) -> None:
+        self.num_workers = max(1, int(num_workers))
+        self.kind_limits: Dict[str, int] = {k: max(1, int(v)) for k, v in (kind_limits or {}).items()}
+        self.aging_seconds = max(1e-6, float(aging_seconds))
+        # 每种任务的默认墙钟超时（秒），<=0 表示不限制
+        self.kind_timeouts: Dict[str, float] = {k: float(v) for k, v in (kind_timeouts or {}).items()}
+        self.store = store if store is not None else JobStore("")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        # 可选的多进程执行后端：process_kinds 中的任务在工作进程中运行，其余仍走线程
+        self.process_pool = process_pool
+        self.process_kinds: Set[str] = set(process_kinds or ())
+        unsupported = sorted(self.process_kinds - PROCESS_CAPABLE_KINDS)
+        if unsupported:
+            # 全局 job_queue 在导入时构造：配置错误只告警，这些类型仍在线程中执行
+            if process_pool is not None:
+                logger.warning(
+                    "JOB_PROCESS_KINDS 包含不能在工作进程中执行的任务类型，已忽略: %s（仅支持 %s）",
+                    unsupported,
+                    sorted(PROCESS_CAPABLE_KINDS),
+                )
+            self.process_kinds -= set(unsupported)
+        self.result_ttl_seconds = float(result_ttl_seconds)
+        self.purge_interval_seconds = max(1.0, float(purge_interval_seconds))
+        # 仅保留排队 / 运行中的任务；结束后的记录以 store 为准
         self.jobs: Dict[str, JobRecord] = {}
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._pending: List[_PendingJob] = []
+        self._contexts: Dict[str, JobContext] = {}
+        self._running_by_kind: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._changed = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self._purge_task: Optional[asyncio.Task] = None
+        self._draining = False
 
-    def submit(self, kind: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> JobRecord:
+    def register_handler(self, kind: str, func: Callable[..., Any]) -> None:
+        """
+        登记某类任务的执行函数，重启恢复时按 kind 找回 func。
+        """
+        self._handlers[kind] = func
+
+    def submit(
+        self,
+        kind: str,
+        func: Callable[..., Any],
+        *args: Any,
+        priority: Optional[str] = None,
+        persist: bool = True,
+        timeout_seconds: Optional[float] = None,
+        **kwargs: Any,
+    ) -> JobRecord:
+        params = kwargs.pop("params", {})
+        lane = priority or DEFAULT_PRIORITY_BY_KIND.get(kind, "batch")
+        if lane not in PRIORITY_LANES:
+            raise DataException(
+                error_code=ErrorCode.VALIDATION_ERROR,
+                message="priority 仅支持 interactive / batch",
+                details={"bad_value": priority, "allowed": sorted(PRIORITY_LANES)},
+            )
+        # 请求方只能在服务端上限之内收紧超时
+        kind_timeout = self.kind_timeouts.get(kind)
+        if timeout_seconds is None or (kind_timeout and kind_timeout > 0 and timeout_seconds > kind_timeout):
+            timeout_seconds = kind_timeout
         job_id = str(uuid.uuid4())
         record = JobRecord(
             job_id=job_id,
             kind=kind,
             status="queued",
             created_at=self._now_iso(),
-            params=kwargs.get("params", {}),
+            params=params,
+            priority=lane,
+            timeout_seconds=float(timeout_seconds) if timeout_seconds and timeout_seconds > 0 else None,
         )
+        # 只有已注册 handler 的任务才能在重启后重放；persist=False 的临时任务不保存 payload
+        payload = (args, kwargs) if persist and self._handlers.get(kind) is func else None
+        # 上传内容可达 MAX_UPLOAD_BYTES：pickle 与 SQLite 写入交给写线程，submit 只做内存入队
+        self._write(self._insert, job_record_to_dict(record), payload)
         self.jobs[job_id] = record
-        self.queue.put_nowait((job_id, func, args, kwargs))
+        self._enqueue(record, func, args, kwargs)
+        return record
+
+    def _insert(self, row: Dict[str, Any], payload: Optional[tuple]) -> None:
+        try:
+            self.store.insert(row, payload)
+        except (pickle.PicklingError, TypeError, AttributeError) as exc:
+            logger.warning("任务参数无法序列化，重启后将无法恢复: job_id=%s, reason=%s", row["job_id"], exc)
+            self.store.insert(row, None)
+
+    def _write(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "Future[Any]":
+        future = self._writer.submit(fn, *args, **kwargs)
+        future.add_done_callback(_log_write_error)
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        等待已提交的存储写入全部完成。
+        """
+        self._write(lambda: None).result(timeout=timeout)
+
+    def _enqueue(self, record: JobRecord, func: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        self._pending.append(
+            _PendingJob(
+                job_id=record.job_id,
+                kind=record.kind,
+                priority=record.priority,
+                func=func,
+                args=args,
+                kwargs=kwargs,
+                enqueued_at=time.monotonic(),
+                seq=next(self._seq),
+            )
+        )
+        self._changed.set()
+
+    def _active(self, job_id: str) -> Optional[JobRecord]:
+        record = self.jobs.get(job_id)
+        if record is not None:
+            ctx = self._contexts.get(job_id)
+            if ctx is not None:
+                record.progress = ctx.progress()
         return record
 
     def get(self, job_id: str) -> Optional[JobRecord]:
-        return self.jobs.get(job_id)
+        record = self._active(job_id)
+        if record is not None:
+            return record
+        row = self.store.get(job_id)
+        if row is None:
+            return None
+        return JobRecord(**row)
+
+    async def get_async(self, job_id: str) -> Optional[JobRecord]:
+        """
+        供路由使用的 get：已结束任务的 SQLite 读取与结果 JSON 解码（可达数 MB）在线程中执行。
+        """
+        record = self._active(job_id)
+        if record is not None:
+            return record
+        row = await asyncio.to_thread(self.store.get, job_id)
+        if row is None:
+            return None
+        return JobRecord(**row)
+
+    def cancel(self, job_id: str) -> Optional[JobRecord]:
+        """
+        取消任务：排队中的任务直接出队；运行中的任务发出取消信号，在下一个检查点（阶段边界 / 微调 step）停止。
+
+        返回 None 表示任务不存在；已结束的任务原样返回。
+        """
+        record = self.jobs.get(job_id)
+        if record is None:
+            return self.get(job_id)
+        if record.status == "queued":
+            dropped = [job for job in self._pending if job.job_id == job_id]
+            self._pending = [job for job in self._pending if job.job_id != job_id]
+            for job in dropped:
+                # 持有资源的临时任务（如推迟计算的指标）提供 discard，出队时释放
+                discard = getattr(job.func, "discard", None)
+                if callable(discard):
+                    discard()
+            record.status = "cancelled"
+            record.finished_at = self._now_iso()
+            record.error = {"message": "任务已取消"}
+            # 写入落盘后再从内存移除，期间 get 仍返回内存中已取消的记录
+            self._write(
+                self.store.mark_finished, job_id, status=record.status, finished_at=record.finished_at, error=record.error
+            ).add_done_callback(lambda _: self.jobs.pop(job_id, None))
+            logger.info("异步任务已取消（排队中）: job_id=%s", job_id)
+            return record
+        ctx = self._contexts.get(job_id)
+        if ctx is not None:
+            ctx.cancel("cancelled")
+            record.progress = {**ctx.progress(), "cancel_requested": True}
+            logger.info("异步任务取消请求已发出: job_id=%s", job_id)
+        return record
+
+    async def cancel_async(self, job_id: str) -> Optional[JobRecord]:
+        """
+        供路由使用的 cancel：已结束任务从存储读取时不阻塞事件循环。
+        """
+        if job_id not in self.jobs:
+            return await self.get_async(job_id)
+        return self.cancel(job_id)
+
+    def recover(self) -> int:
+        """
+        重新入队上次进程退出时未完成的任务；无法恢复的任务标记为 failed。
+        """
+        recovered = 0
+        for row, payload in self.store.load_unfinished():
+            record = JobRecord(**row)
+            func = self._handlers.get(record.kind)
+            if func is None or payload is None or record.priority not in PRIORITY_LANES:
+                self.store.mark_finished(
+                    record.job_id,
+                    status="failed",
+                    finished_at=self._now_iso(),
+                    error={"message": "服务重启导致任务中断，且该任务无法自动恢复"},
+                )
+                continue
+            args, kwargs = payload
+            record.status = "queued"
+            record.started_at = None
+            self.store.insert(job_record_to_dict(record), payload)
+            self.jobs[record.job_id] = record
+            self._enqueue(record, func, args, kwargs)
+            recovered += 1
+        if recovered:
+            logger.info("已恢复上次未完成的异步任务: %d 个", recovered)
+        return recovered
+
+    def kind_limit(self, kind: str) -> int:
+        return min(self.kind_limits.get(kind, self.num_workers), self.num_workers)
+
+    def _pick_next(self) -> Optional[_PendingJob]:
+        now = time.monotonic()
+        best: Optional[_PendingJob] = None
+        best_key: Optional[tuple] = None
+        for job in self._pending:
+            if self._running_by_kind.get(job.kind, 0) >= self.kind_limit(job.kind):
+                continue
+            effective = PRIORITY_LANES[job.priority] - (now - job.enqueued_at) / self.aging_seconds
+            key = (effective, job.seq)
+            if best_key is None or key < best_key:
+                best, best_key = job, key
+        return best
 
     async def worker(self) -> None:
-        while True:
-            job_id, func, args, kwargs = await self.queue.get()
-            record = self.jobs.get(job_id)
-            if record is None:
-                self.queue.task_done()
+        while not self._draining:
+            # 单线程事件循环：挑选与占位之间没有 await，不需要额外加锁
+            job = self._pick_next()
+            if job is None:
+                self._changed.clear()
+                await self._changed.wait()
                 continue
-            record.status = "running"
-            record.started_at = self._now_iso()
+            self._pending.remove(job)
+            self._running_by_kind[job.kind] = self._running_by_kind.get(job.kind, 0) + 1
             try:
-                result = await asyncio.to_thread(func, *args, **kwargs)
-                record.status = "succeeded"
-                record.result = result
-            except Exception as exc:
+                await self._run(job)
+            finally:
+                self._running_by_kind[job.kind] -= 1
+                self._changed.set()
+
+    async def _run(self, job: _PendingJob) -> None:
+        record = self.jobs.get(job.job_id)
+        if record is None:
+            return
+        record.status = "running"
+        record.started_at = self._now_iso()
+        self._write(self.store.mark_running, job.job_id, record.started_at)
+        ctx = JobContext(job.job_id, timeout_seconds=record.timeout_seconds)
+        self._contexts[job.job_id] = ctx
+        # to_thread 会复制当前 contextvars，任务函数中通过 current_job() 拿到 ctx
+        token = bind_job(ctx)
+        try:
+            if self.process_pool is not None and job.kind in self.process_kinds:
+                result = await asyncio.to_thread(self.process_pool.run, job.func, job.args, job.kwargs, ctx)
+            else:
+                result = await asyncio.to_thread(job.func, *job.args, **job.kwargs)
+            record.status = "succeeded"
+            record.result = result
+        except Exception as exc:
+            reason = exc.reason if isinstance(exc, JobCancelled) else ctx.cancel_reason
+            if reason is not None:
+                record.status = reason
+                record.error = {
+                    "message": "任务执行超时" if reason == "timed_out" else "任务已取消",
+                    "timeout_seconds": record.timeout_seconds,
+                }
+                logger.info("异步任务已停止: job_id=%s, status=%s", job.job_id, reason)
+            else:
                 record.status = "failed"
                 record.error = {
                     "message": str(exc),
-                    "trace": traceback.format_exc(),
+                    "trace": getattr(exc, "remote_trace", None) or traceback.format_exc(),
                 }
-                logger.warning("异步任务执行失败: job_id=%s, reason=%s", job_id, exc)
-            finally:
-                record.finished_at = self._now_iso()
-                self.queue.task_done()
+                logger.warning("异步任务执行失败: job_id=%s, reason=%s", job.job_id, exc)
+        finally:
+            unbind_job(token)
+            self._contexts.pop(job.job_id, None)
+            record.progress = ctx.progress()
+            record.finished_at = self._now_iso()
+        try:
+            await asyncio.wrap_future(
+                self._write(
+                    self.store.mark_finished,
+                    job.job_id,
+                    status=record.status,
+                    finished_at=record.finished_at,
+                    result=record.result,
+                    error=record.error,
+                    progress=record.progress,
+                )
+            )
+        except Exception as exc:
+            logger.warning("任务结果写入存储失败: job_id=%s, reason=%s", job.job_id, exc)
+            return
+        # 结果已落盘，释放内存中的完整结果
+        self.jobs.pop(job.job_id, None)
+
+    async def _purge_loop(self) -> None:
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.store.purge_expired, self.result_ttl_seconds)
+                if removed:
+                    logger.info("已清理过期任务记录: %d 条", removed)
+            except Exception as exc:
+                logger.warning("过期任务清理失败: %s", exc)
+            await asyncio.sleep(self.purge_interval_seconds)
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._draining = False
+        self.recover()
+        self._workers = [asyncio.create_task(self.worker()) for _ in range(self.num_workers)]
+        if self.result_ttl_seconds > 0:
+            self._purge_task = asyncio.create_task(self._purge_loop())
+        logger.info("任务队列已启动: workers=%d, kind_limits=%s", self.num_workers, self.kind_limits)
+
+    async def stop(self, drain_timeout: float = 0.0) -> None:
+        """
+        停止接收新的调度；drain_timeout 内等待运行中的任务完成，超时后取消。
+
+        排队中（以及被强制中断）的任务保留在存储中，下次启动时重新入队。
+        """
+        self._draining = True
+        self._changed.set()
+        if self._workers and drain_timeout > 0:
+            running = sum(self._running_by_kind.values())
+            if running:
+                logger.info("等待运行中的异步任务完成: running=%d, timeout=%.0fs", running, drain_timeout)
+            _, still_running = await asyncio.wait(self._workers, timeout=drain_timeout)
+            if still_running:
+                logger.warning("任务排空超时，强制停止: 剩余 worker=%d", len(still_running))
+        tasks = [*self._workers, *([self._purge_task] if self._purge_task is not None else [])]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._purge_task = None
+        await asyncio.to_thread(self.flush)
+        if self.process_pool is not None:
+            await asyncio.to_thread(self.process_pool.shutdown)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._stats(self.store.counts())
+
+    async def stats_async(self) -> Dict[str, Any]:
+        return self._stats(await asyncio.to_thread(self.store.counts))
+
+    def _stats(self, jobs_by_status: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "workers": self.num_workers,
+            "kind_limits": {k: self.kind_limit(k) for k in self.kind_limits},
+            "running_by_kind": {k: v for k, v in self._running_by_kind.items() if v},
+            "queued": len(self._pending),
+            "queued_by_priority": {
+                lane: sum(1 for j in self._pending if j.priority == lane) for lane in PRIORITY_LANES
+            },
+            "process_pool": self.process_pool.stats() if self.process_pool is not None else None,
+            "store": {"persistent": self.store.persistent, "jobs_by_status": jobs_by_status},
+        }
 
     @staticmethod
     def _now_iso() -> str:
         return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime())
 
 
-job_queue = JobQueue()
+def _log_write_error(future: "Future[Any]") -> None:
+    exc = future.exception()
+    if exc is not None:
+        logger.warning("任务记录写入存储失败: %s", exc)
+
+
+def _build_process_pool() -> Optional[ProcessWorkerPool]:
+    if settings.JOB_EXECUTION_BACKEND != "process":
+        return None
+    return ProcessWorkerPool(
+        max_workers=settings.JOB_PROCESS_WORKERS,
+        max_jobs_per_worker=settings.JOB_PROCESS_MAX_JOBS_PER_WORKER,
+        max_rss_bytes=settings.JOB_PROCESS_MAX_RSS_MB * 1024 * 1024,
+    )
+
+
+job_queue = JobQueue(
+    num_workers=settings.JOB_QUEUE_WORKERS,
+    kind_limits={
+        "zeroshot": settings.JOB_CONCURRENCY_ZEROSHOT,
+        "finetune": settings.JOB_CONCURRENCY_FINETUNE,
+        "metrics": settings.JOB_CONCURRENCY_METRICS,
+    },
+    aging_seconds=settings.JOB_PRIORITY_AGING_SECONDS,
+    kind_timeouts={
+        "zeroshot": settings.JOB_TIMEOUT_SECONDS_ZEROSHOT,
+        "finetune": settings.JOB_TIMEOUT_SECONDS_FINETUNE,
+        "metrics": settings.JOB_TIMEOUT_SECONDS_METRICS,
+    },
+    store=JobStore(settings.JOB_STORE_PATH),
+    process_pool=_build_process_pool(),
+    process_kinds=settings.JOB_PROCESS_KINDS,
+    result_ttl_seconds=settings.JOB_RESULT_TTL_HOURS * 3600,
+    purge_interval_seconds=settings.JOB_PURGE_INTERVAL_MINUTES * 60,
+)
 
 
 def job_record_to_dict(record: JobRecord) -> Dict[str, Any]:
@@ -82,10 +495,13 @@ def job_record_to_dict(record: JobRecord) -> Dict[str, Any]:
         "job_id": record.job_id,
         "kind": record.kind,
         "status": record.status,
+        "priority": record.priority,
         "created_at": record.created_at,
         "started_at": record.started_at,
         "finished_at": record.finished_at,
         "result": record.result,
         "error": record.error,
         "params": record.params,
+        "progress": record.progress,
+        "timeout_seconds": record.timeout_seconds,
     }
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    priority    TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    started_at  TEXT,
+    finished_at TEXT,
+    finished_ts REAL,
+    params      TEXT,
+    result      TEXT,
+    error       TEXT,
+    progress    TEXT,
+    timeout_seconds REAL,
+    payload     BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished_ts ON jobs(finished_ts);
+"""
+
+_FIELDS = (
+    "job_id",
+    "kind",
+    "status",
+    "priority",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "params",
+    "result",
+    "error",
+    "progress",
+    "timeout_seconds",
+)
+# 旧版本数据库缺少的列：启动时按需 ALTER TABLE 补齐
+_ADDED_COLUMNS = {"progress": "TEXT", "timeout_seconds": "REAL"}
+
+
+def _json_default(obj: Any) -> Any:
+    # numpy 标量 / Timestamp 等：优先 .item()，否则退化为字符串
+    item = getattr(obj, "item", None)
+    if callable(item):
+        try:
+            return item()
+        except Exception:
+            pass
+    return str(obj)
+
+
+def _dumps(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _loads(value: Optional[str]) -> Any:
+    if value is None:
+        return None
+    return json.loads(value)
+
+
+class JobStore:
+    """
+    基于本地 SQLite 的任务持久化。
+
+    - 任务状态、参数、结果与错误均落盘，进程重启后仍可通过 /jobs/{job_id} 查询
+    - 排队中的任务同时保存可重放的调用参数（payload），重启后由 JobQueue 重新入队；任务结束后清空 payload
+    - 已结束任务超过 TTL 后由 purge_expired 删除
+    - path 为空时使用内存数据库（不持久化，仅保留 TTL 淘汰能力）
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # 连接在第一次读写时才打开：导入模块（构造全局 job_queue）不触碰磁盘
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # 调用方需持有 self._lock
+        if self._conn is not None:
+            return self._conn
+        target = ":memory:"
+        if self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            target = self.path
+        conn = sqlite3.connect(target, check_same_thread=False, isolation_level=None)
+        if self.path:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in _ADDED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._conn = conn
+        return conn
+
+    @property
+    def persistent(self) -> bool:
+        return bool(self.path)
+
+    def insert(self, row: Dict[str, Any], payload: Optional[Tuple[tuple, dict]]) -> None:
+        blob = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL) if payload is not None else None
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO jobs (job_id, kind, status, priority, created_at, started_at, finished_at,"
+                " finished_ts, params, result, error, progress, timeout_seconds, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?, ?, ?, ?)",
+                (
+                    row["job_id"],
+                    row["kind"],
+                    row["status"],
+                    row["priority"],
+                    row["created_at"],
+                    row.get("started_at"),
+                    row.get("finished_at"),
+                    _dumps(row.get("params") or {}),
+                    _dumps(row.get("result")),
+                    _dumps(row.get("error")),
+                    _dumps(row.get("progress") or {}),
+                    row.get("timeout_seconds"),
+                    blob,
+                ),
+            )
+
+    def mark_running(self, job_id: str, started_at: str) -> None:
+        with self._lock:
+            self._db().execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE job_id = ?",
+                (started_at, job_id),
+            )
+
+    def mark_finished(
+        self,
+        job_id: str,
+        *,
+        status: str,
+        finished_at: str,
+        result: Any = None,
+        error: Optional[Dict[str, Any]] = None,
+        progress: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self._lock:
+            self._db().execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, finished_ts = ?, result = ?, error = ?, progress = ?,"
+                " payload = NULL WHERE job_id = ?",
+                (status, finished_at, time.time(), _dumps(result), _dumps(error), _dumps(progress or {}), job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cur = self._db().execute(f"SELECT {', '.join(_FIELDS)} FROM jobs WHERE job_id = ?", (job_id,))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return self._row_to_dict(row)
+
+    def load_unfinished(self) -> List[Tuple[Dict[str, Any], Optional[Tuple[tuple, dict]]]]:
+        """
+        返回上次进程退出时仍处于 queued / running 的任务（按创建顺序）及其 payload。
+        """
+        with self._lock:
+            cur = self._db().execute(
+                f"SELECT {', '.join(_FIELDS)}, payload FROM jobs WHERE status IN ('queued', 'running')"
+                " ORDER BY created_at, rowid"
+            )
+            rows = cur.fetchall()
+        out: List[Tuple[Dict[str, Any], Optional[Tuple[tuple, dict]]]] = []
+        for row in rows:
+            payload = None
+            if row[-1] is not None:
+                try:
+                    payload = pickle.loads(row[-1])
+                except Exception as exc:
+                    logger.warning("任务 payload 反序列化失败: job_id=%s, reason=%s", row[0], exc)
+            out.append((self._row_to_dict(row[:-1]), payload))
+        return out
+
+    def purge_expired(self, ttl_seconds: float) -> int:
+        cutoff = time.time() - float(ttl_seconds)
+        with self._lock:
+            cur = self._db().execute(
+                "DELETE FROM jobs WHERE finished_ts IS NOT NULL AND finished_ts < ?",
+                (cutoff,),
+            )
+            return int(cur.rowcount or 0)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            cur = self._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            return {str(status): int(n) for status, n in cur.fetchall()}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _row_to_dict(row: Tuple[Any, ...]) -> Dict[str, Any]:
+        data = dict(zip(_FIELDS, row))
+        data["params"] = _loads(data["params"]) or {}
+        data["result"] = _loads(data["result"])
+        data["error"] = _loads(data["error"])
+        data["progress"] = _loads(data["progress"]) or {}
+        return data
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from app.services.forecast_output import resolve_quantile_columns
+
+
+# holdout 区间上由实际值与预测直接计算的指标（与 IC/IR 的截面指标区分）
+EVAL_METRICS = ("WQL", "WAPE", "MASE", "COVERAGE")
+# 越小越好的损失类指标：与 AutoGluon evaluate 一致取负值（higher is better）
+_LOSS_METRICS = ("WQL", "WAPE", "MASE")
+
+# MASE 季节差分的周期（与 AutoGluon 的默认季节性一致），按频率基名查表后再除以倍数（如 2H -> 12）
+_SEASONALITY = {
+    "Y": 1, "YE": 1, "YS": 1, "A": 1, "AS": 1,
+    "Q": 4, "QE": 4, "QS": 4,
+    "M": 12, "ME": 12, "MS": 12,
+    "SM": 24, "SME": 24, "SMS": 24,
+    "W": 1, "D": 7, "B": 5, "BH": 9,
+    "H": 24, "T": 1440, "MIN": 1440, "S": 1,
+}
+
+
+def seasonal_period(freq: Optional[str]) -> int:
+    if not freq:
+        return 1
+    try:
+        offset = to_offset(freq)
+    except Exception:
+        return 1
+    base = _SEASONALITY.get(offset.name.split("-")[0].upper(), 1)
+    n = abs(int(getattr(offset, "n", 1) or 1))
+    return base // n if n > 1 and base % n == 0 else base
+
+
+def metric_result_keys(metrics: Iterable[str], *, by_item: bool = True) -> Set[str]:
+    """
+    指标名 -> compute_holdout_metrics 输出中属于这些指标的全部键（含 _by_horizon / _by_item 细分），供 filter_metric_result 使用。
+    """
+    keys: Set[str] = set()
+    for name in metrics:
+        upper = str(name).upper()
+        keys.add(upper)
+        if upper in _LOSS_METRICS:
+            keys.add(f"{upper}_BY_HORIZON")
+            if by_item:
+                keys.add(f"{upper}_BY_ITEM")
+    return keys
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    out = np.full(len(num), np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def _to_list(values: np.ndarray, sign: float = -1.0) -> List[Optional[float]]:
+    return [None if np.isnan(v) else sign * float(v) for v in values.tolist()]
+
+
+def _to_item_dict(item_ids: np.ndarray, values: np.ndarray) -> Dict[str, Optional[float]]:
+    return dict(zip(item_ids.tolist(), _to_list(values)))
+
+
+def _mase_scale(train_df: pd.DataFrame, item_ids: np.ndarray, season_length: int) -> np.ndarray:
+    """
+    各 item 训练段的季节朴素预测平均绝对误差（MASE 分母），按 item_ids 的顺序返回；无法计算时为 NaN。
+    """
+    train = train_df[["item_id", "timestamp", "target"]].dropna(subset=["target"])
+    train = train.assign(item_id=train["item_id"].astype(str)).sort_values(["item_id", "timestamp"], kind="stable")
+    codes = pd.Categorical(train["item_id"], categories=item_ids).codes
+    y = train["target"].to_numpy(dtype=float)
+    m = int(season_length)
+    if len(y) <= m:
+        return np.full(len(item_ids), np.nan)
+    same_item = (codes[m:] == codes[:-m]) & (codes[m:] >= 0)
+    diffs = np.abs(y[m:] - y[:-m])[same_item]
+    diff_codes = codes[m:][same_item]
+    total = np.bincount(diff_codes, weights=diffs, minlength=len(item_ids))
+    count = np.bincount(diff_codes, minlength=len(item_ids)).astype(float)
+    return _ratio(total, count)
+
+
+def compute_holdout_metrics(
+    actual_df: pd.DataFrame,
+    pred_df: pd.DataFrame,
+    *,
+    quantiles: List[float],
+    metrics: Iterable[str],
+    train_df: Optional[pd.DataFrame] = None,
+    season_length: int = 1,
+    by_item: bool = True,
+) -> Dict[str, Any]:
+    """
+    holdout 实际值 + （时间戳已对齐的）预测 -> WQL / WAPE / MASE / COVERAGE，一次向量化计算。
+
+    - 对齐后按 item 与预测步编码，总体值、逐预测步（`<指标>_by_horizon`）与逐 item（`<指标>_by_item`）
+      均由同一组逐行误差经 bincount 汇总，不再调用 predictor.evaluate 重新预测
+    - WQL / WAPE / MASE 与 AutoGluon evaluate 一致取负值（higher is better）；COVERAGE 为实际值不高于各分位数预测的比例
+    - MASE 需要 train_df（各 item 的训练段）计算季节朴素误差作为分母，总体值为各 item MASE 的平均
+    - 无法计算的细分值为 None；无法计算的总体指标不出现在结果中
+    """
+    wanted = {str(m).upper() for m in metrics}
+    actual = actual_df[["item_id", "timestamp", "target"]]
+    actual = actual.assign(
+        item_id=actual["item_id"].astype(str),
+        timestamp=pd.to_datetime(actual["timestamp"], errors="coerce"),
+    )
+    pred = pd.DataFrame(pred_df)
+    pred = pred.assign(
+        item_id=pred["item_id"].astype(str),
+        timestamp=pd.to_datetime(pred["timestamp"], errors="coerce"),
+    )
+    merged = actual.merge(pred, on=["item_id", "timestamp"], how="inner").dropna(subset=["target"])
+    if merged.empty:
+        raise ValueError("holdout 与预测结果无法对齐")
+    merged = merged.sort_values(["item_id", "timestamp"], kind="stable").reset_index(drop=True)
+
+    codes, item_ids = pd.factorize(merged["item_id"], sort=False)
+    item_ids = np.asarray(item_ids, dtype=object)
+    n_items = len(item_ids)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    step = np.arange(len(codes)) - starts[codes]
+    n_steps = int(step.max()) + 1
+
+    y = merged["target"].to_numpy(dtype=float)
+    abs_y = np.abs(y)
+    denom = float(abs_y.sum())
+    item_denom = np.bincount(codes, weights=abs_y, minlength=n_items)
+    step_denom = np.bincount(step, weights=abs_y, minlength=n_steps)
+
+    out: Dict[str, Any] = {}
+
+    def _emit(name: str, row_values: np.ndarray, total: float, item_den: np.ndarray, step_den: np.ndarray) -> None:
+        out[name] = -total
+        out[f"{name}_by_horizon"] = _to_list(_ratio(np.bincount(step, weights=row_values, minlength=n_steps), step_den))
+        if by_item:
+            out[f"{name}_by_item"] = _to_item_dict(
+                item_ids, _ratio(np.bincount(codes, weights=row_values, minlength=n_items), item_den)
+            )
+
+    point: Optional[np.ndarray] = None
+    if wanted.intersection({"WAPE", "MASE"}):
+        if "mean" not in merged.columns:
+            raise ValueError("预测结果缺少 mean 列")
+        point = merged["mean"].to_numpy(dtype=float)
+    abs_err = np.abs(y - point) if point is not None else None
+
+    if wanted.intersection({"WQL", "WAPE"}) and denom <= 0:
+        raise ValueError("holdout 目标值绝对值之和为 0，WQL/WAPE 无定义")
+
+    if "WAPE" in wanted:
+        _emit("WAPE", abs_err, float(abs_err.sum() / denom), item_denom, step_denom)
+
+    if wanted.intersection({"WQL", "COVERAGE"}):
+        mapping, missing = resolve_quantile_columns(merged, quantiles=quantiles)
+        if missing:
+            raise ValueError(f"预测结果缺少分位数列: {missing}")
+        levels = np.array(list(mapping.keys()), dtype=float)
+        q_pred = merged[list(mapping.values())].to_numpy(dtype=float)
+        below = y[:, None] <= q_pred
+        if "WQL" in wanted:
+            # 各分位数的 pinball loss 逐行取平均：sum_rows(mean_q loss) / sum|y| 等于各分位数 WQL 的平均
+            row_loss = (2.0 * np.abs((q_pred - y[:, None]) * (below - levels))).mean(axis=1)
+            _emit("WQL", row_loss, float(row_loss.sum() / denom), item_denom, step_denom)
+        if "COVERAGE" in wanted:
+            out["COVERAGE"] = {f"{q:g}": float(v) for q, v in zip(levels.tolist(), below.mean(axis=0).tolist())}
+
+    if "MASE" in wanted and train_df is not None:
+        scale = _mase_scale(train_df, item_ids, season_length)
+        row_scale = scale[codes]
+        valid = row_scale > 0
+        if valid.any():
+            scaled = np.zeros(len(y))
+            np.divide(abs_err, row_scale, out=scaled, where=valid)
+            item_count = np.bincount(codes, weights=valid.astype(float), minlength=n_items)
+            item_mase = _ratio(np.bincount(codes, weights=scaled, minlength=n_items), item_count)
+            out["MASE"] = -float(np.nanmean(item_mase))
+            step_count = np.bincount(step, weights=valid.astype(float), minlength=n_steps)
+            out["MASE_by_horizon"] = _to_list(_ratio(np.bincount(step, weights=scaled, minlength=n_steps), step_count))
+            if by_item:
+                out["MASE_by_item"] = _to_item_dict(item_ids, item_mase)
+    return out
@@ -3,12 +3,13 @@ from __future__ import annotations
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import re
+import numpy as np
 import pandas as pd
 
 from app.core.exceptions import DataException, ErrorCode
 
 
-ALLOWED_METRICS = {"WQL", "WAPE", "IC", "IR"}
+ALLOWED_METRICS = {"WQL", "WAPE", "MASE", "COVERAGE", "IC", "IR"}
 DEFAULT_METRICS = ["WQL", "WAPE"]
 
 
@@ -26,7 +27,7 @@ def normalize_metrics_request(metrics: Optional[Sequence[str]]) -> List[str]:
         if key not in ALLOWED_METRICS:
             raise DataException(
                 error_code=ErrorCode.VALIDATION_ERROR,
-                message="metrics 仅支持 WQL/WAPE/IC/IR",
+                message="metrics 仅支持 WQL/WAPE/MASE/COVERAGE/IC/IR",
                 details={"bad_value": raw, "allowed": sorted(ALLOWED_METRICS)},
             )
         if key not in normalized:
@@ -89,31 +90,27 @@ def replace_pred_timestamps_with_future(
         if last_ts.empty:
             return pred_df
 
-        future_map: Dict[str, List[pd.Timestamp]] = {}
-        for item_id, ts in last_ts.items():
-            if pd.isna(ts):
-                continue
-            future = pd.date_range(start=ts, periods=int(prediction_length) + 1, freq=freq)[1:]
-            future_map[str(item_id)] = list(future)
-
         work = pred_df.copy()
         work[timestamp_col] = pd.to_datetime(work[timestamp_col], errors="coerce")
         work = work.sort_values([item_id_col, timestamp_col])
-        work["_pos"] = work.groupby(item_id_col).cumcount()
-        work = work[work["_pos"] < int(prediction_length)].copy()
-
-        def _assign_future(row: pd.Series) -> pd.Timestamp:
-            key = str(row[item_id_col])
-            seq = future_map.get(key)
-            if not seq:
-                return row[timestamp_col]
-            pos = int(row["_pos"])
-            if pos < len(seq):
-                return seq[pos]
-            return row[timestamp_col]
-
-        work[timestamp_col] = work.apply(_assign_future, axis=1)
-        return work.drop(columns=["_pos"])
+        pos = work.groupby(item_id_col).cumcount()
+        keep = (pos < int(prediction_length)).to_numpy()
+        work, pos = work[keep].copy(), pos[keep].to_numpy()
+
+        # 每个 item 的未来时间戳 = date_range(last_ts)[1 + pos]；date_range 只按不同的 last_ts 各算一次
+        # （非 Tick 频率如 M/W 会先对齐锚点，不能直接用 last_ts + k * offset）
+        last_map = {str(k): v for k, v in last_ts.items() if not pd.isna(v)}
+        base = work[item_id_col].astype(str).map(last_map)
+        codes, uniques = pd.factorize(base)
+        if len(uniques):
+            periods = int(prediction_length)
+            ranges = [pd.date_range(start=ts, periods=periods + 1, freq=freq)[1:] for ts in uniques]
+            grid = ranges[0].append(ranges[1:])
+            has_future = codes >= 0
+            future = grid.take(np.where(has_future, codes * periods + pos, 0))
+            current = pd.DatetimeIndex(work[timestamp_col])
+            work[timestamp_col] = current.where(~has_future, future).to_series(index=work.index)
+        return work
     except Exception:
         return pred_df
 
@@ -133,35 +130,40 @@ def replace_pred_timestamps_with_holdout(
     try:
         holdout = holdout_df[[item_id_col, timestamp_col]].copy()
         holdout[timestamp_col] = pd.to_datetime(holdout[timestamp_col], errors="coerce")
-        holdout = holdout.dropna(subset=[timestamp_col]).sort_values([item_id_col, timestamp_col])
-        holdout_map_raw = holdout.groupby(item_id_col)[timestamp_col].apply(list).to_dict()
-        holdout_map = {str(k): v for k, v in holdout_map_raw.items()}
-        if not holdout_map:
+        holdout = holdout.dropna(subset=[timestamp_col])
+        if holdout.empty:
             return pred_df
+        # 按 str(item_id) 对齐：预测的第 pos 行取该 item 第 pos 个 holdout 时间戳（按位置 take，不逐行查表）
+        holdout_keys = holdout[item_id_col].astype(str)
+        holdout = holdout.assign(_key=holdout_keys).sort_values(["_key", timestamp_col], kind="stable")
+        holdout_ts = pd.DatetimeIndex(holdout[timestamp_col])
+        key_index = pd.Index(holdout["_key"].to_numpy())
+        sizes = key_index.value_counts(sort=False)
+        starts = pd.Series(np.arange(len(key_index)), index=key_index).groupby(level=0).min()
 
         work = pred_df.copy()
         work[timestamp_col] = pd.to_datetime(work[timestamp_col], errors="coerce")
         work = work.sort_values([item_id_col, timestamp_col])
-        work["_pos"] = work.groupby(item_id_col).cumcount()
-        work["_limit"] = work[item_id_col].map(lambda x: len(holdout_map.get(str(x), [])))
-        work = work[work["_pos"] < work["_limit"]].copy()
-
-        def _assign_holdout(row: pd.Series) -> pd.Timestamp:
-            key = str(row[item_id_col])
-            seq = holdout_map.get(key)
-            if not seq:
-                return row[timestamp_col]
-            pos = int(row["_pos"])
-            if pos < len(seq):
-                return seq[pos]
-            return row[timestamp_col]
-
-        work[timestamp_col] = work.apply(_assign_holdout, axis=1)
-        return work.drop(columns=["_pos", "_limit"])
+        keys = work[item_id_col].astype(str)
+        pos = work.groupby(item_id_col).cumcount()
+        limit = keys.map(sizes).fillna(0)
+        keep = (pos < limit).to_numpy()
+        work = work[keep].copy()
+        take = (keys[keep].map(starts) + pos[keep]).to_numpy(dtype=np.int64)
+        work[timestamp_col] = holdout_ts.take(take)
+        return work
     except Exception:
         return pred_df
 
 
+def restore_item_ids(pred_df: pd.DataFrame, original: pd.Series) -> pd.DataFrame:
+    """
+    预测中的 item_id 为字符串（合批 / 缓存时统一转换），还原为输入中原始的 item_id 值与类型。
+    """
+    lookup = {str(v): v for v in original.unique()}
+    return pred_df.assign(item_id=pred_df["item_id"].astype(str).map(lookup).astype(original.dtype))
+
+
 def select_prediction_column(pred_df: pd.DataFrame) -> Optional[str | float]:
     if "mean" in pred_df.columns:
         return "mean"
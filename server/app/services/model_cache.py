@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+from app.core.config import settings
+from app.core.exceptions import DataException, ErrorCode, ModelException
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPredictor:
+    model_id: str
+    predictor: Any
+    size_bytes: int
+    loaded_at: float
+    load_seconds: float
+    last_used_at: float
+    hits: int = 0
+
+
+def model_dir_for(model_id: str) -> Path:
+    if not model_id or "/" in model_id or "\\" in model_id or model_id in {".", ".."}:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="model_id 非法",
+            details={"model_id": model_id},
+        )
+    return Path(settings.FINETUNED_MODELS_DIR) / model_id
+
+
+def _dir_size_bytes(path: Path) -> int:
+    total = 0
+    for child in path.rglob("*"):
+        try:
+            if child.is_file():
+                total += child.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+def _load_predictor_from_disk(model_id: str) -> Any:
+    from app.services.zero_shot_forecast import _lazy_import_autogluon
+
+    model_dir = model_dir_for(model_id)
+    if not model_dir.exists():
+        raise ModelException(
+            error_code=ErrorCode.MODEL_LOAD_FAILED,
+            message="未找到对应的微调模型（model_id 不存在）",
+            details={"model_id": model_id, "model_dir": str(model_dir)},
+        )
+    _, TimeSeriesPredictor = _lazy_import_autogluon()
+    try:
+        return TimeSeriesPredictor.load(str(model_dir))
+    except Exception as exc:
+        raise ModelException(
+            error_code=ErrorCode.MODEL_LOAD_FAILED,
+            message="微调模型加载失败",
+            details={"model_id": model_id, "model_dir": str(model_dir), "reason": str(exc)},
+        ) from exc
+
+
+class PredictorCache:
+    """
+    已加载微调 predictor 的进程级 LRU 缓存（按 model_id）。
+
+    - 内存预算：按模型目录大小估算每个条目的占用，超出 max_bytes / max_entries 时淘汰最久未使用的条目
+    - pin 的条目不参与淘汰
+    - load-once：同一 model_id 的并发请求共享一次磁盘加载
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedPredictor]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._pinned: Set[str] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    def get(self, model_id: str) -> CachedPredictor:
+        """
+        返回缓存条目；未命中时从磁盘加载（并发请求只加载一次）。
+        """
+        model_dir_for(model_id)
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is not None:
+                self._entries.move_to_end(model_id)
+                entry.hits += 1
+                entry.last_used_at = time.time()
+                self.hits += 1
+                return entry
+            future = self._loading.get(model_id)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._loading[model_id] = future
+                self.misses += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            entry = self._load(model_id)
+        except BaseException as exc:
+            with self._lock:
+                self._loading.pop(model_id, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._loading.pop(model_id, None)
+            if self.enabled or model_id in self._pinned:
+                self._entries[model_id] = entry
+                self._evict_locked()
+        future.set_result(entry)
+        return entry
+
+    @contextmanager
+    def lease(self, model_id: str, *, quantiles: Optional[Sequence[float]] = None) -> Iterator[Any]:
+        """
+        取出 predictor 供本次请求使用。
+
+        给出 quantiles 时返回设置了 quantile_levels 的浅拷贝，不改写缓存中共享的对象，
+        同一 model_id 的并发请求（含 inline 指标计算）无需互相等待。
+        """
+        entry = self.get(model_id)
+        predictor = entry.predictor
+        if quantiles is not None and hasattr(predictor, "quantile_levels"):
+            predictor = copy.copy(predictor)
+            predictor.quantile_levels = list(quantiles)
+        yield predictor
+
+    def pin(self, model_id: str) -> CachedPredictor:
+        with self._lock:
+            self._pinned.add(model_id)
+        try:
+            return self.get(model_id)
+        except Exception:
+            with self._lock:
+                self._pinned.discard(model_id)
+            raise
+
+    def unpin(self, model_id: str) -> bool:
+        with self._lock:
+            was_pinned = model_id in self._pinned
+            self._pinned.discard(model_id)
+            self._evict_locked()
+        return was_pinned
+
+    def invalidate(self, model_id: str) -> bool:
+        with self._lock:
+            self._pinned.discard(model_id)
+            return self._entries.pop(model_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries: List[Dict[str, Any]] = [
+                {
+                    "model_id": e.model_id,
+                    "size_bytes": e.size_bytes,
+                    "size_mb": round(e.size_bytes / (1024 * 1024), 2),
+                    "pinned": e.model_id in self._pinned,
+                    "hits": e.hits,
+                    "loaded_at": _iso(e.loaded_at),
+                    "last_used_at": _iso(e.last_used_at),
+                    "load_seconds": round(e.load_seconds, 3),
+                }
+                for e in reversed(self._entries.values())
+            ]
+            return {
+                "enabled": self.enabled,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "used_bytes": sum(e.size_bytes for e in self._entries.values()),
+                "entries": entries,
+                "pinned": sorted(self._pinned),
+                "loading": sorted(self._loading),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _load(self, model_id: str) -> CachedPredictor:
+        started = time.perf_counter()
+        predictor = _load_predictor_from_disk(model_id)
+        elapsed = time.perf_counter() - started
+        size_bytes = _dir_size_bytes(model_dir_for(model_id))
+        now = time.time()
+        logger.info("微调模型已加载入缓存: model_id=%s, size=%d bytes, cost=%.2fs", model_id, size_bytes, elapsed)
+        return CachedPredictor(
+            model_id=model_id,
+            predictor=predictor,
+            size_bytes=size_bytes,
+            loaded_at=now,
+            load_seconds=elapsed,
+            last_used_at=now,
+        )
+
+    def _evict_locked(self) -> None:
+        def _over_budget() -> bool:
+            used = sum(e.size_bytes for e in self._entries.values())
+            return used > self.max_bytes or len(self._entries) > self.max_entries
+
+        while _over_budget():
+            victim = next((k for k in self._entries if k not in self._pinned), None)
+            if victim is None:
+                logger.warning("微调模型缓存超出预算，但剩余条目均已 pin，无法继续淘汰")
+                return
+            self._entries.pop(victim)
+            self.evictions += 1
+            logger.info("微调模型缓存淘汰: model_id=%s", victim)
+
+
+def _iso(ts: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts))
+
+
+predictor_cache = PredictorCache(
+    max_bytes=settings.FINETUNED_MODEL_CACHE_MAX_MB * 1024 * 1024,
+    max_entries=settings.FINETUNED_MODEL_CACHE_MAX_ENTRIES,
+)
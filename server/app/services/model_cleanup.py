@@ -4,6 +4,7 @@ import time
 from pathlib import Path
 
 from app.core.config import settings
+from app.services.model_cache import predictor_cache
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,7 @@ def cleanup_finetuned_models(retention_days: int | None = None) -> None:
         if mtime < cutoff:
             try:
                 shutil.rmtree(entry, ignore_errors=True)
+                predictor_cache.invalidate(entry.name)
                 logger.info("已清理过期模型目录: %s", entry)
             except Exception as exc:
                 logger.warning("清理过期模型失败: %s, reason=%s", entry, exc)
@@ -1,15 +1,24 @@
 import json
 import re
 from dataclasses import dataclass
+from itertools import chain
 from datetime import datetime
+from operator import itemgetter
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
+from pandas.tseries.frequencies import to_offset
 
 from app.core.exceptions import DataException, ErrorCode
 
+try:
+    import orjson as _orjson  # type: ignore
+except Exception:  # 可选依赖：未安装时使用标准库 json
+    _orjson = None
 
-_JSON_FENCE_RE = re.compile(r"```json\s*(.*?)\s*```", re.IGNORECASE | re.DOTALL)
+
+_JSON_FENCE_OPEN_RE = re.compile(r"```json", re.IGNORECASE)
 
 
 @dataclass(frozen=True)
@@ -22,6 +31,18 @@ class ParsedMarkdownInput:
     category_covariates_names: List[str]
 
 
+@dataclass(frozen=True)
+class FreqInference:
+    """
+    逐序列频率推断的汇总：freq 仅在所有可推断序列一致时非空。
+    """
+
+    freq: Optional[str]
+    freq_counts: Dict[str, int]
+    dominant_freq: Optional[str]
+    disagreeing_items: List[Any]
+
+
 def extract_json_from_markdown(markdown_text: str) -> Dict[str, Any]:
     """
     Extract JSON payload from a markdown text.
@@ -30,14 +51,13 @@ def extract_json_from_markdown(markdown_text: str) -> Dict[str, Any]:
     1) First fenced ```json ... ``` block
     2) If markdown itself is JSON
     """
-    match = _JSON_FENCE_RE.search(markdown_text)
-    if match:
-        raw = match.group(1).strip()
-    else:
-        raw = markdown_text.strip()
+    raw = _find_json_fence(markdown_text)
+    if raw is None:
+        raw = markdown_text
+    raw = raw.strip()
 
     try:
-        return json.loads(raw)
+        return _json_loads(raw)
     except json.JSONDecodeError as exc:
         raise DataException(
             error_code=ErrorCode.DATA_FORMAT_ERROR,
@@ -46,6 +66,32 @@ def extract_json_from_markdown(markdown_text: str) -> Dict[str, Any]:
         ) from exc
 
 
+def _find_json_fence(markdown_text: str) -> Optional[str]:
+    """
+    返回第一个 ```json 代码块的内容；没有闭合的代码块时返回 None。
+
+    与原先的 DOTALL 惰性正则首个匹配等价（首尾空白由调用方 strip），但闭合标记改用 str.find 定位：
+    惰性匹配在大文件上逐字符回溯，数十 MB 的输入要耗时秒级。
+    """
+    match = _JSON_FENCE_OPEN_RE.search(markdown_text)
+    if match is None:
+        return None
+    end = markdown_text.find("```", match.end())
+    if end < 0:
+        return None
+    return markdown_text[match.end() : end]
+
+
+def _json_loads(raw: str) -> Any:
+    if _orjson is not None:
+        try:
+            return _orjson.loads(raw)
+        except _orjson.JSONDecodeError:
+            # orjson 不接受 NaN / Infinity 等非标准字面量，交给标准库按原语义解析（或报错）
+            pass
+    return json.loads(raw)
+
+
 def _normalize_id_key(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Normalize id key: accept `item_id` or `id`, and store into `item_id`.
@@ -59,6 +105,167 @@ def _normalize_id_key(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return normalized
 
 
+def records_to_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    记录列表 -> DataFrame，按行元组构造。
+
+    所有记录字段一致时（常见情况）用 itemgetter 一次取出整行，`id`→`item_id` 只按键归一一次，
+    省去逐行复制 dict 与 pandas 对 list_of_dicts 的逐键查找；
+    字段不一致时退回逐行归一 + pd.DataFrame(list_of_dicts)。两条路径的列顺序与缺失值语义相同。
+    """
+    first = records[0] if records else None
+    if not isinstance(first, dict) or len(first) < 2:
+        return pd.DataFrame(_normalize_id_key(records))
+    keys = list(first)
+    try:
+        rows = list(map(itemgetter(*keys), records))
+    except (KeyError, TypeError, IndexError):
+        return pd.DataFrame(_normalize_id_key(records))
+    # 键缺失已由 itemgetter 拦截，这里只需排除带额外字段的记录
+    if any(n != len(keys) for n in map(len, records)):
+        return pd.DataFrame(_normalize_id_key(records))
+
+    df = pd.DataFrame(rows, columns=keys)
+    if "id" in keys and "item_id" not in keys:
+        # 与逐行 pop("id") 后追加 item_id 的列顺序保持一致
+        df = df[[k for k in keys if k != "id"] + ["id"]].rename(columns={"id": "item_id"})
+    return df
+
+
+# 紧凑格式序列对象中的保留字段（其余字段均视为数据列）
+_SERIES_RESERVED_KEYS = frozenset({"item_id", "id", "start", "freq", "timestamp"})
+
+
+def is_series_block(item: Any) -> bool:
+    """
+    是否为按序列组织的紧凑格式对象（带 start 或 timestamp 数组），区别于逐行记录。
+    """
+    return isinstance(item, dict) and ("start" in item or isinstance(item.get("timestamp"), list))
+
+
+def _series_error(message: str, **details: Any) -> DataException:
+    return DataException(error_code=ErrorCode.DATA_FORMAT_ERROR, message=message, details=details)
+
+
+def series_blocks_to_frame(blocks: List[Dict[str, Any]], *, freq: Optional[str], where: str) -> pd.DataFrame:
+    """
+    按序列组织的紧凑格式 -> 记录级 DataFrame（与等价的逐行记录解析结果一致）。
+
+    每个序列对象：
+    - `item_id`（或 `id`）
+    - `start` + `freq`（对象内的 freq 优先，其次为请求 / payload 的 freq），或 `timestamp` 数组
+    - `target` 与各协变量为等长数组；标量值按序列长度广播
+    各序列的数组按列整段拼接，不逐行构造 dict。
+    """
+    lengths: List[int] = []
+    item_ids: List[Any] = []
+    generated: Dict[int, pd.DatetimeIndex] = {}
+    explicit: List[List[Any]] = []
+    columns: Dict[str, List[Optional[List[Any]]]] = {}
+
+    for index, block in enumerate(blocks):
+        if not is_series_block(block):
+            raise _series_error(
+                f"{where} 的序列对象必须提供 start（配合 freq）或 timestamp 数组，且不能与逐行记录混用",
+                where=where,
+                index=index,
+            )
+        item_id = block["item_id"] if "item_id" in block else block.get("id")
+        if item_id is None or isinstance(item_id, (list, dict)):
+            raise _series_error(f"{where} 的序列对象缺少 item_id", where=where, index=index)
+
+        timestamps = block.get("timestamp")
+        arrays = {k: v for k, v in block.items() if k not in _SERIES_RESERVED_KEYS and isinstance(v, list)}
+        if isinstance(timestamps, list):
+            length = len(timestamps)
+        elif arrays:
+            length = len(next(iter(arrays.values())))
+        else:
+            raise _series_error(f"{where} 的序列对象缺少数据数组", where=where, item_id=item_id)
+        for name, values in arrays.items():
+            if len(values) != length:
+                raise _series_error(
+                    f"{where} 的序列对象中各数组长度必须一致",
+                    where=where,
+                    item_id=item_id,
+                    column=name,
+                    expected=length,
+                    actual=len(values),
+                )
+
+        if isinstance(timestamps, list):
+            explicit.append(timestamps)
+        else:
+            block_freq = block.get("freq") or freq
+            if not block_freq:
+                raise _series_error(
+                    f"{where} 的序列对象使用 start 时需要提供 freq（对象内或请求 / 输入中的 freq）",
+                    where=where,
+                    item_id=item_id,
+                )
+            try:
+                generated[index] = pd.date_range(start=block["start"], periods=length, freq=block_freq)
+            except Exception as exc:
+                raise _series_error(
+                    f"{where} 的序列对象 start / freq 无法生成时间戳",
+                    where=where,
+                    item_id=item_id,
+                    reason=str(exc),
+                ) from exc
+
+        for name, value in block.items():
+            if name in _SERIES_RESERVED_KEYS:
+                continue
+            parts = columns.get(name)
+            if parts is None:
+                parts = columns[name] = [None] * index
+            parts.append(value if isinstance(value, list) else [value] * length)
+        for parts in columns.values():
+            if len(parts) <= index:
+                parts.append(None)
+        lengths.append(length)
+        item_ids.append(item_id)
+
+    if not generated:
+        # 全部为显式时间戳：保持原始值，交给 parse_input_frames 统一解析（与逐行记录相同）
+        timestamp_column: Any = list(chain.from_iterable(explicit))
+    else:
+        explicit_iter = iter(explicit)
+        pieces = []
+        for index, length in enumerate(lengths):
+            if index in generated:
+                pieces.append(generated[index])
+                continue
+            try:
+                pieces.append(pd.DatetimeIndex(pd.to_datetime(pd.Series(next(explicit_iter), dtype=object))))
+            except Exception as exc:
+                raise DataException(
+                    error_code=ErrorCode.DATA_FORMAT_ERROR,
+                    message=f"{where}.timestamp 无法解析为时间类型",
+                    details={"reason": str(exc)},
+                ) from exc
+        timestamp_column = pieces[0].append(pieces[1:])
+
+    data: Dict[str, Any] = {
+        "item_id": pd.Series(item_ids).repeat(lengths).to_numpy(),
+        "timestamp": timestamp_column,
+    }
+    for name, parts in columns.items():
+        data[name] = list(
+            chain.from_iterable(part if part is not None else [None] * n for part, n in zip(parts, lengths))
+        )
+    return pd.DataFrame(data)
+
+
+def section_to_frame(items: List[Any], *, freq: Optional[str], where: str) -> pd.DataFrame:
+    """
+    history_data / test_data / covariates -> DataFrame：逐行记录与按序列紧凑格式均可（按首个元素判断）。
+    """
+    if is_series_block(items[0]):
+        return series_blocks_to_frame(items, freq=freq, where=where)
+    return records_to_frame(items)
+
+
 def _require_columns(df: pd.DataFrame, required: Sequence[str], *, where: str) -> None:
     missing = [c for c in required if c not in df.columns]
     if missing:
@@ -82,39 +289,143 @@ def _parse_timestamp_column(df: pd.DataFrame, *, where: str) -> pd.DataFrame:
     return df
 
 
-def _infer_freq_per_item(history_df: pd.DataFrame) -> Optional[str]:
-    freqs: set[str] = set()
-    for _, group in history_df.groupby("item_id", sort=False):
-        ts = group.sort_values("timestamp")["timestamp"]
-        if len(ts) < 3:
-            continue
-        inferred = pd.infer_freq(ts)
-        if inferred:
-            freqs.add(str(inferred))
-    if not freqs:
-        return None
-    if len(freqs) > 1:
-        return None
-    return next(iter(freqs))
+_NS_PER_DAY = 86_400 * 10**9
+# 等间隔且短于 28 天的序列直接由间隔得到频率；更长的间隔可能命中月/季/年规则，交给 pd.infer_freq
+_FAST_FREQ_MAX_DAYS = 28
+_WEEKDAY_ALIASES = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+_MAX_REPORTED_ITEMS = 50
 
 
-def parse_markdown_payload(
-    payload: Dict[str, Any],
+def _uniform_delta_freq(delta_ns: int, weekday: int) -> str:
+    # 与 pd.infer_freq 对等间隔序列的结果一致：整周为 W-<首个时间点的星期>，其余按 Tick 偏移
+    if delta_ns % (7 * _NS_PER_DAY) == 0:
+        weeks = delta_ns // (7 * _NS_PER_DAY)
+        alias = f"W-{_WEEKDAY_ALIASES[weekday]}"
+        return alias if weeks == 1 else f"{weeks}{alias}"
+    return to_offset(pd.Timedelta(delta_ns)).freqstr
+
+
+def _infer_item_freqs(history_df: pd.DataFrame) -> pd.Series:
+    """
+    逐序列推断频率，返回 item_id -> freq（只含可推断的序列）。
+
+    全部序列的相邻间隔一次算出：等间隔的序列直接映射为频率，
+    其余（月末、工作日、不规则、带时区等）才逐条调用 pd.infer_freq。
+    """
+    codes, uniques = pd.factorize(history_df["item_id"], sort=False)
+    if len(codes) and np.any(codes[1:] < codes[:-1]):
+        history_df = history_df.sort_values(["item_id", "timestamp"], kind="stable")
+        codes, uniques = pd.factorize(history_df["item_id"], sort=False)
+    ts = history_df["timestamp"]
+    n = len(ts)
+    if n == 0:
+        return pd.Series(dtype=object)
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    eligible = lengths >= 3
+    fast = np.zeros(len(starts), dtype=bool)
+    freqs = np.full(len(starts), None, dtype=object)
+
+    # 带时区的序列按本地时间计算间隔（夏令时），不走向量化路径
+    if n >= 2 and pd.api.types.is_datetime64_dtype(ts.dtype):
+        values = ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        deltas = np.diff(values)
+        lo = deltas.copy()
+        hi = deltas.copy()
+        # 跨 item 的间隔不参与各自序列的 min/max
+        lo[starts[1:] - 1] = np.iinfo(np.int64).max
+        hi[starts[1:] - 1] = np.iinfo(np.int64).min
+        segments = np.minimum(starts, len(deltas) - 1)
+        dmin = np.minimum.reduceat(lo, segments)
+        dmax = np.maximum.reduceat(hi, segments)
+        fast = (
+            eligible
+            & (dmin == dmax)
+            & (dmin > 0)
+            & ((dmin % _NS_PER_DAY != 0) | (dmin < _FAST_FREQ_MAX_DAYS * _NS_PER_DAY))
+        )
+        if fast.any():
+            fast_idx = np.flatnonzero(fast)
+            delta = dmin[fast_idx]
+            weekday = pd.DatetimeIndex(values[starts[fast_idx]]).weekday.to_numpy()
+            weekday = np.where(delta % (7 * _NS_PER_DAY) == 0, weekday, 0)
+            # 不同的（间隔, 星期）组合通常只有一两种，逐组合映射一次
+            keys = pd.MultiIndex.from_arrays([delta, weekday])
+            key_codes, key_uniques = keys.factorize()
+            mapped = np.array([_uniform_delta_freq(int(d), int(w)) for d, w in key_uniques], dtype=object)
+            freqs[fast_idx] = mapped[key_codes]
+
+    for pos in np.flatnonzero(eligible & ~fast):
+        start = starts[pos]
+        freqs[pos] = pd.infer_freq(ts.iloc[start : start + lengths[pos]])
+    return pd.Series(freqs, index=pd.Index(uniques)).dropna().astype(str)
+
+
+def _infer_freq_per_item(history_df: pd.DataFrame) -> FreqInference:
+    item_freqs = _infer_item_freqs(history_df)
+    if item_freqs.empty:
+        return FreqInference(freq=None, freq_counts={}, dominant_freq=None, disagreeing_items=[])
+    counts = item_freqs.value_counts()
+    dominant = str(counts.index[0])
+    disagreeing = item_freqs.index[item_freqs.to_numpy() != dominant].tolist()
+    return FreqInference(
+        freq=dominant if len(counts) == 1 else None,
+        freq_counts={str(k): int(v) for k, v in counts.items()},
+        dominant_freq=dominant,
+        disagreeing_items=disagreeing,
+    )
+
+
+def _timestamps_as_ns(ts: Any) -> np.ndarray:
+    # 统一到纳秒整数（带时区时为 UTC），datetime64[us] 等其他精度的输入也能直接比较
+    return pd.DatetimeIndex(ts).as_unit("ns").asi8
+
+
+def _validate_future_cov_window(
+    history_df: pd.DataFrame,
+    future_cov_df: pd.DataFrame,
     *,
     prediction_length: int,
-    with_cov: bool,
-    freq_override: Optional[str],
-    max_series: int,
-    max_points_per_series: int,
-    max_prediction_length: int,
-) -> ParsedMarkdownInput:
+    freq: str,
+) -> Dict[str, List[str]]:
     """
-    Validate and normalize JSON payload (extracted from markdown) into DataFrames.
+    检查每个序列的 covariates 时间戳恰好是历史末尾之后的 prediction_length 步，返回不满足的 item。
 
-    Returns DataFrames with normalized columns:
-    - history_df: timestamp, item_id, target, + covariates (optional)
-    - covariates_df: timestamp, item_id, + known covariates (optional)
+    调用前 covariates 已按 item_id、timestamp 排序且每个 item 恰好 prediction_length 行，
+    因此整列可直接 reshape 为 (item 数, prediction_length) 的矩阵；期望时间网格只按不同的
+    历史末尾时间戳各生成一次，再整体比较，不逐 item get_group / date_range。
     """
+    last_hist = history_df.groupby("item_id")["timestamp"].max()
+    future_items = pd.Index(future_cov_df["item_id"].drop_duplicates())
+    rows = future_items.get_indexer(last_hist.index)
+    covered = np.zeros(len(last_hist), dtype=bool)
+
+    future_ts = future_cov_df["timestamp"]
+    # 时区不同（含一侧无时区）时与逐 item 比较 Series 的结果一致：全部视为未覆盖
+    same_tz = str(future_ts.dt.tz) == str(last_hist.dt.tz)
+    has_future = (rows >= 0) & last_hist.notna().to_numpy()
+    if same_tz and has_future.any():
+        future_matrix = _timestamps_as_ns(future_ts).reshape(len(future_items), prediction_length)
+        last_codes, last_uniques = pd.factorize(last_hist[has_future], sort=False)
+        grids = np.vstack(
+            [
+                _timestamps_as_ns(pd.date_range(start=last_ts, periods=prediction_length + 1, freq=freq)[1:])
+                for last_ts in last_uniques
+            ]
+        )
+        covered[has_future] = (future_matrix[rows[has_future]] == grids[last_codes]).all(axis=1)
+
+    invalid_items: Dict[str, List[str]] = {}
+    for item_id, row, ok in zip(last_hist.index, rows, covered):
+        if row < 0:
+            invalid_items[str(item_id)] = ["missing_future_covariates"]
+        elif not ok:
+            invalid_items[str(item_id)] = ["future_covariates_not_cover_prediction_window"]
+    return invalid_items
+
+
+def _validate_prediction_length(prediction_length: int, max_prediction_length: int) -> None:
     if prediction_length <= 0:
         raise DataException(
             error_code=ErrorCode.VALIDATION_ERROR,
@@ -128,6 +439,67 @@ def parse_markdown_payload(
             details={"prediction_length": prediction_length, "max_prediction_length": max_prediction_length},
         )
 
+
+def parse_markdown_bytes(
+    markdown_bytes: bytes,
+    *,
+    prediction_length: int,
+    with_cov: bool,
+    freq_override: Optional[str],
+    max_series: int,
+    max_points_per_series: int,
+    max_prediction_length: int,
+    max_upload_bytes: int,
+) -> ParsedMarkdownInput:
+    """
+    完整读入的 Markdown 字节 -> ParsedMarkdownInput（大小检查、UTF-8 解码、提取 JSON、校验）。
+    """
+    if len(markdown_bytes) > max_upload_bytes:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="上传文件超过大小限制",
+            details={"max_upload_bytes": max_upload_bytes},
+        )
+
+    try:
+        markdown_text = markdown_bytes.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        raise DataException(
+            error_code=ErrorCode.DATA_FORMAT_ERROR,
+            message="Markdown 文件编码错误，请使用 UTF-8 编码",
+        ) from exc
+
+    payload = extract_json_from_markdown(markdown_text)
+    return parse_markdown_payload(
+        payload,
+        prediction_length=prediction_length,
+        with_cov=with_cov,
+        freq_override=freq_override,
+        max_series=max_series,
+        max_points_per_series=max_points_per_series,
+        max_prediction_length=max_prediction_length,
+    )
+
+
+def parse_markdown_payload(
+    payload: Dict[str, Any],
+    *,
+    prediction_length: int,
+    with_cov: bool,
+    freq_override: Optional[str],
+    max_series: int,
+    max_points_per_series: int,
+    max_prediction_length: int,
+) -> ParsedMarkdownInput:
+    """
+    Validate and normalize JSON payload (extracted from markdown) into DataFrames.
+
+    Returns DataFrames with normalized columns:
+    - history_df: timestamp, item_id, target, + covariates (optional)
+    - covariates_df: timestamp, item_id, + known covariates (optional)
+    """
+    _validate_prediction_length(prediction_length, max_prediction_length)
+
     history_data = payload.get("history_data")
     if not isinstance(history_data, list) or not history_data:
         raise DataException(
@@ -135,8 +507,49 @@ def parse_markdown_payload(
             message="history_data 不能为空（请在 Markdown 的 JSON 中提供 history_data 数组）",
         )
 
-    history_data = _normalize_id_key(history_data)
-    history_df = pd.DataFrame(history_data)
+    test_data = payload.get("test_data")
+    covariates = payload.get("covariates")
+    # 紧凑格式按 start 生成时间戳时使用的 freq（与 parse_input_frames 的优先级一致）
+    freq = freq_override or payload.get("freq") or None
+    return parse_input_frames(
+        section_to_frame(history_data, freq=freq, where="history_data"),
+        test_df=(
+            section_to_frame(test_data, freq=freq, where="test_data")
+            if isinstance(test_data, list) and test_data
+            else None
+        ),
+        covariates_df=(
+            section_to_frame(covariates, freq=freq, where="covariates")
+            if with_cov and isinstance(covariates, list) and covariates
+            else None
+        ),
+        meta=payload,
+        prediction_length=prediction_length,
+        with_cov=with_cov,
+        freq_override=freq_override,
+        max_series=max_series,
+        max_points_per_series=max_points_per_series,
+    )
+
+
+def parse_input_frames(
+    history_df: pd.DataFrame,
+    *,
+    test_df: Optional[pd.DataFrame],
+    covariates_df: Optional[pd.DataFrame],
+    meta: Dict[str, Any],
+    prediction_length: int,
+    with_cov: bool,
+    freq_override: Optional[str],
+    max_series: int,
+    max_points_per_series: int,
+) -> ParsedMarkdownInput:
+    """
+    校验并规范化已构造好的原始 DataFrame（JSON 解析与流式解析共用）。
+
+    - history_df / test_df / covariates_df：记录级 DataFrame，id 已归一为 item_id
+    - meta：payload 中的其余字段（freq、known_covariates_names、category_cov_name 等）
+    """
     _require_columns(history_df, ["timestamp", "item_id", "target"], where="history_data")
     history_df = _parse_timestamp_column(history_df, where="history_data")
 
@@ -156,29 +569,36 @@ def parse_markdown_payload(
             details={"max_points_per_series": max_points_per_series, "violations": too_long.to_dict()},
         )
 
-    # freq: prefer override > payload > infer
-    freq = (freq_override or payload.get("freq") or "").strip()
+    # freq: prefer override > meta > infer
+    freq = (freq_override or meta.get("freq") or "").strip()
     if not freq:
         inferred = _infer_freq_per_item(history_df)
-        if not inferred:
+        if inferred.disagreeing_items:
+            raise DataException(
+                error_code=ErrorCode.VALIDATION_ERROR,
+                message="各序列推断出的时间频率不一致，请在输入中提供 freq（例如 D/H/W/M）",
+                details={
+                    "freq_counts": inferred.freq_counts,
+                    "dominant_freq": inferred.dominant_freq,
+                    "disagreeing_items": inferred.disagreeing_items[:_MAX_REPORTED_ITEMS],
+                    "disagreeing_count": len(inferred.disagreeing_items),
+                },
+            )
+        if not inferred.freq:
             raise DataException(
                 error_code=ErrorCode.VALIDATION_ERROR,
                 message="无法推断时间频率，请在输入中提供 freq（例如 D/H/W/M）",
             )
-        freq = inferred
+        freq = inferred.freq
 
     future_cov_df: Optional[pd.DataFrame] = None
     known_covariates_names: List[str] = []
-    test_df: Optional[pd.DataFrame] = None
     category_covariates_names: List[str] = []
 
     # Optional test_data: if provided, can be concatenated to history_data for evaluation.
     # This is NOT required. If omitted, metrics can still be computed on history_data by holding out
     # the last prediction_length time steps (note this can be optimistic since model may see the holdout).
-    test_data = payload.get("test_data")
-    if isinstance(test_data, list) and test_data:
-        test_data = _normalize_id_key(test_data)
-        test_df = pd.DataFrame(test_data)
+    if test_df is not None:
         _require_columns(test_df, ["timestamp", "item_id", "target"], where="test_data")
         test_df = _parse_timestamp_column(test_df, where="test_data")
         test_df = test_df.sort_values(["item_id", "timestamp"]).reset_index(drop=True)
@@ -195,7 +615,7 @@ def parse_markdown_payload(
     def _read_name_list(keys: Sequence[str]) -> List[str]:
         names: List[str] = []
         for key in keys:
-            value = payload.get(key)
+            value = meta.get(key)
             if isinstance(value, list):
                 names.extend([str(x).strip() for x in value if str(x).strip()])
             elif isinstance(value, str):
@@ -211,17 +631,15 @@ def parse_markdown_payload(
     category_covariates_names = _read_name_list(["category_cov_name", "category_name"])
 
     if with_cov:
-        # known cov names: payload or infer from covariates keys
+        # known cov names: meta or infer from covariates keys
         known_covariates_names = _read_name_list(["known_covariates_names", "know_cov_name"])
 
-        covariates = payload.get("covariates")
-        if not isinstance(covariates, list) or not covariates:
+        if covariates_df is None or covariates_df.empty:
             raise DataException(
                 error_code=ErrorCode.DATA_FORMAT_ERROR,
                 message="with_cov=true 时必须提供 covariates（未来已知协变量）",
             )
-        covariates = _normalize_id_key(covariates)
-        future_cov_df = pd.DataFrame(covariates)
+        future_cov_df = covariates_df
         _require_columns(future_cov_df, ["timestamp", "item_id"], where="covariates")
         future_cov_df = _parse_timestamp_column(future_cov_df, where="covariates")
         future_cov_df = future_cov_df.sort_values(["item_id", "timestamp"]).reset_index(drop=True)
@@ -320,20 +738,9 @@ def parse_markdown_payload(
                 details={"group_counts": group_counts.to_dict(), "prediction_length": prediction_length},
             )
 
-        last_hist = history_df.groupby("item_id")["timestamp"].max()
-        future_groups = future_cov_df.groupby("item_id")["timestamp"]
-        invalid_items: Dict[str, List[str]] = {}
-        for item_id, last_ts in last_hist.items():
-            try:
-                future_ts = future_groups.get_group(item_id).sort_values()
-            except Exception:
-                invalid_items[str(item_id)] = ["missing_future_covariates"]
-                continue
-            expected = pd.date_range(start=last_ts, periods=prediction_length + 1, freq=freq)[1:]
-            if len(future_ts) != len(expected) or not future_ts.reset_index(drop=True).equals(
-                pd.Series(expected).reset_index(drop=True)
-            ):
-                invalid_items[str(item_id)] = ["future_covariates_not_cover_prediction_window"]
+        invalid_items = _validate_future_cov_window(
+            history_df, future_cov_df, prediction_length=prediction_length, freq=freq
+        )
         if invalid_items:
             raise DataException(
                 error_code=ErrorCode.FUTURE_COV_MISMATCH,
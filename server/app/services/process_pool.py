@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from app.services.job_context import JobCancelled, JobContext, bind_job
+
+
+logger = logging.getLogger(__name__)
+
+_POLL_SECONDS = 0.2
+_PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+class WorkerJobError(Exception):
+    """
+    工作进程内任务失败；remote_trace 为子进程中的异常堆栈。
+    """
+
+    def __init__(self, message: str, remote_trace: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.remote_trace = remote_trace
+
+
+def _current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+
+        # 非 Linux 平台退化为峰值 RSS（Linux 单位 KB，macOS 单位字节，这里按 KB 处理偏保守）
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+    except Exception:
+        return 0
+
+
+def _worker_main(conn: Any) -> None:
+    # Ctrl+C 由主进程统一处理，子进程只在收到 None 或被终止时退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    send_lock = threading.Lock()
+
+    def _send(message: Any) -> None:
+        with send_lock:
+            conn.send(message)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        func, args, kwargs, job_id, timeout_seconds = message
+
+        ctx = JobContext(job_id, timeout_seconds=timeout_seconds)
+        bind_job(ctx)
+        stop = threading.Event()
+
+        def _report() -> None:
+            while not stop.wait(_PROGRESS_INTERVAL_SECONDS):
+                try:
+                    _send(("progress", ctx.progress()))
+                except Exception:
+                    return
+
+        reporter = threading.Thread(target=_report, name="job-progress", daemon=True)
+        reporter.start()
+        try:
+            outcome = ("ok", func(*args, **kwargs))
+        except JobCancelled as exc:
+            outcome = ("cancelled", exc.reason)
+        except BaseException as exc:
+            outcome = ("error", {"message": str(exc), "trace": traceback.format_exc()})
+        finally:
+            stop.set()
+            reporter.join()
+        try:
+            _send(("done", outcome[0], outcome[1], _current_rss_bytes()))
+        except Exception as exc:
+            # 结果无法序列化时仍需回报，否则主进程会一直等待
+            _send(("done", "error", {"message": f"任务结果无法回传: {exc}", "trace": None}, _current_rss_bytes()))
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Any
+    jobs_done: int = 0
+    rss_bytes: int = 0
+
+
+class ProcessWorkerPool:
+    """
+    异步任务的多进程执行后端。
+
+    - 每个任务在独立的工作进程中运行，训练不与 API 进程争抢 GIL，内存随进程回收归还给操作系统
+    - 工作进程执行满 max_jobs_per_worker 个任务或 RSS 超过 max_rss_bytes 后退出，下次按需重新拉起
+    - 取消 / 超时时直接终止对应进程（不依赖任务内的协作式检查点）
+    - 使用 spawn 启动方式，避免 fork 继承 CUDA / 线程池状态
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int,
+        max_jobs_per_worker: int = 0,
+        max_rss_bytes: int = 0,
+        start_method: str = "spawn",
+    ) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_jobs_per_worker = max(0, int(max_jobs_per_worker))
+        self.max_rss_bytes = max(0, int(max_rss_bytes))
+        self._mp = multiprocessing.get_context(start_method)
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._idle: List[_Worker] = []
+        self._busy: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.spawned = 0
+        self.recycled = 0
+        self.killed = 0
+
+    def run(self, func: Callable[..., Any], args: tuple, kwargs: dict, ctx: JobContext) -> Any:
+        """
+        在工作进程中执行 func(*args, **kwargs) 并阻塞等待结果（在线程中调用）。
+
+        func 必须是模块级函数（按引用序列化）；进度通过 ctx 回传给 API 进程。
+        """
+        self._slots.acquire()
+        worker: Optional[_Worker] = None
+        retire = True
+        try:
+            worker = self._checkout()
+            worker.conn.send((func, args, kwargs, ctx.job_id, ctx.remaining_seconds()))
+            while True:
+                reason = "cancelled" if self._closed else ctx.cancel_reason
+                if reason is not None:
+                    self._kill(worker)
+                    raise JobCancelled(reason)
+                if not worker.conn.poll(_POLL_SECONDS):
+                    if not worker.process.is_alive():
+                        raise WorkerJobError(f"工作进程异常退出（exitcode={worker.process.exitcode}）")
+                    continue
+                message = worker.conn.recv()
+                if message[0] == "progress":
+                    ctx.update_progress(message[1])
+                    continue
+                _, status, payload, rss_bytes = message
+                worker.jobs_done += 1
+                worker.rss_bytes = int(rss_bytes)
+                retire = self._should_recycle(worker)
+                if status == "ok":
+                    return payload
+                if status == "cancelled":
+                    raise JobCancelled(payload)
+                raise WorkerJobError(payload.get("message", ""), remote_trace=payload.get("trace"))
+        except (EOFError, OSError) as exc:
+            raise WorkerJobError(f"工作进程通信失败: {exc}") from exc
+        finally:
+            if worker is not None:
+                self._checkin(worker, retire=retire)
+            self._slots.release()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            self._stop(worker, timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            workers = [*self._idle, *self._busy]
+            return {
+                "max_workers": self.max_workers,
+                "alive": sum(1 for w in workers if w.process.is_alive()),
+                "busy": len(self._busy),
+                "spawned": self.spawned,
+                "recycled": self.recycled,
+                "killed": self.killed,
+                "rss_mb": [round(w.rss_bytes / (1024 * 1024), 1) for w in workers],
+            }
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    self._busy.append(worker)
+                    return worker
+        worker = self._spawn()
+        with self._lock:
+            self._busy.append(worker)
+        return worker
+
+    def _checkin(self, worker: _Worker, *, retire: bool) -> None:
+        with self._lock:
+            if worker in self._busy:
+                self._busy.remove(worker)
+            keep = not retire and not self._closed and worker.process.is_alive()
+            if keep:
+                self._idle.append(worker)
+        if not keep:
+            if retire and worker.process.is_alive():
+                self.recycled += 1
+                logger.info(
+                    "回收任务工作进程: pid=%s, jobs=%d, rss=%.1fMB",
+                    worker.process.pid,
+                    worker.jobs_done,
+                    worker.rss_bytes / (1024 * 1024),
+                )
+            self._stop(worker)
+
+    def _should_recycle(self, worker: _Worker) -> bool:
+        if self.max_jobs_per_worker and worker.jobs_done >= self.max_jobs_per_worker:
+            return True
+        return bool(self.max_rss_bytes and worker.rss_bytes >= self.max_rss_bytes)
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._mp.Pipe(duplex=True)
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(child_conn,),
+            name=f"job-worker-{self.spawned + 1}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self.spawned += 1
+        logger.info("任务工作进程已启动: pid=%s", process.pid)
+        return _Worker(process=process, conn=parent_conn)
+
+    def _kill(self, worker: _Worker) -> None:
+        if worker.process.is_alive():
+            self.killed += 1
+            logger.info("终止任务工作进程: pid=%s", worker.process.pid)
+            worker.process.terminate()
+        worker.process.join(timeout=5)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join(timeout=5)
+
+    @staticmethod
+    def _stop(worker: _Worker, timeout: float = 5.0) -> None:
+        if worker.process.is_alive():
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            worker.process.join(timeout=timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(timeout=timeout)
+        worker.conn.close()
@@ -0,0 +1,225 @@
+"""
+预测结果的响应编码与内容协商。
+
+- Accept 为 Arrow IPC（stream）或 Parquet 时，直接由预测 DataFrame 编码为二进制表，
+  其余结果字段（metrics、model_used 等）以 JSON 写入 schema 元数据的 `forecast` 键
+- 否则返回 JSON；Accept-Encoding 支持 zstd（需安装 zstandard）或 gzip 时压缩响应体
+- 不认识的 Accept 一律按 JSON 处理，不返回 406
+- 编码与压缩（可达数 MB）在线程池中执行，不阻塞事件循环
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.exceptions import DataException, ErrorCode
+
+try:
+    import orjson as _orjson  # type: ignore
+except Exception:  # 可选依赖：未安装时使用标准库 json
+    _orjson = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+# 结果格式 -> 响应 media type
+RESULT_MEDIA_TYPES: Dict[str, str] = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+_ACCEPT_ALIASES: Dict[str, str] = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/json": "json",
+}
+# schema 元数据中存放其余结果字段的键
+METADATA_KEY = b"forecast"
+
+
+def _parse_header_values(header: Optional[str]) -> List[Tuple[str, float]]:
+    values: List[Tuple[str, float]] = []
+    for part in (header or "").split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        values.append((name.lower(), q))
+    return values
+
+
+def negotiate_result_format(accept: Optional[str]) -> str:
+    """
+    按 Accept 选择结果格式：arrow / parquet / json（q 值最高者优先，相同时按出现顺序）。
+    """
+    best, best_q = "json", 0.0
+    for media_type, q in _parse_header_values(accept):
+        fmt = _ACCEPT_ALIASES.get(media_type)
+        if fmt is not None and q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+def _zstd_module() -> Any:
+    try:
+        import zstandard  # type: ignore
+    except Exception:
+        return None
+    return zstandard
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    按 Accept-Encoding 选择压缩方式：zstd（已安装 zstandard 时）优先于 gzip；都不接受时返回 None。
+    """
+    accepted = {name: q for name, q in _parse_header_values(accept_encoding)}
+    candidates = []
+    if accepted.get("zstd", 0.0) > 0 and _zstd_module() is not None:
+        candidates.append(("zstd", accepted["zstd"]))
+    if accepted.get("gzip", 0.0) > 0:
+        candidates.append(("gzip", accepted["gzip"]))
+    if not candidates:
+        return None
+    return max(candidates, key=lambda item: item[1])[0]
+
+
+def _json_bytes(body: Any) -> bytes:
+    content = jsonable_encoder(body)
+    if _orjson is not None:
+        return _orjson.dumps(content)
+    # 与 JSONResponse 的编码参数一致
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return _zstd_module().ZstdCompressor(level=settings.RESPONSE_ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+
+
+async def json_response(request: Request, body: Any) -> Any:
+    """
+    JSON 响应：客户端接受 zstd / gzip 时在线程池中编码，响应体足够大时再压缩；
+    否则原样返回交给 FastAPI 序列化（保留 response_model）。
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding is None:
+        return body
+    return await run_in_threadpool(_encoded_json_response, body, encoding)
+
+
+def _encoded_json_response(body: Any, encoding: str) -> Response:
+    data = _json_bytes(body)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(data) < settings.RESPONSE_COMPRESS_MIN_BYTES:
+        return Response(content=data, media_type=JSON_MEDIA_TYPE, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(content=compress(data, encoding), media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def predictions_frame(predictions: Any) -> pd.DataFrame:
+    """
+    predictions（DataFrame / records 列表 / columnar 列表）-> 行级 DataFrame。
+
+    同步接口直接拿到预测 DataFrame；已持久化的异步任务结果只有 JSON 形态，按其格式还原。
+    """
+    if isinstance(predictions, pd.DataFrame):
+        return predictions
+    rows = list(predictions or [])
+    if not rows or "start" not in rows[0] or "timestamp" in rows[0]:
+        return pd.DataFrame(rows)
+
+    frames = []
+    for obj in rows:
+        arrays = {k: v for k, v in obj.items() if isinstance(v, list)}
+        length = len(next(iter(arrays.values()))) if arrays else 0
+        timestamps = pd.date_range(start=obj["start"], periods=length, freq=obj.get("freq"))
+        frames.append(pd.DataFrame({"item_id": obj.get("item_id"), "timestamp": timestamps, **arrays}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _lazy_import_pyarrow(fmt: str) -> Any:
+    try:
+        import pyarrow  # type: ignore
+        import pyarrow.ipc  # type: ignore  # noqa: F401
+        import pyarrow.parquet  # type: ignore  # noqa: F401
+    except Exception as exc:
+        raise DataException(
+            error_code=ErrorCode.BAD_REQUEST,
+            message=f"服务端未安装 pyarrow，无法返回 {fmt} 格式结果（可改用 Accept: application/json）",
+            status_code=406,
+            details={"format": fmt},
+        ) from exc
+    return pyarrow
+
+
+def encode_result_table(predictions: Any, metadata: Dict[str, Any], *, fmt: str) -> bytes:
+    """
+    预测结果 -> Arrow IPC stream / Parquet 字节；metadata 以 JSON 写入 schema 元数据。
+    """
+    pa = _lazy_import_pyarrow(fmt)
+    df = predictions_frame(predictions)
+    if "timestamp" in df.columns and df["timestamp"].dtype == object:
+        # 输出前时间戳已转为字符串（JSON 用），二进制格式恢复为时间类型
+        df = df.assign(timestamp=pd.to_datetime(df["timestamp"]))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[METADATA_KEY] = _json_bytes(metadata)
+    table = table.replace_schema_metadata(schema_metadata)
+
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        pa.parquet.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+async def _table_response(predictions: Any, metadata: Dict[str, Any], fmt: str) -> Response:
+    content = await run_in_threadpool(encode_result_table, predictions, metadata, fmt=fmt)
+    return Response(
+        content=content,
+        media_type=RESULT_MEDIA_TYPES[fmt],
+        headers={"Vary": "Accept, Accept-Encoding"},
+    )
+
+
+async def forecast_response(request: Request, result: Dict[str, Any], *, result_format: str) -> Any:
+    """
+    同步预测接口的响应：二进制格式时 predictions 写为表，其余字段进元数据；否则走 json_response。
+    """
+    if result_format in RESULT_MEDIA_TYPES:
+        metadata = {key: value for key, value in result.items() if key != "predictions"}
+        return await _table_response(result.get("predictions"), metadata, result_format)
+    return await json_response(request, result)
+
+
+async def job_response(request: Request, record: Dict[str, Any]) -> Any:
+    """
+    /jobs/{job_id} 的响应：任务已成功且请求二进制格式时返回结果表，任务记录其余字段进元数据；
+    未完成 / 失败的任务仍返回 JSON（便于轮询）。
+    """
+    result_format = negotiate_result_format(request.headers.get("accept"))
+    result = record.get("result")
+    if result_format in RESULT_MEDIA_TYPES and isinstance(result, dict) and "predictions" in result:
+        metadata = dict(record)
+        metadata["result"] = {key: value for key, value in result.items() if key != "predictions"}
+        return await _table_response(result["predictions"], metadata, result_format)
+    return await json_response(request, record)
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services.forecast_output import PredictionsCallback, format_predictions
+from app.services.process import ParsedMarkdownInput
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedForecast:
+    key: str
+    pred_df: pd.DataFrame
+    metrics: Optional[Dict[str, Any]]
+    # 其余结果字段（model_used、model_id 等），命中时原样放回响应
+    extra: Dict[str, Any]
+    size_bytes: int
+    created_at: float
+    hits: int = field(default=0, compare=False)
+
+
+def _frame_digest(h: Any, name: str, df: Optional[pd.DataFrame]) -> None:
+    h.update(name.encode("utf-8"))
+    if df is None:
+        h.update(b"\x00")
+        return
+    h.update(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+
+def forecast_cache_key(
+    kind: str,
+    parsed: ParsedMarkdownInput,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    context_length: int,
+    model_id: Optional[str] = None,
+) -> str:
+    """
+    预测结果缓存键：解析后的输入（history / covariates / test）+ 影响结果的全部参数。
+
+    按解析、排序后的 DataFrame 取哈希，Markdown 排版、JSON 键顺序、数字写法不同的同一份数据命中同一条目。
+    """
+    h = hashlib.sha256()
+    params = {
+        "kind": kind,
+        "model_path": settings.CHRONOS_MODEL_PATH,
+        "model_id": model_id,
+        "prediction_length": int(prediction_length),
+        "quantiles": [float(q) for q in quantiles],
+        "metrics": list(metrics),
+        "with_cov": bool(with_cov),
+        "freq": parsed.freq,
+        "context_length": int(context_length),
+        "known_covariates_names": list(parsed.known_covariates_names),
+        "category_covariates_names": list(parsed.category_covariates_names),
+    }
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    _frame_digest(h, "history", parsed.history_df)
+    _frame_digest(h, "covariates", parsed.future_cov_df if with_cov else None)
+    _frame_digest(h, "test", parsed.test_df)
+    return h.hexdigest()
+
+
+class ForecastResultCache:
+    """
+    预测结果缓存（按 forecast_cache_key）：内存 LRU + 可选磁盘层，条目超过 TTL 后失效。
+
+    - 内存层：按预测 DataFrame 的内存占用计入 max_bytes，超出 max_bytes / max_entries 时淘汰最久未使用的条目
+    - 磁盘层（disk_dir 非空时启用）：写入 pickle，重启后仍可命中；超出 disk_max_bytes 时删除最旧的文件
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entries: int,
+        ttl_seconds: float,
+        disk_dir: str = "",
+        disk_max_bytes: int = 0,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, CachedForecast]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and ((self.max_bytes > 0 and self.max_entries > 0) or self.disk_dir is not None)
+
+    def get(self, key: str) -> Optional[CachedForecast]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry.created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    entry.hits += 1
+                    self.hits += 1
+                    return entry
+                self._entries.pop(key)
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            entry.hits += 1
+            self.disk_hits += 1
+            self._store_locked(entry)
+        return entry
+
+    def put(
+        self,
+        key: str,
+        pred_df: pd.DataFrame,
+        metrics: Optional[Dict[str, Any]],
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Optional[CachedForecast]:
+        if not self.enabled:
+            return None
+        entry = CachedForecast(
+            key=key,
+            pred_df=pred_df,
+            metrics=metrics,
+            extra=dict(extra or {}),
+            size_bytes=int(pred_df.memory_usage(index=True, deep=True).sum()),
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._store_locked(entry)
+        self._write_disk(entry)
+        return entry
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+        path = self._disk_path(key)
+        if path is not None and path.exists():
+            path.unlink(missing_ok=True)
+            removed = True
+        return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        if self.disk_dir is not None and self.disk_dir.exists():
+            for path in self.disk_dir.glob("*.pkl"):
+                path.unlink(missing_ok=True)
+                count += 1
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_dir": str(self.disk_dir) if self.disk_dir is not None else None,
+                "used_bytes": sum(e.size_bytes for e in self._entries.values()),
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _store_locked(self, entry: CachedForecast) -> None:
+        if self.max_bytes <= 0 or self.max_entries <= 0:
+            return
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        used = sum(e.size_bytes for e in self._entries.values())
+        while self._entries and (used > self.max_bytes or len(self._entries) > self.max_entries):
+            _, victim = self._entries.popitem(last=False)
+            used -= victim.size_bytes
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        if self.disk_dir is None:
+            return None
+        return self.disk_dir / f"{key}.pkl"
+
+    def _read_disk(self, key: str, now: float) -> Optional[CachedForecast]:
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            if now - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            with path.open("rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            logger.warning("预测结果缓存文件读取失败，已删除: %s, reason=%s", path, exc)
+            path.unlink(missing_ok=True)
+            return None
+        return entry if isinstance(entry, CachedForecast) else None
+
+    def _write_disk(self, entry: CachedForecast) -> None:
+        path = self._disk_path(entry.key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with tmp_path.open("wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._trim_disk()
+        except Exception as exc:
+            logger.warning("预测结果缓存写入磁盘失败: %s, reason=%s", path, exc)
+
+    def _trim_disk(self) -> None:
+        if self.disk_dir is None or self.disk_max_bytes <= 0:
+            return
+        files = []
+        for path in self.disk_dir.glob("*.pkl"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+
+
+def cached_forecast_result(
+    entry: CachedForecast,
+    *,
+    freq: str,
+    prediction_length: int,
+    quantiles: List[float],
+    output_format: str,
+    on_predictions: Optional[PredictionsCallback] = None,
+) -> Dict[str, Any]:
+    """
+    由缓存条目组装与正常预测相同结构的结果（cached=True）。
+    """
+    if on_predictions is not None:
+        on_predictions(entry.pred_df, freq)
+    result: Dict[str, Any] = {
+        "predictions": (
+            format_predictions(entry.pred_df, output_format=output_format, freq=freq)
+            if on_predictions is None
+            else []
+        ),
+        "prediction_shape": list(entry.pred_df.shape),
+        "prediction_length": prediction_length,
+        "quantiles": quantiles,
+        "metrics": entry.metrics,
+        **entry.extra,
+        "generated_at": pd.Timestamp.fromtimestamp(entry.created_at).isoformat(),
+        "cached": True,
+    }
+    return result
+
+
+forecast_result_cache = ForecastResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_MB * 1024 * 1024,
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    disk_dir=settings.RESULT_CACHE_DIR,
+    disk_max_bytes=settings.RESULT_CACHE_DISK_MAX_MB * 1024 * 1024,
+)
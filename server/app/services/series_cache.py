@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.metrics_helpers import restore_item_ids
+
+
+logger = logging.getLogger(__name__)
+
+# predict_fn(history_df, future_cov_df) -> 预测 DataFrame（item_id, timestamp, mean, 分位数列）
+SeriesPredictFn = Callable[[pd.DataFrame, Optional[pd.DataFrame]], pd.DataFrame]
+
+
+@dataclass
+class _SeriesEntry:
+    columns: Tuple[str, ...]
+    timestamps: np.ndarray
+    values: np.ndarray
+    created_at: float
+
+    @property
+    def size_bytes(self) -> int:
+        return int(self.timestamps.nbytes + self.values.nbytes) + 256
+
+
+def _item_slices(item_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    已按 item_id 排好序的数组 -> (各 item_id, 起始下标, 结束下标)。
+    """
+    if len(item_ids) == 0:
+        empty = np.array([], dtype=np.int64)
+        return np.array([], dtype=object), empty, empty
+    starts = np.flatnonzero(np.r_[True, item_ids[1:] != item_ids[:-1]])
+    ends = np.r_[starts[1:], len(item_ids)]
+    return item_ids[starts], starts, ends
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    cols = sorted(c for c in df.columns if c != "item_id")
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+class SeriesForecastCache:
+    """
+    单条序列级别的 zero-shot 预测缓存。
+
+    键为「该序列送入模型的上下文窗口（最后 context_length 个点，含过去协变量）+ 未来已知协变量 + 预测参数」的哈希，
+    不含 item_id 与 context_length 本身：内容相同的上下文共享同一条目，请求级参数变化不会让未变化的序列失效。
+    请求中只有未命中的序列送去推理，结果与命中的序列按原顺序合并。
+    Chronos-2 逐序列独立预测（见 zero_shot_batcher），拆分 / 合并不会改变单条序列的结果。
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int, ttl_seconds: float) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _SeriesEntry]" = OrderedDict()
+        self._used_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0 and self.ttl_seconds > 0
+
+    def predict(
+        self,
+        predict_fn: SeriesPredictFn,
+        history_df: pd.DataFrame,
+        future_cov_df: Optional[pd.DataFrame],
+        *,
+        prediction_length: int,
+        quantiles: List[float],
+        context_length: int,
+        freq: str,
+        model_key: str = "",
+    ) -> pd.DataFrame:
+        """
+        只对未命中的序列调用 predict_fn，返回与直接调用 predict_fn(history_df, future_cov_df) 相同结构的预测。
+        """
+        if not self.enabled or history_df.empty:
+            return predict_fn(history_df, future_cov_df)
+
+        history, future, item_ids, keys = self._series_keys(
+            history_df,
+            future_cov_df,
+            prediction_length=prediction_length,
+            quantiles=quantiles,
+            context_length=context_length,
+            freq=freq,
+            model_key=model_key,
+        )
+        cached = self._lookup(keys)
+        miss_items = [item_id for item_id, entry in zip(item_ids.tolist(), cached) if entry is None]
+        hit_count = len(keys) - len(miss_items)
+        if hit_count == 0:
+            pred = predict_fn(history, future)
+            self._store(pred, dict(zip(item_ids.tolist(), keys)))
+            return restore_item_ids(pred, history_df["item_id"])
+
+        logger.info("序列级预测缓存: series=%d, hits=%d, misses=%d", len(keys), hit_count, len(miss_items))
+        fresh: Dict[str, _SeriesEntry] = {}
+        if miss_items:
+            miss_set = set(miss_items)
+            pred = predict_fn(
+                history[history["item_id"].isin(miss_set)].reset_index(drop=True),
+                future[future["item_id"].isin(miss_set)].reset_index(drop=True) if future is not None else None,
+            )
+            fresh = self._store(pred, {item_id: key for item_id, key in zip(item_ids.tolist(), keys) if item_id in miss_set})
+            if not fresh:
+                # 预测结果无法按序列拆分（非数值列等），无法与缓存合并，整体重新预测
+                return restore_item_ids(predict_fn(history, future), history_df["item_id"])
+
+        return restore_item_ids(_assemble(item_ids.tolist(), cached, fresh), history_df["item_id"])
+
+    def _series_keys(
+        self,
+        history_df: pd.DataFrame,
+        future_cov_df: Optional[pd.DataFrame],
+        *,
+        prediction_length: int,
+        quantiles: List[float],
+        context_length: int,
+        freq: str,
+        model_key: str,
+    ) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], np.ndarray, List[str]]:
+        """
+        -> (截断到上下文窗口的 history, 排序后的 future, 各 item_id, 各序列的缓存键)。
+        """
+        history = history_df.assign(item_id=history_df["item_id"].astype(str))
+        history = history.sort_values(["item_id", "timestamp"], kind="stable")
+        history = history.groupby("item_id", sort=False).tail(int(context_length)).reset_index(drop=True)
+        item_ids, starts, ends = _item_slices(history["item_id"].to_numpy())
+        hist_hashes = _row_hashes(history)
+
+        cov_hashes: Dict[str, bytes] = {}
+        future = None
+        if future_cov_df is not None:
+            future = future_cov_df.assign(item_id=future_cov_df["item_id"].astype(str))
+            future = future.sort_values(["item_id", "timestamp"], kind="stable").reset_index(drop=True)
+            cov_ids, cov_starts, cov_ends = _item_slices(future["item_id"].to_numpy())
+            cov_row_hashes = _row_hashes(future)
+            for item_id, s, e in zip(cov_ids.tolist(), cov_starts.tolist(), cov_ends.tolist()):
+                cov_hashes[item_id] = cov_row_hashes[s:e].tobytes()
+
+        prefix = json.dumps(
+            {
+                "model": model_key,
+                "prediction_length": int(prediction_length),
+                "quantiles": [float(q) for q in quantiles],
+                "freq": freq,
+                "history_columns": sorted(str(c) for c in history.columns),
+                "covariate_columns": sorted(str(c) for c in future.columns) if future is not None else None,
+            },
+            sort_keys=True,
+        ).encode("utf-8")
+
+        keys: List[str] = []
+        for item_id, s, e in zip(item_ids.tolist(), starts.tolist(), ends.tolist()):
+            h = hashlib.blake2b(prefix, digest_size=20)
+            h.update(hist_hashes[s:e].tobytes())
+            h.update(b"|")
+            h.update(cov_hashes.get(item_id, b""))
+            keys.append(h.hexdigest())
+        return history, future, item_ids, keys
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._used_bytes = 0
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "used_bytes": self._used_bytes,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _lookup(self, keys: List[str]) -> List[Optional[_SeriesEntry]]:
+        now = time.time()
+        found: List[Optional[_SeriesEntry]] = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry.created_at > self.ttl_seconds:
+                    self._entries.pop(key)
+                    self._used_bytes -= entry.size_bytes
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                found.append(entry)
+        return found
+
+    def _store(self, pred: pd.DataFrame, keys_by_item: Dict[str, str]) -> Dict[str, _SeriesEntry]:
+        """
+        按 item_id 拆分预测结果写入缓存，返回 item_id -> 条目（拆分失败时返回空 dict）。
+        """
+        value_cols = tuple(str(c) for c in pred.columns if c not in ("item_id", "timestamp"))
+        try:
+            values = pred[list(value_cols)].to_numpy(dtype=float)
+        except (TypeError, ValueError):
+            return {}
+        pred_ids = pred["item_id"].astype(str).to_numpy()
+        order = np.argsort(pred_ids, kind="stable")
+        pred_ids = pred_ids[order]
+        timestamps = pred["timestamp"].to_numpy()[order]
+        values = values[order]
+
+        now = time.time()
+        entries: Dict[str, _SeriesEntry] = {}
+        ids, starts, ends = _item_slices(pred_ids)
+        for item_id, s, e in zip(ids.tolist(), starts.tolist(), ends.tolist()):
+            entries[item_id] = _SeriesEntry(
+                columns=value_cols,
+                timestamps=timestamps[s:e].copy(),
+                values=values[s:e].copy(),
+                created_at=now,
+            )
+
+        with self._lock:
+            for item_id, entry in entries.items():
+                key = keys_by_item.get(item_id)
+                if key is None:
+                    continue
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._used_bytes -= previous.size_bytes
+                self._entries[key] = entry
+                self._used_bytes += entry.size_bytes
+            while self._entries and (self._used_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, victim = self._entries.popitem(last=False)
+                self._used_bytes -= victim.size_bytes
+                self.evictions += 1
+        return entries
+
+
+def _assemble(
+    item_ids: List[str],
+    cached: List[Optional[_SeriesEntry]],
+    fresh: Dict[str, _SeriesEntry],
+) -> pd.DataFrame:
+    entries: List[Tuple[str, _SeriesEntry]] = []
+    for item_id, entry in zip(item_ids, cached):
+        entry = entry if entry is not None else fresh.get(item_id)
+        if entry is not None:
+            entries.append((item_id, entry))
+    columns = entries[0][1].columns
+    lengths = [len(entry.timestamps) for _, entry in entries]
+    out = pd.DataFrame(
+        np.concatenate([entry.values for _, entry in entries]),
+        columns=list(columns),
+    )
+    out.insert(0, "timestamp", np.concatenate([entry.timestamps for _, entry in entries]))
+    out.insert(0, "item_id", np.repeat(np.array([item_id for item_id, _ in entries], dtype=object), lengths))
+    return out
+
+
+series_forecast_cache = SeriesForecastCache(
+    max_bytes=settings.SERIES_CACHE_MAX_MB * 1024 * 1024,
+    max_entries=settings.SERIES_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SERIES_CACHE_TTL_SECONDS,
+)
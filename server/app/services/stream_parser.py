@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Any, BinaryIO, Dict, List, Optional
+
+import pandas as pd
+
+from app.core.exceptions import DataException, ErrorCode
+from app.services.process import (
+    _JSON_FENCE_OPEN_RE,
+    ParsedMarkdownInput,
+    _validate_prediction_length,
+    is_series_block,
+    parse_input_frames,
+    series_blocks_to_frame,
+)
+
+
+_FENCE = "```json"
+_WHITESPACE = " \t\r\n"
+_RECORD_SECTIONS = ("history_data", "test_data", "covariates")
+_DEFAULT_CHUNK_SIZE = 64 * 1024
+# 已消费的缓冲区前缀超过该长度时截断，保证缓冲区只保留尚未解析的尾部
+_COMPACT_THRESHOLD = 256 * 1024
+_VALUE_TAIL_MARGIN = 64
+
+
+class _ColumnBuilder:
+    """
+    逐条追加记录，按列累积（与 pd.DataFrame(list_of_dicts) 的列顺序、缺失值语义一致）。
+
+    首个元素为按序列组织的紧凑格式对象时，整段保存序列对象，to_frame 时统一展开。
+    """
+
+    def __init__(self, where: str) -> None:
+        self.where = where
+        self.columns: Dict[str, List[Any]] = {}
+        self.rows = 0
+        self.blocks: Optional[List[Dict[str, Any]]] = None
+        # 上一条记录的键序列及对应的列；键相同的记录（常见情况）直接按位置追加，不再逐行归一键名
+        self._last_keys: Optional[tuple] = None
+        self._last_columns: List[List[Any]] = []
+
+    def append(self, record: Dict[str, Any]) -> None:
+        if self.blocks is not None or (self.rows == 0 and is_series_block(record)):
+            if self.blocks is None:
+                self.blocks = []
+            self.blocks.append(record)
+            self.rows += 1
+            return
+        keys = tuple(record)
+        if keys == self._last_keys:
+            for column, value in zip(self._last_columns, record.values()):
+                column.append(value)
+            self.rows += 1
+            return
+        rename_id = "id" in keys and "item_id" not in keys
+        self._append_slow(record)
+        if len(keys) == len(self.columns):
+            self._last_keys = keys
+            self._last_columns = [self.columns["item_id" if rename_id and key == "id" else key] for key in keys]
+        else:
+            self._last_keys = None
+
+    def _append_slow(self, record: Dict[str, Any]) -> None:
+        if "item_id" not in record and "id" in record:
+            record["item_id"] = record.pop("id")
+        for key, value in record.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = [None] * self.rows
+                self.columns[key] = column
+            column.append(value)
+        self.rows += 1
+        if len(record) != len(self.columns):
+            for column in self.columns.values():
+                if len(column) < self.rows:
+                    column.append(None)
+
+    def to_frame(self, freq: Optional[str]) -> pd.DataFrame:
+        if self.blocks is not None:
+            return series_blocks_to_frame(self.blocks, freq=freq, where=self.where)
+        return pd.DataFrame(self.columns)
+
+
+class _SeriesLimiter:
+    """
+    流式过程中检查 MAX_SERIES / MAX_POINTS_PER_SERIES，超限时立即拒绝。
+    """
+
+    def __init__(self, max_series: int, max_points_per_series: int) -> None:
+        self.max_series = max_series
+        self.max_points_per_series = max_points_per_series
+        self.counts: Dict[Any, int] = {}
+
+    def add(self, item_id: Any) -> None:
+        try:
+            count = self.counts.get(item_id, 0) + 1
+        except TypeError:
+            # 不可哈希的 item_id 留给后续 DataFrame 校验报错
+            return
+        self.counts[item_id] = count
+        if count == 1 and len(self.counts) > self.max_series:
+            raise DataException(
+                error_code=ErrorCode.VALIDATION_ERROR,
+                message="序列数量超过服务限制",
+                details={"max_series": self.max_series, "series": len(self.counts)},
+            )
+        if count > self.max_points_per_series:
+            raise DataException(
+                error_code=ErrorCode.VALIDATION_ERROR,
+                message="单条序列历史点数超过服务限制",
+                details={"max_points_per_series": self.max_points_per_series, "violations": {item_id: count}},
+            )
+
+
+def _format_error(message: str, **details: Any) -> DataException:
+    return DataException(error_code=ErrorCode.DATA_FORMAT_ERROR, message=message, details=details or None)
+
+
+class _StreamReader:
+    """
+    UTF-8 增量解码 + 文本缓冲区；JSON 值通过 raw_decode 逐个解析，不需要把整个文档读入内存。
+    """
+
+    def __init__(self, stream: BinaryIO, *, chunk_size: int, max_bytes: int) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._max_bytes = max_bytes
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def fill(self) -> bool:
+        """
+        读入下一块数据；返回是否有新文本。
+        """
+        if self.eof:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        try:
+            if not chunk:
+                self.eof = True
+                text = self._decoder.decode(b"", final=True)
+            else:
+                self.bytes_read += len(chunk)
+                if self.bytes_read > self._max_bytes:
+                    raise DataException(
+                        error_code=ErrorCode.VALIDATION_ERROR,
+                        message="上传文件超过大小限制",
+                        details={"max_upload_bytes": self._max_bytes},
+                    )
+                text = self._decoder.decode(chunk)
+        except UnicodeDecodeError as exc:
+            raise DataException(
+                error_code=ErrorCode.DATA_FORMAT_ERROR,
+                message="Markdown 文件编码错误，请使用 UTF-8 编码",
+            ) from exc
+        if self.pos > _COMPACT_THRESHOLD:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        self.buf += text
+        return bool(text) or not self.eof
+
+    def find_fence(self) -> bool:
+        """
+        定位第一个 ```json 代码块并把读位置移到其后；找不到时位置停在文本开头（整份文本按 JSON 解析）。
+        """
+        search_from = 0
+        while True:
+            match = _JSON_FENCE_OPEN_RE.search(self.buf, search_from)
+            if match is not None:
+                self.pos = match.end()
+                return True
+            search_from = max(0, len(self.buf) - len(_FENCE))
+            if not self.fill():
+                self.pos = 0
+                return False
+
+    def skip_ws(self) -> None:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_ws()
+        return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise _format_error(
+                "Markdown 中未找到可解析的 JSON（请使用 ```json 代码块包裹输入）",
+                reason=f"expected {ch!r} at offset {self.bytes_read}",
+            )
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.skip_ws()
+        while True:
+            try:
+                obj, end = self._json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as exc:
+                if self.fill():
+                    continue
+                raise _format_error(
+                    "Markdown 中未找到可解析的 JSON（请使用 ```json 代码块包裹输入）",
+                    reason=str(exc),
+                ) from exc
+            # 数字可能被块边界截断（如 "12|34"、"1.5e|10"），值靠近缓冲区末尾时再读一块确认；
+            # fill 可能截断缓冲区使 end 失效（读到 EOF 时也会），因此无论是否读到新数据都重新解析
+            if not self.eof and len(self.buf) - end < _VALUE_TAIL_MARGIN:
+                self.fill()
+                continue
+            self.pos = end
+            return obj
+
+
+def _read_records(
+    reader: _StreamReader,
+    section: str,
+    builder: Optional[_ColumnBuilder],
+    limiter: Optional[_SeriesLimiter],
+) -> None:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        record = reader.value()
+        if not isinstance(record, dict):
+            raise _format_error(f"{section} 的元素必须为 JSON 对象", where=section)
+        if builder is not None:
+            builder.append(record)
+            if limiter is not None:
+                # 紧凑格式每个序列对象只计一次；其点数在展开后由 parse_input_frames 校验
+                limiter.add(record["item_id"] if "item_id" in record else record.get("id"))
+        sep = reader.peek()
+        reader.pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise _format_error(f"{section} 数组格式错误", where=section)
+
+
+def parse_markdown_stream(
+    stream: BinaryIO,
+    *,
+    prediction_length: int,
+    with_cov: bool,
+    freq_override: Optional[str],
+    max_series: int,
+    max_points_per_series: int,
+    max_prediction_length: int,
+    max_upload_bytes: int,
+    chunk_size: int = _DEFAULT_CHUNK_SIZE,
+) -> ParsedMarkdownInput:
+    """
+    流式解析上传的 Markdown（二进制文件对象），结果与 parse_markdown_bytes 一致。
+
+    - 逐块读取并增量解码，定位 ```json 代码块后逐条解析 history_data / test_data / covariates 记录
+    - 记录直接写入列式缓冲区，不保留原始文本与 list_of_dicts 副本
+    - 上传大小、序列数、单序列点数在读取过程中检查，超限时不再继续读取
+    """
+    _validate_prediction_length(prediction_length, max_prediction_length)
+
+    reader = _StreamReader(stream, chunk_size=chunk_size, max_bytes=max_upload_bytes)
+    reader.find_fence()
+
+    builders: Dict[str, Optional[_ColumnBuilder]] = {
+        "history_data": _ColumnBuilder("history_data"),
+        "test_data": _ColumnBuilder("test_data"),
+        # with_cov=false 时协变量会被忽略：只消费不保存
+        "covariates": _ColumnBuilder("covariates") if with_cov else None,
+    }
+    limiter = _SeriesLimiter(max_series, max_points_per_series)
+    seen_sections = set()
+    meta: Dict[str, Any] = {}
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+    else:
+        while True:
+            key = reader.value()
+            if not isinstance(key, str):
+                raise _format_error("JSON 对象的键必须为字符串")
+            reader.expect(":")
+            if key in _RECORD_SECTIONS and reader.peek() == "[":
+                builder = builders[key]
+                if key in seen_sections and builder is not None:
+                    # 与 json.loads 一致：重复的键以最后一次出现为准
+                    builder = builders[key] = _ColumnBuilder(key)
+                    if key == "history_data":
+                        limiter = _SeriesLimiter(max_series, max_points_per_series)
+                seen_sections.add(key)
+                meta.pop(key, None)
+                _read_records(reader, key, builder, limiter if key == "history_data" else None)
+            else:
+                meta[key] = reader.value()
+                if key in _RECORD_SECTIONS:
+                    seen_sections.discard(key)
+            sep = reader.peek()
+            reader.pos += 1
+            if sep == "}":
+                break
+            if sep != ",":
+                raise _format_error("JSON 对象格式错误")
+
+    history = builders["history_data"]
+    if "history_data" not in seen_sections or history is None or history.rows == 0:
+        raise DataException(
+            error_code=ErrorCode.DATA_EMPTY,
+            message="history_data 不能为空（请在 Markdown 的 JSON 中提供 history_data 数组）",
+        )
+    test = builders["test_data"]
+    covariates = builders["covariates"]
+    # 紧凑格式按 start 生成时间戳时使用的 freq；payload 的 freq 可能出现在记录之后，因此在读完后统一展开
+    freq = freq_override or meta.get("freq") or None
+    return parse_input_frames(
+        history.to_frame(freq),
+        test_df=test.to_frame(freq) if "test_data" in seen_sections and test is not None and test.rows else None,
+        covariates_df=(
+            covariates.to_frame(freq)
+            if "covariates" in seen_sections and covariates is not None and covariates.rows
+            else None
+        ),
+        meta=meta,
+        prediction_length=prediction_length,
+        with_cov=with_cov,
+        freq_override=freq_override,
+        max_series=max_series,
+        max_points_per_series=max_points_per_series,
+    )
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import io
+from pathlib import PurePath
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+import pandas as pd
+
+from app.core.exceptions import DataException, ErrorCode
+from app.services.process import (
+    ParsedMarkdownInput,
+    _validate_prediction_length,
+    parse_input_frames,
+    parse_markdown_bytes,
+)
+from app.services.stream_parser import parse_markdown_stream
+
+
+UploadSource = Union[bytes, BinaryIO]
+
+# 文件扩展名 -> 输入格式
+UPLOAD_FORMATS: Dict[str, str] = {
+    ".md": "markdown",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".csv": "csv",
+}
+TABLE_FORMATS = ("parquet", "arrow", "csv")
+
+
+def detect_upload_format(filename: Optional[str], *, where: str = "file") -> str:
+    """
+    按扩展名识别上传格式（markdown / parquet / arrow / csv），不支持时抛出 VALIDATION_ERROR。
+    """
+    suffix = PurePath(filename or "").suffix.lower()
+    fmt = UPLOAD_FORMATS.get(suffix)
+    if fmt is None:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="仅支持上传 .md / .parquet / .arrow / .csv 文件",
+            details={"filename": filename, "where": where, "supported": sorted(UPLOAD_FORMATS)},
+        )
+    return fmt
+
+
+def _source_size(source: UploadSource) -> int:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    pos = source.tell()
+    size = source.seek(0, io.SEEK_END)
+    source.seek(pos)
+    return int(size)
+
+
+def _as_file(source: UploadSource) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def _lazy_import_pyarrow(fmt: str) -> Any:
+    try:
+        import pyarrow  # type: ignore
+        import pyarrow.ipc  # type: ignore  # noqa: F401
+        import pyarrow.parquet  # type: ignore  # noqa: F401
+    except Exception as exc:
+        raise DataException(
+            error_code=ErrorCode.DATA_FORMAT_ERROR,
+            message=f"服务端未安装 pyarrow，无法读取 {fmt} 文件",
+            details={"format": fmt},
+        ) from exc
+    return pyarrow
+
+
+def _read_arrow_ipc(pa: Any, f: BinaryIO) -> Any:
+    # Arrow IPC 有 file（Feather v2）与 stream 两种封装，先按 file 读，失败后按 stream 读
+    try:
+        return pa.ipc.open_file(f).read_all()
+    except pa.ArrowInvalid:
+        f.seek(0)
+        return pa.ipc.open_stream(f).read_all()
+
+
+def read_table(source: UploadSource, *, fmt: str, where: str) -> pd.DataFrame:
+    """
+    读取一个表格文件部分（Parquet / Arrow IPC / CSV），`id` 列归一为 `item_id`。
+    """
+    f = _as_file(source)
+    try:
+        if fmt == "csv":
+            df = pd.read_csv(f)
+        else:
+            pa = _lazy_import_pyarrow(fmt)
+            table = pa.parquet.read_table(f) if fmt == "parquet" else _read_arrow_ipc(pa, f)
+            df = table.to_pandas()
+    except DataException:
+        raise
+    except Exception as exc:
+        raise DataException(
+            error_code=ErrorCode.DATA_FORMAT_ERROR,
+            message=f"{where} 文件解析失败（{fmt}）",
+            details={"where": where, "format": fmt, "reason": str(exc)},
+        ) from exc
+
+    if "item_id" not in df.columns and "id" in df.columns:
+        df = df.rename(columns={"id": "item_id"})
+    return df
+
+
+def parse_upload(
+    source: UploadSource,
+    *,
+    input_format: str,
+    prediction_length: int,
+    with_cov: bool,
+    freq_override: Optional[str],
+    max_series: int,
+    max_points_per_series: int,
+    max_prediction_length: int,
+    max_upload_bytes: int,
+    test_source: Optional[UploadSource] = None,
+    test_format: Optional[str] = None,
+    covariates_source: Optional[UploadSource] = None,
+    covariates_format: Optional[str] = None,
+    known_covariates_names: Optional[List[str]] = None,
+    category_cov_name: Optional[List[str]] = None,
+) -> ParsedMarkdownInput:
+    """
+    上传内容 -> ParsedMarkdownInput（Markdown 与表格格式共用同一套校验）。
+
+    - markdown：bytes 走 parse_markdown_bytes，文件对象走流式解析；test_data / covariates 写在 JSON 中
+    - parquet / arrow / csv：source 为 history_data 表；test_data、covariates 可作为单独的文件部分上传，
+      known_covariates_names / category_cov_name 由参数给出（对应 Markdown JSON 中的同名字段）
+    - 所有文件部分合计不超过 max_upload_bytes
+    """
+    if input_format == "markdown":
+        if test_source is not None or covariates_source is not None:
+            raise DataException(
+                error_code=ErrorCode.VALIDATION_ERROR,
+                message="Markdown 输入请在 JSON 中提供 test_data / covariates，不支持单独上传",
+            )
+        limits = dict(
+            prediction_length=prediction_length,
+            with_cov=with_cov,
+            freq_override=freq_override,
+            max_series=max_series,
+            max_points_per_series=max_points_per_series,
+            max_prediction_length=max_prediction_length,
+            max_upload_bytes=max_upload_bytes,
+        )
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return parse_markdown_bytes(bytes(source), **limits)
+        return parse_markdown_stream(source, **limits)
+
+    if input_format not in TABLE_FORMATS:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="不支持的输入格式",
+            details={"input_format": input_format, "supported": ["markdown", *TABLE_FORMATS]},
+        )
+    _validate_prediction_length(prediction_length, max_prediction_length)
+
+    parts = {"history_data": (source, input_format)}
+    if test_source is not None:
+        parts["test_data"] = (test_source, test_format or input_format)
+    if covariates_source is not None and with_cov:
+        # with_cov=false 时协变量会被忽略：不读取该文件部分
+        parts["covariates"] = (covariates_source, covariates_format or input_format)
+
+    total = sum(_source_size(part) for part, _ in parts.values())
+    if total > max_upload_bytes:
+        raise DataException(
+            error_code=ErrorCode.VALIDATION_ERROR,
+            message="上传文件超过大小限制",
+            details={"max_upload_bytes": max_upload_bytes},
+        )
+
+    frames: Dict[str, pd.DataFrame] = {}
+    for where, (part, fmt) in parts.items():
+        if fmt not in TABLE_FORMATS:
+            raise DataException(
+                error_code=ErrorCode.VALIDATION_ERROR,
+                message=f"{where} 必须为 Parquet / Arrow / CSV 文件",
+                details={"where": where, "format": fmt},
+            )
+        frames[where] = read_table(part, fmt=fmt, where=where)
+
+    history_df = frames["history_data"]
+    if history_df.empty:
+        raise DataException(
+            error_code=ErrorCode.DATA_EMPTY,
+            message="history_data 不能为空（上传的表格没有数据行）",
+        )
+    test_df = frames.get("test_data")
+    covariates_df = frames.get("covariates")
+    meta: Dict[str, Any] = {
+        "known_covariates_names": list(known_covariates_names or []),
+        "category_cov_name": list(category_cov_name or []),
+    }
+    return parse_input_frames(
+        history_df,
+        test_df=test_df if test_df is not None and not test_df.empty else None,
+        covariates_df=covariates_df if covariates_df is not None and not covariates_df.empty else None,
+        meta=meta,
+        prediction_length=prediction_length,
+        with_cov=with_cov,
+        freq_override=freq_override,
+        max_series=max_series,
+        max_points_per_series=max_points_per_series,
+    )
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services.inference_executor import yield_inference_slot
+from app.services.metrics_helpers import restore_item_ids
+from app.services.zero_shot_engine import ZeroShotEngine
+
+
+logger = logging.getLogger(__name__)
+
+_ID_SEP = "\x1f"
+
+
+@dataclass
+class _PendingRequest:
+    history_df: pd.DataFrame
+    future_cov_df: Optional[pd.DataFrame]
+    context_length: int
+    num_series: int
+    future: Future = field(default_factory=Future)
+
+    @property
+    def columns(self) -> Tuple[Any, ...]:
+        return (
+            tuple(sorted(str(c) for c in self.history_df.columns)),
+            tuple(sorted(str(c) for c in self.future_cov_df.columns)) if self.future_cov_df is not None else None,
+        )
+
+
+@dataclass
+class _Batch:
+    key: Tuple[Any, ...]
+    requests: List[_PendingRequest] = field(default_factory=list)
+    num_series: int = 0
+    closed: bool = False
+    full: threading.Event = field(default_factory=threading.Event)
+
+
+class ZeroShotMicroBatcher:
+    """
+    跨请求的 zero-shot 微批：在一个很短的窗口内收集参数兼容的请求，合并成一次 predict。
+
+    兼容条件：同一引擎、prediction_length、freq、quantiles。各请求先按自己的 context_length 截取上下文再合并；
+    批内协变量列不同的请求分组各自 predict（补齐缺失的协变量列会改变这些序列的输入）。
+    第一个到达的请求作为 leader 等待窗口结束（或序列数达到上限）后执行批量预测，再按请求拆分结果；
+    Chronos-2 在 cross_learning=False 时逐序列独立预测，合批不会改变单个请求的结果。
+    合并预测失败时逐个请求重试，单个请求的坏数据不会连累同批的其他请求。
+    在推理执行器中等待时让出运行名额，单批可合并的请求数上限为 INFERENCE_MAX_CONCURRENCY + INFERENCE_MAX_QUEUE。
+    """
+
+    def __init__(self, window_ms: int, max_series: int) -> None:
+        self.window_seconds = max(0, int(window_ms)) / 1000.0
+        self.max_series = max(1, int(max_series))
+        self._open: Dict[Tuple[Any, ...], _Batch] = {}
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.batched_requests = 0
+
+    def predict(
+        self,
+        engine: ZeroShotEngine,
+        history_df: pd.DataFrame,
+        *,
+        prediction_length: int,
+        quantiles: List[float],
+        context_length: int,
+        freq: str,
+        future_cov_df: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        key = (
+            id(engine),
+            int(prediction_length),
+            str(freq),
+            tuple(float(q) for q in quantiles),
+        )
+        request = _PendingRequest(
+            history_df=history_df,
+            future_cov_df=future_cov_df,
+            context_length=int(context_length),
+            num_series=int(history_df["item_id"].nunique()),
+        )
+
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None or batch.closed
+            if leader:
+                batch = _Batch(key=key)
+                self._open[key] = batch
+            batch.requests.append(request)
+            batch.num_series += request.num_series
+            if batch.num_series >= self.max_series:
+                # 达到上限立即关闭：leader 不再等待窗口结束，后续请求另开新批
+                batch.closed = True
+                if self._open.get(key) is batch:
+                    del self._open[key]
+                batch.full.set()
+
+        if leader:
+            # 等待期间让出推理名额：同一时刻可合并的请求数不受 INFERENCE_MAX_CONCURRENCY 限制
+            with yield_inference_slot():
+                batch.full.wait(timeout=self.window_seconds)
+            with self._lock:
+                batch.closed = True
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            groups: Dict[Tuple[Any, ...], List[_PendingRequest]] = {}
+            for req in batch.requests:
+                groups.setdefault(req.columns, []).append(req)
+            try:
+                for requests in groups.values():
+                    self._run(engine, requests, prediction_length=prediction_length, quantiles=quantiles)
+            except BaseException as exc:
+                # KeyboardInterrupt 等：不能让同批其他请求一直等待
+                for req in batch.requests:
+                    if not req.future.done():
+                        req.future.set_exception(exc)
+                raise
+        elif not request.future.done():
+            with yield_inference_slot():
+                wait([request.future])
+        return request.future.result()
+
+    def _run(
+        self,
+        engine: ZeroShotEngine,
+        requests: List[_PendingRequest],
+        *,
+        prediction_length: int,
+        quantiles: List[float],
+    ) -> None:
+        if len(requests) == 1:
+            self._run_single(engine, requests[0], prediction_length=prediction_length, quantiles=quantiles)
+            return
+
+        try:
+            # 各请求先截取自己的上下文窗口；item_id 加上请求序号前缀，避免不同请求的同名序列互相覆盖
+            histories: List[pd.DataFrame] = []
+            futures: List[pd.DataFrame] = []
+            for idx, req in enumerate(requests):
+                hist = (
+                    req.history_df.sort_values(["item_id", "timestamp"])
+                    .groupby("item_id", sort=False)
+                    .tail(req.context_length)
+                )
+                hist = hist.assign(item_id=f"{idx}{_ID_SEP}" + hist["item_id"].astype(str))
+                histories.append(hist)
+                if req.future_cov_df is not None:
+                    cov = req.future_cov_df
+                    futures.append(cov.assign(item_id=f"{idx}{_ID_SEP}" + cov["item_id"].astype(str)))
+
+            started = time.perf_counter()
+            pred = engine.predict(
+                pd.concat(histories, ignore_index=True),
+                prediction_length=prediction_length,
+                quantiles=quantiles,
+                context_length=max(req.context_length for req in requests),
+                future_cov_df=pd.concat(futures, ignore_index=True) if futures else None,
+            )
+            logger.debug(
+                "zero-shot 微批完成: requests=%d, series=%d, cost=%.3fs",
+                len(requests),
+                sum(req.num_series for req in requests),
+                time.perf_counter() - started,
+            )
+
+            split_ids = pred["item_id"].astype(str).str.split(_ID_SEP, n=1, expand=True)
+            owner = split_ids[0].astype(int).to_numpy()
+            pred = pred.assign(item_id=split_ids[1].to_numpy())
+            parts = [
+                restore_item_ids(pred[owner == idx].reset_index(drop=True), req.history_df["item_id"])
+                for idx, req in enumerate(requests)
+            ]
+        except Exception as exc:
+            logger.warning("zero-shot 微批预测失败，逐个请求重试: requests=%d, reason=%s", len(requests), exc)
+            for req in requests:
+                self._run_single(engine, req, prediction_length=prediction_length, quantiles=quantiles)
+            return
+
+        self.batches += 1
+        self.batched_requests += len(requests)
+        for req, part in zip(requests, parts):
+            req.future.set_result(part)
+
+    def _run_single(
+        self,
+        engine: ZeroShotEngine,
+        request: _PendingRequest,
+        *,
+        prediction_length: int,
+        quantiles: List[float],
+    ) -> None:
+        try:
+            pred = engine.predict(
+                request.history_df,
+                prediction_length=prediction_length,
+                quantiles=quantiles,
+                context_length=request.context_length,
+                future_cov_df=request.future_cov_df,
+            )
+        except Exception as exc:
+            request.future.set_exception(exc)
+            return
+        request.future.set_result(pred)
+
+
+zeroshot_batcher = ZeroShotMicroBatcher(
+    window_ms=settings.ZEROSHOT_MICRO_BATCH_WINDOW_MS,
+    max_series=settings.ZEROSHOT_MICRO_BATCH_MAX_SERIES,
+)
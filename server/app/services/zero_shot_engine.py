@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.exceptions import ErrorCode, ModelException
+
+
+logger = logging.getLogger(__name__)
+
+
+def _lazy_import_chronos2():
+    try:
+        from chronos import Chronos2Pipeline  # type: ignore
+    except Exception as exc:
+        raise ModelException(
+            error_code=ErrorCode.MODEL_NOT_READY,
+            message="chronos-forecasting 未安装或不可用，请先安装 requirements.txt 后重试",
+            details={"reason": str(exc)},
+        ) from exc
+    return Chronos2Pipeline
+
+
+class ZeroShotEngine:
+    """
+    常驻进程内的 Chronos-2 zero-shot 推理引擎。
+
+    - 权重只在首次使用时从 CHRONOS_MODEL_PATH 加载一次，之后所有请求复用内存中的 pipeline
+    - 不做 fit / 验证窗口打分，predict 直接走 Chronos2Pipeline.predict_df
+    - 输出列与 AutoGluon predictor.predict(...).reset_index() 对齐：item_id, timestamp, mean, 分位数列
+    """
+
+    def __init__(self, model_path: str, device: str) -> None:
+        self.model_path = model_path
+        self.device = device
+        self._pipeline: Any = None
+        self._lock = threading.Lock()
+        self.loaded_at: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._pipeline is not None
+
+    def load(self) -> Any:
+        if self._pipeline is not None:
+            return self._pipeline
+        with self._lock:
+            if self._pipeline is not None:
+                return self._pipeline
+            if not self.model_path:
+                raise ModelException(
+                    error_code=ErrorCode.MODEL_LOAD_FAILED,
+                    message="未配置 Chronos-2 模型路径（CHRONOS_MODEL_PATH）",
+                )
+            Chronos2Pipeline = _lazy_import_chronos2()
+            started = time.perf_counter()
+            try:
+                pipeline = Chronos2Pipeline.from_pretrained(self.model_path, device_map=self.device)
+            except Exception as exc:
+                raise ModelException(
+                    error_code=ErrorCode.MODEL_LOAD_FAILED,
+                    message="Chronos-2 模型权重加载失败",
+                    details={"model_path": self.model_path, "device": self.device, "reason": str(exc)},
+                ) from exc
+            self.load_seconds = time.perf_counter() - started
+            self.loaded_at = pd.Timestamp.now().isoformat()
+            self._pipeline = pipeline
+            logger.info(
+                "Chronos-2 zero-shot 引擎已加载: path=%s, device=%s, cost=%.2fs",
+                self.model_path,
+                self.device,
+                self.load_seconds,
+            )
+        return self._pipeline
+
+    def predict(
+        self,
+        history_df: pd.DataFrame,
+        *,
+        prediction_length: int,
+        quantiles: List[float],
+        context_length: int,
+        future_cov_df: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        """
+        history_df: item_id, timestamp, target (+ 协变量列，均视为过去协变量)
+        future_cov_df: item_id, timestamp + 已知协变量列（这些列在 history_df 中同时作为未来已知协变量）
+        """
+        pipeline = self.load()
+
+        context_df = _to_model_frame(history_df)
+        # 只保留最后 context_length 个点：与 AutoGluon 的 context_length 截断语义一致
+        context_df = (
+            context_df.sort_values(["item_id", "timestamp"])
+            .groupby("item_id", sort=False)
+            .tail(int(context_length))
+            .reset_index(drop=True)
+        )
+        future_df = None
+        if future_cov_df is not None:
+            future_df = _to_model_frame(future_cov_df).sort_values(["item_id", "timestamp"])
+            future_df = future_df.reset_index(drop=True)
+
+        pred = pipeline.predict_df(
+            context_df,
+            future_df=future_df,
+            id_column="item_id",
+            timestamp_column="timestamp",
+            target="target",
+            prediction_length=int(prediction_length),
+            quantile_levels=list(quantiles),
+            batch_size=int(settings.ZEROSHOT_BATCH_SIZE),
+        )
+        pred = pd.DataFrame(pred)
+        if "target_name" in pred.columns:
+            pred = pred.drop(columns=["target_name"])
+        if "predictions" in pred.columns:
+            pred = pred.rename(columns={"predictions": "mean"})
+        pred.columns = [str(c) for c in pred.columns]
+        return pred.reset_index(drop=True)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "model_path": self.model_path,
+            "device": self.device,
+            "loaded": self.loaded,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+
+
+def _to_model_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # 分类协变量在 parse_markdown_payload 中已编码为 category；类别值统一转为字符串，
+    # 由 predict_df 按类别型协变量编码（与 AutoGluon 路径一致），而不是当作连续数值
+    out = df.copy()
+    for col in out.columns:
+        if col in {"item_id", "timestamp"}:
+            continue
+        if isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].cat.rename_categories([str(c) for c in out[col].cat.categories])
+    out["item_id"] = out["item_id"].astype(str)
+    return out
+
+
+_engines: Dict[str, ZeroShotEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_zeroshot_engine(device: str) -> ZeroShotEngine:
+    """
+    进程级单例（按 device 区分），所有请求共享同一份已加载权重。
+    """
+    engine = _engines.get(device)
+    if engine is not None:
+        return engine
+    with _engines_lock:
+        engine = _engines.get(device)
+        if engine is None:
+            engine = ZeroShotEngine(settings.CHRONOS_MODEL_PATH, device)
+            _engines[device] = engine
+    return engine
+
+
+def engine_status() -> List[Dict[str, Any]]:
+    return [engine.info() for engine in list(_engines.values())]
@@ -1,26 +1,37 @@
 import logging
 import tempfile
-from typing import Any, Dict, List, Optional
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import pandas as pd
 import re
 
 from app.core.config import settings
 from app.core.exceptions import DataException, ErrorCode, ModelException
-from app.services.forecast_output import filter_prediction_df_quantiles, resolve_quantile_columns
-from app.services.evaluate_metrics import normalize_evaluate_result
-from app.services.metrics_helpers import (
-    filter_metric_result,
-    normalize_metrics_request,
-    merge_holdout_predictions,
-    replace_pred_timestamps_with_future,
-    replace_pred_timestamps_with_holdout,
-    select_prediction_column,
-    split_holdout_frame,
+from app.services.forecast_output import (
+    PredictionsCallback,
+    filter_prediction_df_quantiles,
+    format_predictions,
+    resolve_quantile_columns,
+    validate_output_format,
 )
-from app.services.custom_metrics import compute_ic_ir
-from app.services.process import extract_json_from_markdown, parse_markdown_payload
+from app.services.forecast_metrics import (
+    DeferredMetrics,
+    compute_forecast_metrics,
+    compute_or_defer_metrics,
+    make_holdout_evaluate_fn,
+    share_holdout_predictions,
+    validate_metrics_mode,
+)
+from app.services.job_context import JobCancelled, report_stage
+from app.services.metrics_helpers import normalize_metrics_request, replace_pred_timestamps_with_future
+from app.services.process import ParsedMarkdownInput, parse_markdown_bytes
+from app.services.result_cache import cached_forecast_result, forecast_cache_key, forecast_result_cache
+from app.services.series_cache import series_forecast_cache
+from app.services.table_parser import UploadSource, parse_upload
 from app.services.device import choose_device
+from app.services.zero_shot_batcher import zeroshot_batcher
+from app.services.zero_shot_engine import get_zeroshot_engine
 
 
 logger = logging.getLogger(__name__)
@@ -66,52 +77,166 @@ def _lazy_import_autogluon():
     return TimeSeriesDataFrame, TimeSeriesPredictor
 
 
-def zeroshot_forecast_from_markdown_bytes(
-    markdown_bytes: bytes,
+def _finalize_prediction_frame(
+    pred_df: pd.DataFrame,
+    parsed: ParsedMarkdownInput,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+) -> pd.DataFrame:
+    output_pred_df = replace_pred_timestamps_with_future(
+        pred_df,
+        parsed.history_df,
+        prediction_length=prediction_length,
+        freq=parsed.freq,
+    )
+    # Ensure output matches requested quantiles exactly; if model didn't output them, raise.
+    _, missing = resolve_quantile_columns(output_pred_df, quantiles=quantiles)
+    if missing:
+        raise ModelException(
+            error_code=ErrorCode.MODEL_PREDICT_FAILED,
+            message="模型未返回部分请求分位数，请调整 quantiles 或检查 AutoGluon/模型版本是否支持",
+            details={
+                "missing_quantiles": missing,
+                "available_columns": list(output_pred_df.columns),
+            },
+        )
+    output_pred_df = filter_prediction_df_quantiles(
+        output_pred_df, quantiles=quantiles, keep_mean=True, strict=True
+    )
+    # make timestamp JSON-serializable
+    if "timestamp" in output_pred_df.columns:
+        output_pred_df["timestamp"] = output_pred_df["timestamp"].astype(str)
+    return output_pred_df
+
+
+def make_engine_predict_fn(
+    engine: Any,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    context_length: int,
+    freq: str,
+) -> Callable[[pd.DataFrame, Optional[pd.DataFrame]], pd.DataFrame]:
+    """
+    常驻引擎的 predict_fn(history_df, known_cov_df)：经序列级缓存与微批合并后调用模型。
+    """
+
+    def _model_predict(history_df: pd.DataFrame, known_cov_df: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if settings.ZEROSHOT_MICRO_BATCH_ENABLED:
+            return zeroshot_batcher.predict(
+                engine,
+                history_df,
+                prediction_length=prediction_length,
+                quantiles=quantiles,
+                context_length=context_length,
+                freq=freq,
+                future_cov_df=known_cov_df,
+            )
+        return engine.predict(
+            history_df,
+            prediction_length=prediction_length,
+            quantiles=quantiles,
+            context_length=context_length,
+            future_cov_df=known_cov_df,
+        )
+
+    def _engine_predict(history_df: pd.DataFrame, known_cov_df: Optional[pd.DataFrame]) -> pd.DataFrame:
+        # 序列级缓存：上下文窗口未变化的序列直接复用上次的预测，只有其余序列送入模型（含 holdout 指标预测）
+        return series_forecast_cache.predict(
+            _model_predict,
+            history_df,
+            known_cov_df,
+            prediction_length=prediction_length,
+            quantiles=quantiles,
+            context_length=context_length,
+            freq=freq,
+            model_key=engine.model_path,
+        )
+
+    return _engine_predict
+
+
+def _forecast_with_engine(
+    parsed: ParsedMarkdownInput,
     *,
     prediction_length: int,
     quantiles: List[float],
     metrics: List[str],
     with_cov: bool,
-    device: str | None = None,
-    freq: Optional[str] = None,
-    context_length: int = 512,
-) -> Dict[str, Any]:
-    if len(markdown_bytes) > settings.MAX_UPLOAD_BYTES:
-        raise DataException(
-            error_code=ErrorCode.VALIDATION_ERROR,
-            message="上传文件超过大小限制",
-            details={"max_upload_bytes": settings.MAX_UPLOAD_BYTES},
-        )
+    device: str,
+    context_length: int,
+    on_predictions: Optional[PredictionsCallback] = None,
+    metrics_mode: str = "inline",
+) -> Tuple[pd.DataFrame, Union[Dict[str, Any], DeferredMetrics]]:
+    engine = get_zeroshot_engine(device)
+    future_cov_df = parsed.future_cov_df if with_cov else None
+    _engine_predict = make_engine_predict_fn(
+        engine,
+        prediction_length=prediction_length,
+        quantiles=quantiles,
+        context_length=context_length,
+        freq=parsed.freq,
+    )
 
     try:
-        markdown_text = markdown_bytes.decode("utf-8")
-    except UnicodeDecodeError as exc:
-        raise DataException(
-            error_code=ErrorCode.DATA_FORMAT_ERROR,
-            message="Markdown 文件编码错误，请使用 UTF-8 编码",
+        pred_df = _engine_predict(parsed.history_df, future_cov_df)
+    except ModelException:
+        raise
+    except Exception as exc:
+        raise ModelException(
+            error_code=ErrorCode.MODEL_PREDICT_FAILED,
+            message="模型预测失败",
+            details={"reason": str(exc)},
         ) from exc
 
-    payload = extract_json_from_markdown(markdown_text)
-    parsed = parse_markdown_payload(
-        payload,
-        prediction_length=prediction_length,
-        with_cov=with_cov,
-        freq_override=freq,
-        max_series=settings.MAX_SERIES,
-        max_points_per_series=settings.MAX_POINTS_PER_SERIES,
-        max_prediction_length=settings.max_prediction_length,
+    output_pred_df = _finalize_prediction_frame(
+        pred_df, parsed, prediction_length=prediction_length, quantiles=quantiles
     )
 
-    quantiles = _validate_quantiles(quantiles)
-    metrics = normalize_metrics_request(metrics)
+    if on_predictions is not None:
+        on_predictions(output_pred_df, parsed.freq)
+    report_stage("metrics")
+    holdout_predict = share_holdout_predictions(_engine_predict, prediction_length=prediction_length)
+    metrics_obj = compute_or_defer_metrics(
+        lambda: compute_forecast_metrics(
+            parsed=parsed,
+            metrics=metrics,
+            prediction_length=prediction_length,
+            with_cov=with_cov,
+            evaluate_fn=make_holdout_evaluate_fn(
+                holdout_predict,
+                prediction_length=prediction_length,
+                quantiles=quantiles,
+                freq=parsed.freq,
+                known_covariates_names=parsed.known_covariates_names if with_cov else None,
+            ),
+            predict_fn=holdout_predict,
+        ),
+        metrics_mode=metrics_mode,
+    )
+    return output_pred_df, metrics_obj
 
-    selected_device = device if device in {"cpu", "cuda"} else None
-    if selected_device is None:
-        selected_device = choose_device(prefer_cuda=True)
 
+def _forecast_with_autogluon(
+    parsed: ParsedMarkdownInput,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    device: str,
+    context_length: int,
+    on_predictions: Optional[PredictionsCallback] = None,
+    metrics_mode: str = "inline",
+) -> Tuple[pd.DataFrame, Union[Dict[str, Any], DeferredMetrics]]:
     TimeSeriesDataFrame, TimeSeriesPredictor = _lazy_import_autogluon()
 
+    min_series_len = int(parsed.history_df.groupby("item_id").size().min())
+    # 自适应上下文长度：不超过最短序列长度，避免因 context_length 过大导致 AutoGluon 训练窗口构造失败
+    # （仅 fit 路径需要；常驻引擎按序列各自截取最后 context_length 个点）
+    context_length = min(int(context_length), min_series_len)
+
     train_data = TimeSeriesDataFrame.from_data_frame(
         parsed.history_df,
         id_column="item_id",
@@ -126,33 +251,6 @@ def zeroshot_forecast_from_markdown_bytes(
             timestamp_column="timestamp",
         )
 
-    temp_dir_ctx = tempfile.TemporaryDirectory(prefix="ag-zeroshot-")
-    predictor_path = temp_dir_ctx.name
-    # Some AutoGluon versions determine quantile outputs from predictor.quantile_levels.
-    # Prefer configuring quantile_levels at predictor construction to ensure requested quantiles are produced.
-    try:
-        predictor = TimeSeriesPredictor(
-            prediction_length=prediction_length,
-            target="target",
-            eval_metric="WQL",
-            known_covariates_names=parsed.known_covariates_names or None,
-            freq=parsed.freq,
-            quantile_levels=quantiles,
-            path=predictor_path,
-        )
-    except TypeError:
-        predictor = TimeSeriesPredictor(
-            prediction_length=prediction_length,
-            target="target",
-            eval_metric="WQL",
-            known_covariates_names=parsed.known_covariates_names or None,
-            freq=parsed.freq,
-        )
-        if hasattr(predictor, "path"):
-            predictor.path = predictor_path  # type: ignore[attr-defined]
-        if hasattr(predictor, "quantile_levels"):
-            predictor.quantile_levels = quantiles  # type: ignore[attr-defined]
-
     model_path = settings.CHRONOS_MODEL_PATH
     if not model_path:
         raise ModelException(
@@ -160,283 +258,391 @@ def zeroshot_forecast_from_markdown_bytes(
             message="未配置 Chronos-2 模型路径（CHRONOS_MODEL_PATH）",
         )
 
-    min_series_len = int(parsed.history_df.groupby("item_id").size().min())
-    # 自适应上下文长度：不超过最短序列长度，避免因 context_length 过大导致训练窗口构造失败
-    context_length = min(int(context_length), min_series_len)
-
-    last_fit_exc: Optional[Exception] = None
-
-    for model_name in [settings.AG_CHRONOS_MODEL_NAME, "Chronos2", "Chronos"]:
-        if not model_name:
-            continue
-        hyperparameters = {
-            model_name: [
-                {
-                    "ag_args": {"name_suffix": "_ZeroShot"},
-                    "model_path": model_path,
-                    "fine_tune": False,
-                    "device": selected_device,
-                    "context_length": int(context_length),
-                }
-            ]
-        }
+    with ExitStack() as stack:
+        # metrics_mode=deferred 时临时目录由 DeferredMetrics 接管，指标算完后再删除
+        predictor_path = stack.enter_context(tempfile.TemporaryDirectory(prefix="ag-zeroshot-"))
+        # Some AutoGluon versions determine quantile outputs from predictor.quantile_levels.
+        # Prefer configuring quantile_levels at predictor construction to ensure requested quantiles are produced.
         try:
+            predictor = TimeSeriesPredictor(
+                prediction_length=prediction_length,
+                target="target",
+                eval_metric="WQL",
+                known_covariates_names=parsed.known_covariates_names or None,
+                freq=parsed.freq,
+                quantile_levels=quantiles,
+                path=predictor_path,
+            )
+        except TypeError:
+            predictor = TimeSeriesPredictor(
+                prediction_length=prediction_length,
+                target="target",
+                eval_metric="WQL",
+                known_covariates_names=parsed.known_covariates_names or None,
+                freq=parsed.freq,
+            )
+            if hasattr(predictor, "path"):
+                predictor.path = predictor_path  # type: ignore[attr-defined]
+            if hasattr(predictor, "quantile_levels"):
+                predictor.quantile_levels = quantiles  # type: ignore[attr-defined]
+
+        last_fit_exc: Optional[Exception] = None
+
+        for model_name in [settings.AG_CHRONOS_MODEL_NAME, "Chronos2", "Chronos"]:
+            if not model_name:
+                continue
+            hyperparameters = {
+                model_name: [
+                    {
+                        "ag_args": {"name_suffix": "_ZeroShot"},
+                        "model_path": model_path,
+                        "fine_tune": False,
+                        "device": device,
+                        "context_length": int(context_length),
+                    }
+                ]
+            }
             try:
-                predictor.fit(
-                    train_data=train_data,
-                    enable_ensemble=False,
-                    hyperparameters=hyperparameters,
-                    num_val_windows=1,
-                )
-            except TypeError:
-                # Older AutoGluon may not accept num_val_windows; fallback.
-                predictor.fit(
-                    train_data=train_data,
-                    enable_ensemble=False,
-                    hyperparameters=hyperparameters,
+                try:
+                    predictor.fit(
+                        train_data=train_data,
+                        enable_ensemble=False,
+                        hyperparameters=hyperparameters,
+                        num_val_windows=1,
+                    )
+                except TypeError:
+                    # Older AutoGluon may not accept num_val_windows; fallback.
+                    predictor.fit(
+                        train_data=train_data,
+                        enable_ensemble=False,
+                        hyperparameters=hyperparameters,
+                    )
+                break
+            except Exception as exc:
+                last_fit_exc = exc
+                logger.warning("AutoGluon fit 失败，尝试下一个模型名: %s, reason=%s", model_name, exc)
+                continue
+        else:
+            # 尝试把“序列过短”的典型错误转为 400，提示用户修数据/参数
+            m = _MIN_OBS_RE.search(str(last_fit_exc)) if last_fit_exc else None
+            if m:
+                required = int(m.group(1))
+                raise DataException(
+                    error_code=ErrorCode.VALIDATION_ERROR,
+                    message=(
+                        "时间序列过短，无法用于当前 prediction_length 的模型窗口构造；"
+                        "请提供更长的 history_data，或降低 prediction_length。"
+                    ),
+                    details={
+                        "required_min_observations": required,
+                        "min_series_length": min_series_len,
+                        "prediction_length": prediction_length,
+                    },
                 )
-            break
-        except Exception as exc:
-            last_fit_exc = exc
-            logger.warning("AutoGluon fit 失败，尝试下一个模型名: %s, reason=%s", model_name, exc)
-            continue
-    else:
-        # 尝试把“序列过短”的典型错误转为 400，提示用户修数据/参数
-        m = _MIN_OBS_RE.search(str(last_fit_exc)) if last_fit_exc else None
-        if m:
-            required = int(m.group(1))
-            raise DataException(
-                error_code=ErrorCode.VALIDATION_ERROR,
-                message=(
-                    "时间序列过短，无法用于当前 prediction_length 的模型窗口构造；"
-                    "请提供更长的 history_data，或降低 prediction_length。"
-                ),
-                details={
-                    "required_min_observations": required,
-                    "min_series_length": min_series_len,
-                    "prediction_length": prediction_length,
-                },
+
+            raise ModelException(
+                error_code=ErrorCode.MODEL_LOAD_FAILED,
+                message="AutoGluon Chronos 模型初始化失败（请检查 autogluon 版本与模型权重路径）",
+                details={"model_path": model_path, "reason": str(last_fit_exc) if last_fit_exc else None},
             )
 
-        raise ModelException(
-            error_code=ErrorCode.MODEL_LOAD_FAILED,
-            message="AutoGluon Chronos 模型初始化失败（请检查 autogluon 版本与模型权重路径）",
-            details={"model_path": model_path, "reason": str(last_fit_exc) if last_fit_exc else None},
+        try:
+            pred = predictor.predict(
+                data=train_data,
+                known_covariates=known_covariates,
+            )
+        except Exception as exc:
+            raise ModelException(
+                error_code=ErrorCode.MODEL_PREDICT_FAILED,
+                message="模型预测失败",
+                details={"reason": str(exc)},
+            ) from exc
+
+        output_pred_df = _finalize_prediction_frame(
+            pred.reset_index(), parsed, prediction_length=prediction_length, quantiles=quantiles
+        )
+        if on_predictions is not None:
+            on_predictions(output_pred_df, parsed.freq)
+        predict_fn = share_holdout_predictions(
+            make_autogluon_predict_fn(predictor, TimeSeriesDataFrame),
+            prediction_length=prediction_length,
+            history_df=parsed.history_df,
+            validation_pred_df=autogluon_validation_predictions(predictor) if metrics else None,
+            known_covariates_names=parsed.known_covariates_names if with_cov else None,
+        )
+        metrics_obj = compute_or_defer_metrics(
+            lambda: compute_forecast_metrics(
+                parsed=parsed,
+                metrics=metrics,
+                prediction_length=prediction_length,
+                with_cov=with_cov,
+                evaluate_fn=make_holdout_evaluate_fn(
+                    predict_fn,
+                    prediction_length=prediction_length,
+                    quantiles=quantiles,
+                    freq=parsed.freq,
+                    known_covariates_names=parsed.known_covariates_names if with_cov else None,
+                ),
+                predict_fn=predict_fn,
+            ),
+            metrics_mode=metrics_mode,
+            stack=stack,
         )
+    return output_pred_df, metrics_obj
+
 
+def autogluon_validation_predictions(predictor: Any) -> Optional[pd.DataFrame]:
+    """
+    fit（num_val_windows=1）时在每个 item 最后 prediction_length 步上做的验证预测（reset_index 后）。
+
+    AutoGluon 版本不提供 backtest_predictions 或取不到时返回 None，由调用方回退为重新预测。
+    """
+    backtest_predictions = getattr(predictor, "backtest_predictions", None)
+    if backtest_predictions is None:
+        return None
     try:
-        pred = predictor.predict(
-            data=train_data,
-            known_covariates=known_covariates,
-        )
+        windows = backtest_predictions()
     except Exception as exc:
-        raise ModelException(
-            error_code=ErrorCode.MODEL_PREDICT_FAILED,
-            message="模型预测失败",
-            details={"reason": str(exc)},
-        ) from exc
+        logger.info("无法获取 fit 阶段的验证窗口预测，holdout 指标将重新预测: %s", exc)
+        return None
+    if not windows:
+        return None
+    return pd.DataFrame(windows[-1].reset_index())
 
-    output_pred_df = pred.reset_index()
-    output_pred_df = replace_pred_timestamps_with_future(
-        output_pred_df,
-        parsed.history_df,
+
+def make_autogluon_predict_fn(predictor: Any, TimeSeriesDataFrame: Any):
+    def _predict(train_df: pd.DataFrame, known_cov_df: Optional[pd.DataFrame]) -> pd.DataFrame:
+        train_tsdf = TimeSeriesDataFrame.from_data_frame(
+            train_df,
+            id_column="item_id",
+            timestamp_column="timestamp",
+        )
+        known_covariates = None
+        if known_cov_df is not None:
+            known_covariates = TimeSeriesDataFrame.from_data_frame(
+                known_cov_df,
+                id_column="item_id",
+                timestamp_column="timestamp",
+            )
+        return predictor.predict(data=train_tsdf, known_covariates=known_covariates).reset_index()
+
+    return _predict
+
+
+def zeroshot_forecast_from_markdown_bytes(
+    markdown_bytes: bytes,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    device: str | None = None,
+    freq: Optional[str] = None,
+    context_length: int = 512,
+) -> Dict[str, Any]:
+    report_stage("parsing")
+    parsed = parse_markdown_bytes(
+        markdown_bytes,
         prediction_length=prediction_length,
-        freq=parsed.freq,
+        with_cov=with_cov,
+        freq_override=freq,
+        max_series=settings.MAX_SERIES,
+        max_points_per_series=settings.MAX_POINTS_PER_SERIES,
+        max_prediction_length=settings.max_prediction_length,
+        max_upload_bytes=settings.MAX_UPLOAD_BYTES,
     )
-    # Ensure output matches requested quantiles exactly; if model didn't output them, raise.
-    _, missing = resolve_quantile_columns(output_pred_df, quantiles=quantiles)
-    if missing:
-        raise ModelException(
-            error_code=ErrorCode.MODEL_PREDICT_FAILED,
-            message="模型未返回部分请求分位数，请调整 quantiles 或检查 AutoGluon/模型版本是否支持",
-            details={
-                "missing_quantiles": missing,
-                "available_columns": list(output_pred_df.columns),
-            },
-        )
-    output_pred_df = filter_prediction_df_quantiles(
-        output_pred_df, quantiles=quantiles, keep_mean=True, strict=True
+    return zeroshot_forecast_from_parsed(
+        parsed,
+        prediction_length=prediction_length,
+        quantiles=quantiles,
+        metrics=metrics,
+        with_cov=with_cov,
+        device=device,
+        context_length=context_length,
     )
-    # make timestamp JSON-serializable
-    if "timestamp" in output_pred_df.columns:
-        output_pred_df["timestamp"] = output_pred_df["timestamp"].astype(str)
 
-    metrics_obj: Optional[Dict[str, Any]] = None
-    requested = set(metrics)
-    if not requested:
-        metrics_obj = {"skipped": True, "reason": "no_metrics_requested"}
-    else:
-        metrics_out: Dict[str, Any] = {}
-        warnings: List[Dict[str, Any]] = []
-
-        # AutoGluon evaluate can hold out last prediction_length steps automatically.
-        # If user provides test_data, concatenate to history_data for a more faithful evaluation.
-        eval_df = parsed.history_df
-        if parsed.test_df is not None and not parsed.test_df.empty:
-            eval_df = pd.concat([parsed.history_df, parsed.test_df], ignore_index=True)
-            eval_df = eval_df.sort_values(["item_id", "timestamp"]).reset_index(drop=True)
-
-        series_lengths = eval_df.groupby("item_id").size()
-        has_enough_length = (series_lengths >= (prediction_length + 1)).all()
-
-        # WQL / WAPE
-        eval_metrics_requested = requested.intersection({"WQL", "WAPE"})
-        if eval_metrics_requested and has_enough_length:
-            try:
-                eval_tsdf = TimeSeriesDataFrame.from_data_frame(
-                    eval_df,
-                    id_column="item_id",
-                    timestamp_column="timestamp",
-                )
-                try:
-                    eval_res = predictor.evaluate(
-                        eval_tsdf,
-                        metrics=sorted(eval_metrics_requested),
-                    )
-                except TypeError:
-                    eval_res = predictor.evaluate(eval_tsdf)
-                metrics_out.update(filter_metric_result(normalize_evaluate_result(eval_res), eval_metrics_requested))
-            except Exception as exc:
-                warnings.append({"metric": "WQL/WAPE", "reason": "evaluate_failed", "detail": str(exc)})
-        elif eval_metrics_requested and not has_enough_length:
-            warnings.append(
-                {
-                    "metric": "WQL/WAPE",
-                    "reason": "time_series_too_short_for_evaluate",
-                    "min_series_length": int(series_lengths.min()) if not series_lengths.empty else 0,
-                    "required_min_length": int(prediction_length + 1),
-                }
+
+def zeroshot_forecast_from_upload(
+    content: UploadSource,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    device: str | None = None,
+    freq: Optional[str] = None,
+    context_length: int = 512,
+    input_format: str = "markdown",
+    test_content: Optional[UploadSource] = None,
+    test_format: Optional[str] = None,
+    covariates_content: Optional[UploadSource] = None,
+    covariates_format: Optional[str] = None,
+    known_covariates_names: Optional[List[str]] = None,
+    category_cov_name: Optional[List[str]] = None,
+    output_format: str = "records",
+    on_predictions: Optional[PredictionsCallback] = None,
+    metrics_mode: str = "inline",
+) -> Dict[str, Any]:
+    """
+    上传内容（Markdown / Parquet / Arrow / CSV；bytes 或文件对象）-> 预测结果。
+
+    路由的同步、异步与流式入口共用；input_format 默认 markdown，与 zeroshot_forecast_from_markdown_bytes 的调用方式兼容。
+    on_predictions：预测后处理完成、计算指标之前回调一次（流式接口用），此时结果中的 predictions 为空列表。
+    metrics_mode=deferred：不计算指标，结果中的 deferred_metrics 由路由层提交到任务队列（见 attach_deferred_metrics）。
+    """
+    output_format = validate_output_format(output_format, allow_frame=True)
+    report_stage("parsing")
+    parsed = parse_upload(
+        content,
+        input_format=input_format,
+        prediction_length=prediction_length,
+        with_cov=with_cov,
+        freq_override=freq,
+        max_series=settings.MAX_SERIES,
+        max_points_per_series=settings.MAX_POINTS_PER_SERIES,
+        max_prediction_length=settings.max_prediction_length,
+        max_upload_bytes=settings.MAX_UPLOAD_BYTES,
+        test_source=test_content,
+        test_format=test_format,
+        covariates_source=covariates_content,
+        covariates_format=covariates_format,
+        known_covariates_names=known_covariates_names,
+        category_cov_name=category_cov_name,
+    )
+    return zeroshot_forecast_from_parsed(
+        parsed,
+        prediction_length=prediction_length,
+        quantiles=quantiles,
+        metrics=metrics,
+        with_cov=with_cov,
+        device=device,
+        context_length=context_length,
+        output_format=output_format,
+        on_predictions=on_predictions,
+        metrics_mode=metrics_mode,
+    )
+
+
+def zeroshot_forecast_from_parsed(
+    parsed: ParsedMarkdownInput,
+    *,
+    prediction_length: int,
+    quantiles: List[float],
+    metrics: List[str],
+    with_cov: bool,
+    device: str | None = None,
+    context_length: int = 512,
+    output_format: str = "records",
+    on_predictions: Optional[PredictionsCallback] = None,
+    metrics_mode: str = "inline",
+) -> Dict[str, Any]:
+    quantiles = _validate_quantiles(quantiles)
+    output_format = validate_output_format(output_format, allow_frame=True)
+    metrics = normalize_metrics_request(metrics)
+    metrics_mode = validate_metrics_mode(metrics_mode) if metrics else "inline"
+
+    selected_device = device if device in {"cpu", "cuda"} else None
+    if selected_device is None:
+        selected_device = choose_device(prefer_cuda=True)
+
+    cache_key: Optional[str] = None
+    if forecast_result_cache.enabled:
+        cache_key = forecast_cache_key(
+            "zeroshot",
+            parsed,
+            prediction_length=prediction_length,
+            quantiles=quantiles,
+            metrics=metrics,
+            with_cov=with_cov,
+            context_length=context_length,
+        )
+        cached = forecast_result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("zero-shot 预测命中结果缓存: key=%s", cache_key[:12])
+            return cached_forecast_result(
+                cached,
+                freq=parsed.freq,
+                prediction_length=prediction_length,
+                quantiles=quantiles,
+                output_format=output_format,
+                on_predictions=on_predictions,
             )
 
-        # IC / IR (custom holdout split on history_data only)
-        custom_requested = requested.intersection({"IC", "IR"})
-        history_lengths = parsed.history_df.groupby("item_id").size()
-        required_len = int(prediction_length * 2)
-        eligible_items = history_lengths[history_lengths >= required_len].index.tolist()
-        if custom_requested and eligible_items:
-            dropped_items = set(history_lengths.index.tolist()) - set(eligible_items)
-            if dropped_items:
-                warnings.append(
-                    {
-                        "metric": "IC/IR",
-                        "reason": "series_too_short_dropped",
-                        "items": list(dropped_items),
-                        "required_min_length": required_len,
-                    }
-                )
-            try:
-                history_for_metrics = parsed.history_df[parsed.history_df["item_id"].isin(eligible_items)].copy()
-                train_df, holdout_df = split_holdout_frame(history_for_metrics, prediction_length)
-                if train_df.empty or holdout_df.empty:
-                    warnings.append({"metric": "IC/IR", "reason": "holdout_split_empty"})
-                else:
-                    train_tsdf = TimeSeriesDataFrame.from_data_frame(
-                        train_df,
-                        id_column="item_id",
-                        timestamp_column="timestamp",
-                    )
+    output_pred_df: Optional[pd.DataFrame] = None
+    metrics_obj: Union[Dict[str, Any], DeferredMetrics, None] = None
+    model_used = "autogluon-chronos2-zeroshot"
+    report_stage("predicting")
 
-                    holdout_df = holdout_df.copy()
-                    holdout_df["timestamp"] = pd.to_datetime(holdout_df["timestamp"], errors="coerce")
-                    holdout_df = holdout_df.dropna(subset=["timestamp"])
-                    holdout_df["item_id"] = holdout_df["item_id"].astype(str)
-
-                    known_covariates_eval = None
-                    if with_cov and parsed.known_covariates_names:
-                        missing = [c for c in parsed.known_covariates_names if c not in holdout_df.columns]
-                        if missing:
-                            warnings.append(
-                                {"metric": "IC/IR", "reason": "holdout_missing_covariates", "missing": missing}
-                            )
-                        else:
-                            cov_df = holdout_df[["item_id", "timestamp", *parsed.known_covariates_names]].copy()
-                            if cov_df[parsed.known_covariates_names].isna().any().any():
-                                warnings.append({"metric": "IC/IR", "reason": "holdout_covariates_has_nan"})
-                            else:
-                                known_covariates_eval = TimeSeriesDataFrame.from_data_frame(
-                                    cov_df,
-                                    id_column="item_id",
-                                    timestamp_column="timestamp",
-                                )
-
-                    if with_cov and parsed.known_covariates_names and known_covariates_eval is None:
-                        pass
-                    else:
-                        holdout_pred = predictor.predict(
-                            data=train_tsdf,
-                            known_covariates=known_covariates_eval,
-                        )
-                        holdout_pred_df = holdout_pred.reset_index()
-                        holdout_pred_df = replace_pred_timestamps_with_holdout(holdout_pred_df, holdout_df)
-                        holdout_pred_df["timestamp"] = pd.to_datetime(
-                            holdout_pred_df["timestamp"], errors="coerce"
-                        )
-                        holdout_pred_df = holdout_pred_df.dropna(subset=["timestamp"])
-                        holdout_pred_df["item_id"] = holdout_pred_df["item_id"].astype(str)
-                        pred_col = select_prediction_column(holdout_pred_df)
-
-                        if pred_col is None:
-                            warnings.append({"metric": "IC/IR", "reason": "prediction_column_missing"})
-                        else:
-                            merged = merge_holdout_predictions(holdout_df, holdout_pred_df, pred_col)
-                            if merged.empty:
-                                warnings.append({"metric": "IC/IR", "reason": "holdout_merge_empty"})
-                            else:
-                                ic_ir = compute_ic_ir(
-                                    df=merged,
-                                    y_true_col="target",
-                                    y_pred_col=pred_col,
-                                )
-                                if "IC" in custom_requested:
-                                    metrics_out["IC"] = ic_ir.ic if ic_ir.ic is not None else 0.0
-                                    if ic_ir.ic is None:
-                                        warnings.append({"metric": "IC", "reason": "ic_undefined_set_zero"})
-                                if "IR" in custom_requested:
-                                    metrics_out["IR"] = ic_ir.ir if ic_ir.ir is not None else 0.0
-                                    if ic_ir.ir is None:
-                                        warnings.append({"metric": "IR", "reason": "ir_undefined_set_zero"})
-            except Exception as exc:
-                warnings.append({"metric": "IC/IR", "reason": "evaluate_failed", "detail": str(exc)})
-        elif custom_requested and not eligible_items:
-            warnings.append(
-                {
-                    "metric": "IC/IR",
-                    "reason": "time_series_too_short_for_evaluate",
-                    "min_series_length": int(history_lengths.min()) if not history_lengths.empty else 0,
-                    "required_min_length": required_len,
-                }
+    emitted = False
+
+    def _emit(pred_df: pd.DataFrame, freq: str) -> None:
+        nonlocal emitted
+        emitted = True
+        on_predictions(pred_df, freq)  # type: ignore[misc]
+
+    emit = _emit if on_predictions is not None else None
+
+    if settings.ZEROSHOT_RESIDENT_ENGINE:
+        try:
+            output_pred_df, metrics_obj = _forecast_with_engine(
+                parsed,
+                prediction_length=prediction_length,
+                quantiles=quantiles,
+                metrics=metrics,
+                with_cov=with_cov,
+                device=selected_device,
+                context_length=context_length,
+                on_predictions=emit,
+                metrics_mode=metrics_mode,
             )
-            metrics_out["IC"] = 0.0
-            metrics_out["IR"] = 0.0
-
-        if custom_requested:
-            if "IC" in custom_requested and "IC" not in metrics_out:
-                metrics_out["IC"] = 0.0
-                warnings.append({"metric": "IC", "reason": "ic_missing_set_zero"})
-            if "IR" in custom_requested and "IR" not in metrics_out:
-                metrics_out["IR"] = 0.0
-                warnings.append({"metric": "IR", "reason": "ir_missing_set_zero"})
-
-        if metrics_out:
-            if warnings:
-                metrics_out["warnings"] = warnings
-            metrics_obj = metrics_out
-        else:
-            metrics_obj = {
-                "skipped": True,
-                "reason": "metrics_unavailable",
-                "detail": warnings,
-            }
+            model_used = "chronos2-zeroshot-resident"
+        except (DataException, JobCancelled):
+            raise
+        except Exception as exc:
+            if emitted:
+                # 预测已经流式发出，不能再换 AutoGluon 路径重新预测
+                raise
+            # 常驻引擎不可用（依赖缺失 / 输入不规则等）时回退到 AutoGluon fit 路径，保证结果可用
+            logger.warning("常驻 zero-shot 引擎预测失败，回退到 AutoGluon 路径: %s", exc)
+            output_pred_df = None
+
+    if output_pred_df is None:
+        output_pred_df, metrics_obj = _forecast_with_autogluon(
+            parsed,
+            prediction_length=prediction_length,
+            quantiles=quantiles,
+            metrics=metrics,
+            with_cov=with_cov,
+            device=selected_device,
+            context_length=context_length,
+            on_predictions=emit,
+            metrics_mode=metrics_mode,
+        )
+
+    deferred: Optional[DeferredMetrics] = None
+    if isinstance(metrics_obj, DeferredMetrics):
+        deferred, metrics_obj = metrics_obj, {"deferred": True}
+        if cache_key is not None:
+            # 指标算完后再写入结果缓存，命中时总是带完整指标
+            key, pred_df, extra = cache_key, output_pred_df, {"model_used": model_used}
+            deferred.add_done_callback(lambda m: forecast_result_cache.put(key, pred_df, m, extra))
+    elif cache_key is not None:
+        forecast_result_cache.put(cache_key, output_pred_df, metrics_obj, {"model_used": model_used})
 
     result: Dict[str, Any] = {
-        "predictions": output_pred_df.to_dict(orient="records"),
+        "predictions": (
+            format_predictions(output_pred_df, output_format=output_format, freq=parsed.freq)
+            if on_predictions is None
+            else []
+        ),
         "prediction_shape": list(output_pred_df.shape),
         "prediction_length": prediction_length,
         "quantiles": quantiles,
         "metrics": metrics_obj,
-        "model_used": "autogluon-chronos2-zeroshot",
+        "model_used": model_used,
         "generated_at": pd.Timestamp.now().isoformat(),
+        "cached": False,
     }
-    if temp_dir_ctx is not None:
-        temp_dir_ctx.cleanup()
+    if deferred is not None:
+        result["deferred_metrics"] = deferred
     return result
@@ -0,0 +1,56 @@
+"""
+基准脚本的公共部分：sys.path 引导、计时与命令行参数。
+
+脚本以 `python benchmarks/<name>.py` 方式运行（在 server/ 目录下）；改造前的实现与合成数据
+放在 tests/legacy_impls.py、tests/factories.py，与等价性测试共用。
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+for _path in (SERVER_DIR, SERVER_DIR / "tests"):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+
+def timeit(fn: Callable[[], Any], repeat: int) -> List[float]:
+    costs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        costs.append(time.perf_counter() - started)
+    return costs
+
+
+def median_cost(fn: Callable[[], Any], repeat: int) -> float:
+    return statistics.median(timeit(fn, repeat))
+
+
+def report_speedup(legacy: Callable[[], Any], current: Callable[[], Any], repeat: int, label: str = "") -> None:
+    """
+    分别计时改造前 / 当前实现，输出中位耗时与加速比。
+    """
+    legacy_cost = median_cost(legacy, repeat)
+    current_cost = median_cost(current, repeat)
+    prefix = f"{label:<8} " if label else ""
+    print(
+        f"{prefix}legacy={legacy_cost:.3f}s  vectorized={current_cost:.3f}s  "
+        f"speedup={legacy_cost / max(current_cost, 1e-9):.1f}x"
+    )
+
+
+def argument_parser(doc: str | None) -> argparse.ArgumentParser:
+    """
+    以脚本的模块 docstring 作为 --help 说明，并带上公共的 --repeat 参数。
+    """
+    parser = argparse.ArgumentParser(description=doc, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser
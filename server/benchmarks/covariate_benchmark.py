@@ -0,0 +1,37 @@
+"""
+未来协变量窗口校验基准：对比改造前逐 item get_group + date_range 的实现与当前向量化实现。
+
+用法（在 server/ 目录下）：
+    python benchmarks/covariate_benchmark.py --items 1000 --steps 48 --freq h
+"""
+
+from __future__ import annotations
+
+from _common import argument_parser, report_speedup
+
+from app.services.process import _validate_future_cov_window
+from factories import make_covariate_frames
+from legacy_impls import legacy_validate_future_cov_window
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=48)
+    parser.add_argument("--history", type=int, default=500)
+    parser.add_argument("--freq", default="h")
+    args = parser.parse_args()
+
+    frames = make_covariate_frames(args.items, args.steps, args.history, args.freq)
+    history, future = frames["history"], frames["future"]
+    kwargs = dict(prediction_length=args.steps, freq=args.freq)
+    print(f"items={args.items} steps={args.steps} freq={args.freq} -> {len(future)} covariate rows")
+    report_speedup(
+        lambda: legacy_validate_future_cov_window(history, future, **kwargs),
+        lambda: _validate_future_cov_window(history, future, **kwargs),
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
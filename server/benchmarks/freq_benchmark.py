@@ -0,0 +1,30 @@
+"""
+频率推断基准：对比改造前逐 item 调用 pd.infer_freq 的实现与当前向量化实现。
+
+用法（在 server/ 目录下）：
+    python benchmarks/freq_benchmark.py --items 1000 --steps 365 --freq D
+"""
+
+from __future__ import annotations
+
+from _common import argument_parser, report_speedup
+
+from app.services.process import _infer_freq_per_item
+from factories import make_freq_frame
+from legacy_impls import legacy_infer_freq_per_item
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=365)
+    parser.add_argument("--freq", default="D")
+    args = parser.parse_args()
+
+    df = make_freq_frame(args.items, args.steps, args.freq)
+    print(f"items={args.items} steps={args.steps} freq={args.freq} -> {len(df)} rows")
+    report_speedup(lambda: legacy_infer_freq_per_item(df), lambda: _infer_freq_per_item(df), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+IC/IR 计算基准：对比改造前逐时间点 groupby + _safe_spearman 的实现与当前向量化实现。
+
+用法（在 server/ 目录下）：
+    python benchmarks/ic_benchmark.py --items 2000 --steps 365
+"""
+
+from __future__ import annotations
+
+from _common import argument_parser, report_speedup
+
+from app.services.custom_metrics import compute_ic_ir
+from factories import make_ic_frame
+from legacy_impls import legacy_compute_ic_ir
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=365)
+    args = parser.parse_args()
+
+    df = make_ic_frame(args.items, args.steps)
+    kwargs = dict(df=df, y_true_col="target", y_pred_col="mean")
+    print(f"items={args.items} steps={args.steps} -> {len(df)} rows")
+    report_speedup(lambda: legacy_compute_ic_ir(**kwargs), lambda: compute_ic_ir(**kwargs), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+预测结果序列化基准：对比 records（逐行记录）与 columnar（每个 item_id 一个对象 + 并列数组）格式。
+
+用法（在 server/ 目录下）：
+    python benchmarks/output_benchmark.py --items 1000 --steps 48
+
+耗时包含 DataFrame -> Python 对象与 json.dumps 两步；同时输出两种格式的 JSON 大小。
+"""
+
+from __future__ import annotations
+
+import json
+
+from _common import argument_parser, median_cost
+
+from app.services.forecast_output import format_predictions
+from factories import make_prediction_frame
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=48)
+    args = parser.parse_args()
+
+    df = make_prediction_frame(args.items, args.steps, [0.1, 0.5, 0.9])
+    print(f"items={args.items} steps={args.steps} -> {len(df)} prediction rows")
+    results = {}
+    for fmt in ("records", "columnar"):
+        def run(fmt: str = fmt) -> str:
+            return json.dumps(format_predictions(df, output_format=fmt, freq="h"))
+
+        cost = median_cost(run, args.repeat)
+        results[fmt] = cost
+        print(f"{fmt:<9} {cost:.3f}s  {len(run()) / 1024:.0f} KiB")
+    print(f"speedup={results['records'] / max(results['columnar'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
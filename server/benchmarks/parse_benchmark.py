@@ -0,0 +1,128 @@
+"""
+Markdown 输入解析基准：对比旧的 list_of_dicts 构造与当前的列式 / 流式解析路径。
+
+用法（在 server/ 目录下）：
+    python benchmarks/parse_benchmark.py --scale 200
+
+以仓库根目录的 iuput.md 为模板，复制出 scale 倍的序列（item_id 加后缀）后分别计时：
+- construct：只计 JSON 解码 + 记录 -> DataFrame 构造
+  - legacy：正则定位代码块 + json.loads + 逐行 _normalize_id_key + pd.DataFrame(list_of_dicts)（改造前的方式）
+  - columnar：str.find 定位代码块 + orjson（可用时）+ records_to_frame
+- full parse：完整解析与校验（legacy / parse_markdown_bytes / parse_markdown_stream）
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import re
+import statistics
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+import pandas as pd
+from _common import SERVER_DIR, argument_parser, timeit
+
+from app.services import process
+from app.services.process import (
+    _normalize_id_key,
+    extract_json_from_markdown,
+    parse_markdown_bytes,
+    records_to_frame,
+)
+from app.services.stream_parser import parse_markdown_stream
+
+
+DEFAULT_INPUT = SERVER_DIR.parent / "iuput.md"
+# 改造前 extract_json_from_markdown 使用的代码块正则
+_LEGACY_FENCE_RE = re.compile(r"```json\s*(.*?)\s*```", re.IGNORECASE | re.DOTALL)
+
+
+def _scaled_markdown(template: Path, scale: int) -> bytes:
+    payload = extract_json_from_markdown(template.read_text(encoding="utf-8"))
+    for section in ("history_data", "test_data", "covariates"):
+        records = payload.get(section)
+        if not isinstance(records, list):
+            continue
+        payload[section] = [
+            {**rec, "item_id": f"{rec.get('item_id', rec.get('id'))}-{k}"} for k in range(scale) for rec in records
+        ]
+    return ("```json\n" + json.dumps(payload) + "\n```\n").encode("utf-8")
+
+
+def _frames(
+    content: bytes,
+    *,
+    fence: Callable[[str], Any],
+    loads: Callable[[str], Any],
+    build: Callable[[list], pd.DataFrame],
+) -> Dict[str, pd.DataFrame]:
+    payload = loads(fence(content.decode("utf-8")))
+    return {
+        section: build(payload[section])
+        for section in ("history_data", "covariates")
+        if isinstance(payload.get(section), list)
+    }
+
+
+def _legacy_fence(text: str) -> Any:
+    match = _LEGACY_FENCE_RE.search(text)
+    return match.group(1) if match else None
+
+
+def _legacy_build(records: list) -> pd.DataFrame:
+    return pd.DataFrame(_normalize_id_key(records))
+
+
+@contextmanager
+def _legacy_parser():
+    # 临时切回改造前的实现：正则定位代码块 + 标准库 json + 逐行归一 + list_of_dicts
+    saved = process._orjson, process._find_json_fence, process.records_to_frame
+    process._orjson, process._find_json_fence, process.records_to_frame = None, _legacy_fence, _legacy_build
+    try:
+        yield
+    finally:
+        process._orjson, process._find_json_fence, process.records_to_frame = saved
+
+
+def _legacy_full_parse(content: bytes, limits: Dict[str, Any]) -> Any:
+    with _legacy_parser():
+        return parse_markdown_bytes(content, **limits)
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--input", type=Path, default=DEFAULT_INPUT)
+    parser.add_argument("--scale", type=int, default=200, help="序列复制倍数（iuput.md 约 4.6k 行 / 倍）")
+    parser.add_argument("--prediction-length", type=int, default=28)
+    args = parser.parse_args()
+
+    content = _scaled_markdown(args.input, args.scale)
+    limits = dict(
+        prediction_length=args.prediction_length,
+        with_cov=True,
+        freq_override=None,
+        max_series=10**9,
+        max_points_per_series=10**9,
+        max_prediction_length=10**6,
+        max_upload_bytes=len(content) + 1,
+    )
+    rows = len(_frames(content, fence=_legacy_fence, loads=json.loads, build=_legacy_build)["history_data"])
+    print(f"input: {args.input.name} x{args.scale} -> {rows} history rows, {len(content) / 1e6:.1f} MB")
+    print(f"orjson: {'yes' if process._orjson is not None else 'no (stdlib json)'}")
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "construct: legacy": lambda: _frames(content, fence=_legacy_fence, loads=json.loads, build=_legacy_build),
+        "construct: columnar": lambda: _frames(content, fence=process._find_json_fence, loads=process._json_loads, build=records_to_frame),
+        "full parse: legacy": lambda: _legacy_full_parse(content, limits),
+        "full parse: payload": lambda: parse_markdown_bytes(content, **limits),
+        "full parse: stream": lambda: parse_markdown_stream(io.BytesIO(content), **limits),
+    }
+    for name, fn in cases.items():
+        costs = timeit(fn, args.repeat)
+        print(f"{name:<22} median={statistics.median(costs):.3f}s  min={min(costs):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
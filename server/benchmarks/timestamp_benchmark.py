@@ -0,0 +1,53 @@
+"""
+预测时间戳重排基准：对比改造前逐行 apply 的实现与当前向量化实现。
+
+用法（在 server/ 目录下）：
+    python benchmarks/timestamp_benchmark.py --items 1000 --steps 365
+
+- future：replace_pred_timestamps_with_future（预测结果对齐到历史末尾之后的未来时间戳）
+- holdout：replace_pred_timestamps_with_holdout（回测预测对齐到 holdout 时间戳）
+"""
+
+from __future__ import annotations
+
+from _common import argument_parser, report_speedup
+
+from app.services.metrics_helpers import (
+    replace_pred_timestamps_with_future,
+    replace_pred_timestamps_with_holdout,
+)
+from factories import make_timestamp_frames
+from legacy_impls import (
+    legacy_replace_pred_timestamps_with_future,
+    legacy_replace_pred_timestamps_with_holdout,
+)
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=365)
+    parser.add_argument("--freq", default="D")
+    args = parser.parse_args()
+
+    frames = make_timestamp_frames(args.items, args.steps, history=args.steps * 2, freq=args.freq)
+    pred, history, holdout = frames["pred"], frames["history"], frames["holdout"]
+    kwargs = dict(prediction_length=args.steps, freq=args.freq)
+    print(f"items={args.items} steps={args.steps} freq={args.freq} -> {len(pred)} prediction rows")
+
+    report_speedup(
+        lambda: legacy_replace_pred_timestamps_with_future(pred, history, **kwargs),
+        lambda: replace_pred_timestamps_with_future(pred, history, **kwargs),
+        args.repeat,
+        label="future",
+    )
+    report_speedup(
+        lambda: legacy_replace_pred_timestamps_with_holdout(pred, holdout),
+        lambda: replace_pred_timestamps_with_holdout(pred, holdout),
+        args.repeat,
+        label="holdout",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+测试与基准共用的合成数据：固定随机种子，规模由参数控制。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+def _item_ids(items: int) -> np.ndarray:
+    return np.array([f"item_{i:05d}" for i in range(items)])
+
+
+def make_covariate_frames(items: int, steps: int, history: int, freq: str = "D") -> Dict[str, pd.DataFrame]:
+    """
+    history：每条序列 history 个点；future：紧接历史末尾的 steps 步已知协变量（恰好覆盖预测窗口）。
+    """
+    rng = np.random.default_rng(0)
+    ids = _item_ids(items)
+    full = pd.date_range("2024-01-01", periods=history + steps, freq=freq)
+    history_df = pd.DataFrame(
+        {"item_id": np.repeat(ids, history), "timestamp": np.tile(full[:history], items), "target": rng.random(items * history)}
+    )
+    future_df = pd.DataFrame(
+        {"item_id": np.repeat(ids, steps), "timestamp": np.tile(full[history:], items), "promo": rng.random(items * steps)}
+    )
+    return {"history": history_df, "future": future_df}
+
+
+def make_freq_frame(items: int, steps: int, freq: str = "D") -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    ids = _item_ids(items)
+    # 各序列起点错开，与真实上传一致（不同序列的历史长度相同但日期不同）
+    starts = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 30, size=items), unit="D")
+    timestamps = np.concatenate([pd.date_range(start, periods=steps, freq=freq).to_numpy() for start in starts])
+    return pd.DataFrame(
+        {"item_id": np.repeat(ids, steps), "timestamp": timestamps, "target": rng.random(items * steps)}
+    ).sort_values(["item_id", "timestamp"], ignore_index=True)
+
+
+def make_ic_frame(items: int, steps: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    target = rng.normal(size=items * steps)
+    return pd.DataFrame(
+        {
+            "item_id": np.repeat(_item_ids(items), steps),
+            "timestamp": np.tile(pd.date_range("2024-01-01", periods=steps, freq="D"), items),
+            "target": target,
+            "mean": target + rng.normal(scale=2.0, size=items * steps),
+        }
+    )
+
+
+def make_timestamp_frames(items: int, steps: int, history: int, freq: str = "D") -> Dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(0)
+    ids = _item_ids(items)
+    hist_ts = pd.date_range("2020-01-01", periods=history, freq=freq)
+    history_df = pd.DataFrame(
+        {"item_id": np.repeat(ids, history), "timestamp": np.tile(hist_ts, items), "target": rng.random(items * history)}
+    )
+    # 模型输出的时间戳与真实未来时间戳不一致（例如按训练窗口编号），需要重排
+    pred_ts = pd.date_range("1999-01-01", periods=steps, freq=freq)
+    pred_df = pd.DataFrame(
+        {
+            "item_id": np.repeat(ids, steps),
+            "timestamp": np.tile(pred_ts, items),
+            "mean": rng.random(items * steps),
+            "0.5": rng.random(items * steps),
+        }
+    )
+    holdout_df = history_df.groupby("item_id").tail(steps)
+    return {"history": history_df, "pred": pred_df, "holdout": holdout_df}
+
+
+def make_prediction_frame(items: int, steps: int, quantiles: List[float]) -> pd.DataFrame:
+    """
+    后处理完成的预测结果：item_id / timestamp（字符串）/ mean / 各分位数列。
+    """
+    rng = np.random.default_rng(0)
+    ids = _item_ids(items)
+    timestamps = pd.date_range("2025-01-01", periods=steps, freq="h").astype(str)
+    mean = rng.normal(100.0, 10.0, size=items * steps)
+    data = {"item_id": np.repeat(ids, steps), "timestamp": np.tile(timestamps, items), "mean": mean}
+    for q in quantiles:
+        data[f"{q:g}"] = mean + (q - 0.5) * 20.0
+    return pd.DataFrame(data)
@@ -0,0 +1,182 @@
+"""
+改造前的实现：作为等价性测试的参照（oracle），benchmarks/ 中的基准脚本也以它们为对比基线。
+
+每个函数保留原有行为（包括逐行 / 逐 item 的循环），不要在这里做优化。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.custom_metrics import IcIrResult, _safe_spearman
+
+
+def legacy_validate_future_cov_window(
+    history_df: pd.DataFrame,
+    future_cov_df: pd.DataFrame,
+    *,
+    prediction_length: int,
+    freq: str,
+) -> Dict[str, List[str]]:
+    # 逐 item get_group + date_range + Series.equals
+    last_hist = history_df.groupby("item_id")["timestamp"].max()
+    future_groups = future_cov_df.groupby("item_id")["timestamp"]
+    invalid_items: Dict[str, List[str]] = {}
+    for item_id, last_ts in last_hist.items():
+        try:
+            future_ts = future_groups.get_group(item_id).sort_values()
+        except Exception:
+            invalid_items[str(item_id)] = ["missing_future_covariates"]
+            continue
+        expected = pd.date_range(start=last_ts, periods=prediction_length + 1, freq=freq)[1:]
+        if len(future_ts) != len(expected) or not future_ts.reset_index(drop=True).equals(
+            pd.Series(expected).reset_index(drop=True)
+        ):
+            invalid_items[str(item_id)] = ["future_covariates_not_cover_prediction_window"]
+    return invalid_items
+
+
+def legacy_infer_freq_per_item(history_df: pd.DataFrame) -> Optional[str]:
+    # 逐 item 排序 + pd.infer_freq
+    freqs: set[str] = set()
+    for _, group in history_df.groupby("item_id", sort=False):
+        ts = group.sort_values("timestamp")["timestamp"]
+        if len(ts) < 3:
+            continue
+        inferred = pd.infer_freq(ts)
+        if inferred:
+            freqs.add(str(inferred))
+    if not freqs:
+        return None
+    if len(freqs) > 1:
+        return None
+    return next(iter(freqs))
+
+
+def legacy_compute_ic_ir(
+    *,
+    df: pd.DataFrame,
+    y_true_col: str,
+    y_pred_col: str,
+    timestamp_col: str = "timestamp",
+    item_id_col: str = "item_id",
+) -> IcIrResult:
+    # 逐时间点 groupby + _safe_spearman
+    work = df[[timestamp_col, item_id_col, y_true_col, y_pred_col]].copy()
+    work = work.dropna(subset=[y_true_col, y_pred_col])
+    if work.empty:
+        return IcIrResult(ic=None, ir=None, ic_by_timestamp=[], method="empty")
+    work[timestamp_col] = pd.to_datetime(work[timestamp_col], errors="coerce")
+    work = work.dropna(subset=[timestamp_col])
+    if work.empty:
+        return IcIrResult(ic=None, ir=None, ic_by_timestamp=[], method="empty")
+
+    ic_list: List[float] = []
+    for _, g in work.groupby(timestamp_col, sort=True):
+        if g[item_id_col].nunique() < 2:
+            continue
+        corr = _safe_spearman(g[y_pred_col].to_numpy(), g[y_true_col].to_numpy())
+        if corr is not None:
+            ic_list.append(corr)
+
+    if ic_list:
+        ic = float(np.mean(ic_list))
+        if len(ic_list) >= 2:
+            std = float(np.std(ic_list, ddof=1))
+            ir = ic / std if std > 0 else None
+        else:
+            ir = None
+        return IcIrResult(ic=ic, ir=ir, ic_by_timestamp=ic_list, method="cross_sectional_by_timestamp")
+
+    corr_all = _safe_spearman(work[y_pred_col].to_numpy(), work[y_true_col].to_numpy())
+    return IcIrResult(ic=corr_all, ir=None, ic_by_timestamp=[], method="overall_spearman_fallback")
+
+
+def legacy_replace_pred_timestamps_with_future(
+    pred_df: pd.DataFrame,
+    history_df: pd.DataFrame,
+    *,
+    prediction_length: int,
+    freq: str,
+    item_id_col: str = "item_id",
+    timestamp_col: str = "timestamp",
+) -> pd.DataFrame:
+    # 逐行 apply + 每个 item 一次 date_range
+    pred_df = pd.DataFrame(pred_df)
+    history_df = pd.DataFrame(history_df)
+    if timestamp_col not in pred_df.columns or item_id_col not in pred_df.columns:
+        return pred_df
+    if prediction_length <= 0:
+        return pred_df
+
+    hist = history_df[[item_id_col, timestamp_col]].copy()
+    hist[timestamp_col] = pd.to_datetime(hist[timestamp_col], errors="coerce")
+    hist = hist.dropna(subset=[timestamp_col])
+    last_ts = hist.groupby(item_id_col)[timestamp_col].max()
+    if last_ts.empty:
+        return pred_df
+
+    future_map: Dict[str, List[pd.Timestamp]] = {}
+    for item_id, ts in last_ts.items():
+        if pd.isna(ts):
+            continue
+        future = pd.date_range(start=ts, periods=int(prediction_length) + 1, freq=freq)[1:]
+        future_map[str(item_id)] = list(future)
+
+    work = pred_df.copy()
+    work[timestamp_col] = pd.to_datetime(work[timestamp_col], errors="coerce")
+    work = work.sort_values([item_id_col, timestamp_col])
+    work["_pos"] = work.groupby(item_id_col).cumcount()
+    work = work[work["_pos"] < int(prediction_length)].copy()
+
+    def _assign_future(row: pd.Series) -> pd.Timestamp:
+        seq = future_map.get(str(row[item_id_col]))
+        if not seq:
+            return row[timestamp_col]
+        pos = int(row["_pos"])
+        return seq[pos] if pos < len(seq) else row[timestamp_col]
+
+    work[timestamp_col] = work.apply(_assign_future, axis=1)
+    return work.drop(columns=["_pos"])
+
+
+def legacy_replace_pred_timestamps_with_holdout(
+    pred_df: pd.DataFrame,
+    holdout_df: pd.DataFrame,
+    *,
+    item_id_col: str = "item_id",
+    timestamp_col: str = "timestamp",
+) -> pd.DataFrame:
+    # 逐行 apply + 按 item 的 list 查表
+    pred_df = pd.DataFrame(pred_df)
+    holdout_df = pd.DataFrame(holdout_df)
+    if timestamp_col not in pred_df.columns or item_id_col not in pred_df.columns:
+        return pred_df
+
+    holdout = holdout_df[[item_id_col, timestamp_col]].copy()
+    holdout[timestamp_col] = pd.to_datetime(holdout[timestamp_col], errors="coerce")
+    holdout = holdout.dropna(subset=[timestamp_col]).sort_values([item_id_col, timestamp_col])
+    holdout_map_raw = holdout.groupby(item_id_col)[timestamp_col].apply(list).to_dict()
+    holdout_map = {str(k): v for k, v in holdout_map_raw.items()}
+    if not holdout_map:
+        return pred_df
+
+    work = pred_df.copy()
+    work[timestamp_col] = pd.to_datetime(work[timestamp_col], errors="coerce")
+    work = work.sort_values([item_id_col, timestamp_col])
+    work["_pos"] = work.groupby(item_id_col).cumcount()
+    work["_limit"] = work[item_id_col].map(lambda x: len(holdout_map.get(str(x), [])))
+    work = work[work["_pos"] < work["_limit"]].copy()
+
+    def _assign_holdout(row: pd.Series) -> pd.Timestamp:
+        seq = holdout_map.get(str(row[item_id_col]))
+        if not seq:
+            return row[timestamp_col]
+        pos = int(row["_pos"])
+        return seq[pos] if pos < len(seq) else row[timestamp_col]
+
+    work[timestamp_col] = work.apply(_assign_holdout, axis=1)
+    return work.drop(columns=["_pos", "_limit"])
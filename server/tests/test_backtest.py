@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.core.exceptions import DataException  # noqa: E402
+from app.services.backtest import _mean_metrics, build_backtest_windows  # noqa: E402
+from app.services.metrics_helpers import split_holdout_frame  # noqa: E402
+
+
+def _series(lengths):
+    frames = []
+    for k, n in enumerate(lengths):
+        frames.append(
+            pd.DataFrame(
+                {
+                    "item_id": f"i{k}",
+                    "timestamp": pd.date_range("2024-01-01", periods=n, freq="D"),
+                    "target": np.arange(n, dtype=float) + 100 * k,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_windows_match_truncated_holdout_splits():
+    df = _series([30, 30])
+    windows = build_backtest_windows(df, prediction_length=4, num_windows=3, step=5, min_context=4)
+    assert [w["offset"] for w in windows.windows] == [10, 5, 0]
+
+    for window in windows.windows:
+        k, offset = window["window"], window["offset"]
+        keep = df.groupby("item_id").cumcount(ascending=False) >= offset
+        truncated = df[keep].reset_index(drop=True)
+        train_ref, holdout_ref = split_holdout_frame(truncated, 4)
+        holdout = windows.holdout_df[windows.holdout_window == k]
+        context = windows.context_df[windows.context_df["item_id"].str.endswith(f"#w{k}")]
+        assert holdout["item_id"].str.replace(f"#w{k}", "").tolist() == holdout_ref["item_id"].tolist()
+        assert holdout["target"].tolist() == holdout_ref["target"].tolist()
+        assert len(context) == len(train_ref)
+
+
+def test_short_series_skipped_per_window():
+    windows = build_backtest_windows(_series([30, 14]), prediction_length=4, num_windows=3, step=5, min_context=4)
+    assert [w["num_items"] for w in windows.windows] == [1, 2, 2]
+    assert windows.warnings == [
+        {"window": 0, "reason": "series_too_short_skipped", "items": ["i1"], "required_min_length": 18}
+    ]
+
+    with pytest.raises(DataException):
+        build_backtest_windows(_series([6]), prediction_length=4, num_windows=2, step=4, min_context=4)
+
+
+def test_mean_metrics_over_windows():
+    out = _mean_metrics(
+        [
+            {"WQL": -0.2, "WQL_by_horizon": [-0.1, None], "COVERAGE": {"0.5": 0.4}},
+            {"WQL": -0.4, "WQL_by_horizon": [-0.3, -0.5], "COVERAGE": {"0.5": 0.6}},
+        ]
+    )
+    assert out["WQL"] == pytest.approx(-0.3)
+    assert out["WQL_by_horizon"] == pytest.approx([-0.2, -0.5])
+    assert out["COVERAGE"] == {"0.5": pytest.approx(0.5)}
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.process import _validate_future_cov_window  # noqa: E402
+from factories import make_covariate_frames  # noqa: E402
+from legacy_impls import legacy_validate_future_cov_window  # noqa: E402
+
+
+def _messy_frames(freq: str):
+    frames = make_covariate_frames(items=6, steps=4, history=10, freq=freq)
+    history, future = frames["history"], frames["future"]
+    step = pd.tseries.frequencies.to_offset(freq)
+    # item_00001 整体后移一步；item_00002 中间缺一步（最后多一步）；item_00003 没有协变量；
+    # item_00004 历史更短（末尾时间戳不同）且协变量跟着前移
+    future.loc[future["item_id"] == "item_00001", "timestamp"] += step
+    gap = future.index[(future["item_id"] == "item_00002")][1:]
+    future.loc[gap, "timestamp"] += step
+    future = future[future["item_id"] != "item_00003"]
+    history = history.drop(history.index[(history["item_id"] == "item_00004")][-2:])
+    future.loc[future["item_id"] == "item_00004", "timestamp"] -= 2 * step
+    return history, future.sort_values(["item_id", "timestamp"], ignore_index=True)
+
+
+@pytest.mark.parametrize("freq", ["D", "h", "W-SUN", "ME", "B"])
+def test_window_validation_matches_legacy(freq):
+    history, future = _messy_frames(freq)
+    expected = legacy_validate_future_cov_window(history, future, prediction_length=4, freq=freq)
+    actual = _validate_future_cov_window(history, future, prediction_length=4, freq=freq)
+    assert actual == expected
+    assert list(actual) == list(expected)
+    assert set(actual) == {"item_00001", "item_00002", "item_00003"}
+
+
+def test_window_validation_timezone_and_unit():
+    frames = make_covariate_frames(items=3, steps=5, history=8, freq="h")
+    history = frames["history"].assign(timestamp=frames["history"]["timestamp"].dt.tz_localize("Asia/Shanghai"))
+    future = frames["future"].assign(timestamp=frames["future"]["timestamp"].dt.tz_localize("Asia/Shanghai"))
+    assert _validate_future_cov_window(history, future, prediction_length=5, freq="h") == {}
+
+    # 协变量时间戳为微秒精度（如 Parquet 输入）时同样按时间值比较
+    future_us = frames["future"].assign(timestamp=frames["future"]["timestamp"].astype("datetime64[us]"))
+    assert _validate_future_cov_window(frames["history"], future_us, prediction_length=5, freq="h") == {}
+
+    naive_future = frames["future"]
+    assert _validate_future_cov_window(history, naive_future, prediction_length=5, freq="h") == (
+        legacy_validate_future_cov_window(history, naive_future, prediction_length=5, freq="h")
+    )
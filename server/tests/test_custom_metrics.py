@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.custom_metrics import _safe_spearman, compute_ic_ir  # noqa: E402
+from factories import make_ic_frame  # noqa: E402
+from legacy_impls import legacy_compute_ic_ir  # noqa: E402
+
+
+def _messy_frame() -> pd.DataFrame:
+    df = make_ic_frame(items=30, steps=12, seed=1)
+    # 取整制造并列秩；一个时间点只剩一个 item；一个时间点预测值全相同；含 NaN 与无法解析的时间戳
+    df["mean"] = df["mean"].round(0)
+    df = df[~((df["timestamp"] == "2024-01-03") & (df["item_id"] != "item_00000"))].copy()
+    df.loc[df["timestamp"] == "2024-01-05", "mean"] = 1.0
+    df.loc[df.index[7], "target"] = np.nan
+    df["timestamp"] = df["timestamp"].astype(object)
+    df.loc[df.index[9], "timestamp"] = "not-a-date"
+    return df.sample(frac=1.0, random_state=0)
+
+
+@pytest.mark.parametrize("frame", [_messy_frame(), make_ic_frame(items=1, steps=8), make_ic_frame(items=5, steps=1)])
+def test_ic_ir_matches_legacy(frame):
+    kwargs = dict(df=frame, y_true_col="target", y_pred_col="mean")
+    expected = legacy_compute_ic_ir(**kwargs)
+    actual = compute_ic_ir(**kwargs)
+
+    assert actual.method == expected.method
+    np.testing.assert_allclose(actual.ic_by_timestamp, expected.ic_by_timestamp, rtol=1e-9, atol=1e-12)
+    for a, e in ((actual.ic, expected.ic), (actual.ir, expected.ir)):
+        assert (a is None) == (e is None)
+        if a is not None:
+            assert a == pytest.approx(e, rel=1e-9, abs=1e-12)
+
+
+def test_ic_by_horizon_groups_by_step_not_timestamp():
+    df = make_ic_frame(items=6, steps=4, seed=2)
+    # 各 item 的 holdout 结束日期不同：按时间点几乎没有截面，按预测步仍可逐步比较
+    shift = df["item_id"].str[-1].astype(int)
+    df["timestamp"] = df["timestamp"] + pd.to_timedelta(shift * 10, unit="D")
+
+    result = compute_ic_ir(df=df, y_true_col="target", y_pred_col="mean")
+    assert result.ic_by_timestamp == []
+    expected = [
+        _safe_spearman(g["mean"].to_numpy(), g["target"].to_numpy())
+        for _, g in df.assign(step=df.groupby("item_id").cumcount()).groupby("step")
+    ]
+    np.testing.assert_allclose(result.ic_by_horizon, expected, rtol=1e-9)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pandas as pd
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services import finetune_forecast  # noqa: E402
+from app.services.finetune_forecast import install_trainer_progress_hook  # noqa: E402
+from app.services.job_context import report_stage  # noqa: E402
+from app.services.job_queue import JobQueue  # noqa: E402
+from app.services.process import ParsedMarkdownInput  # noqa: E402
+
+
+def _fake_transformers():
+    """
+    最小化的 transformers：Trainer 只支持 add_callback 与逐 step 触发 on_step_end。
+    """
+
+    class TrainerCallback:
+        pass
+
+    class Trainer:
+        def __init__(self, max_steps):
+            self.max_steps = max_steps
+            self.callbacks = []
+            self.steps_run = 0
+
+        def add_callback(self, callback):
+            self.callbacks.append(callback)
+
+        def train(self):
+            control = types.SimpleNamespace(should_training_stop=False)
+            for step in range(1, self.max_steps + 1):
+                time.sleep(0.01)
+                self.steps_run = step
+                state = types.SimpleNamespace(global_step=step, max_steps=self.max_steps)
+                for callback in self.callbacks:
+                    callback.on_step_end(None, state, control)
+                if control.should_training_stop:
+                    break
+            return step
+
+    module = types.ModuleType("transformers")
+    module.Trainer = Trainer
+    module.TrainerCallback = TrainerCallback
+    return module
+
+
+def test_trainer_built_inside_job_reports_steps_and_stops_on_cancel(monkeypatch):
+    fake = _fake_transformers()
+    monkeypatch.setitem(sys.modules, "transformers", fake)
+    assert install_trainer_progress_hook()
+    assert install_trainer_progress_hook()
+
+    # 任务之外创建的 Trainer 不挂回调
+    assert fake.Trainer(max_steps=3).callbacks == []
+
+    def _fit():
+        # 模拟 AutoGluon 在 fit 内部自行创建 Trainer；训练停止后下一个阶段边界抛出 JobCancelled
+        fake.Trainer(max_steps=1000).train()
+        report_stage("predicting")
+
+    async def _scenario():
+        queue = JobQueue(num_workers=1)
+        record = queue.submit("finetune", _fit)
+        queue.start()
+        try:
+            while queue.get(record.job_id).progress.get("step", 0) < 3:
+                await asyncio.sleep(0.01)
+            queue.cancel(record.job_id)
+            while queue.get(record.job_id).status == "running":
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+        return queue.get(record.job_id)
+
+    done = asyncio.run(asyncio.wait_for(_scenario(), timeout=10))
+    assert done.status == "cancelled"
+    assert done.progress["total_steps"] == 1000
+    assert 3 <= done.progress["step"] < 1000
+
+
+def test_trainer_without_bound_job_is_unaffected_while_a_job_trains(monkeypatch):
+    fake = _fake_transformers()
+    monkeypatch.setitem(sys.modules, "transformers", fake)
+    assert install_trainer_progress_hook()
+    job_training = threading.Event()
+    outside = {}
+
+    def _fit():
+        trainer = fake.Trainer(max_steps=1000)
+        job_training.set()
+        trainer.train()
+        report_stage("predicting")
+
+    def _train_outside_job():
+        # 与任务并发、但未绑定任务的线程：不挂回调，完整训练，也不受任务取消影响
+        job_training.wait(timeout=5)
+        trainer = fake.Trainer(max_steps=5)
+        outside["callbacks"] = list(trainer.callbacks)
+        trainer.train()
+        outside["steps_run"] = trainer.steps_run
+
+    async def _scenario():
+        queue = JobQueue(num_workers=1)
+        record = queue.submit("finetune", _fit)
+        queue.start()
+        thread = threading.Thread(target=_train_outside_job)
+        thread.start()
+        try:
+            await asyncio.to_thread(thread.join, 5)
+            queue.cancel(record.job_id)
+            while queue.get(record.job_id).status == "running":
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+        return queue.get(record.job_id)
+
+    done = asyncio.run(asyncio.wait_for(_scenario(), timeout=10))
+    assert done.status == "cancelled"
+    assert outside == {"callbacks": [], "steps_run": 5}
+    assert fake.Trainer.__init__.__name__ == "__init__"
+
+
+def test_timed_out_finetune_stops_training_and_is_not_succeeded(monkeypatch):
+    fake = _fake_transformers()
+    monkeypatch.setitem(sys.modules, "transformers", fake)
+    fit_calls = []
+
+    class _Predictor:
+        def __init__(self, **kwargs):
+            self.prediction_length = kwargs["prediction_length"]
+
+        def fit(self, **kwargs):
+            # 模拟 AutoGluon 在 fit 内部创建 Trainer；训练被回调停止后 fit 正常返回
+            fit_calls.append(kwargs)
+            fake.Trainer(max_steps=kwargs["hyperparameters"]["Chronos2"][0]["fine_tune_steps"]).train()
+            return self
+
+    class _Frame:
+        @staticmethod
+        def from_data_frame(df, **kwargs):
+            return df
+
+    monkeypatch.setattr(finetune_forecast, "_lazy_import_autogluon", lambda: (_Frame, _Predictor))
+    monkeypatch.setattr(finetune_forecast.settings, "CHRONOS_MODEL_PATH", "/models/chronos2")
+    monkeypatch.setattr(finetune_forecast.settings, "AG_CHRONOS_MODEL_NAME", "Chronos2")
+    parsed = ParsedMarkdownInput(
+        history_df=pd.DataFrame(
+            {"item_id": ["a"] * 8, "timestamp": pd.date_range("2024-01-01", periods=8, freq="D"), "target": range(8)}
+        ),
+        future_cov_df=None,
+        test_df=None,
+        freq="D",
+        known_covariates_names=[],
+        category_covariates_names=[],
+    )
+
+    async def _scenario():
+        queue = JobQueue(num_workers=1)
+        record = queue.submit(
+            "finetune",
+            finetune_forecast.finetune_forecast_from_parsed,
+            parsed,
+            prediction_length=2,
+            quantiles=[0.5],
+            metrics=[],
+            with_cov=False,
+            device="cpu",
+            finetune_num_steps=1000,
+            save_model=False,
+            timeout_seconds=0.3,
+        )
+        queue.start()
+        try:
+            while queue.get(record.job_id).status in {"queued", "running"}:
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+        return queue.get(record.job_id)
+
+    done = asyncio.run(asyncio.wait_for(_scenario(), timeout=10))
+    assert done.status == "timed_out"
+    assert done.result is None
+    assert done.progress["total_steps"] == 1000
+    assert done.progress["step"] < 1000
+    # 截止时间不作为 AutoGluon 的 time_limit 传入
+    assert len(fit_calls) == 1
+    assert "time_limit" not in fit_calls[0]
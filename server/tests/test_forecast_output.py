@@ -4,6 +4,7 @@ import sys
 from pathlib import Path
 
 import pandas as pd
+import pytest
 
 
 SERVER_DIR = Path(__file__).resolve().parents[1]
@@ -11,7 +12,13 @@ if str(SERVER_DIR) not in sys.path:
     sys.path.insert(0, str(SERVER_DIR))
 
 
-from app.services.forecast_output import filter_prediction_df_quantiles  # noqa: E402
+from app.core.exceptions import DataException  # noqa: E402
+from app.services.forecast_output import (  # noqa: E402
+    filter_prediction_df_quantiles,
+    format_predictions,
+    validate_output_format,
+)
+from factories import make_prediction_frame  # noqa: E402
 
 
 def test_filter_prediction_df_quantiles_keeps_only_requested():
@@ -36,3 +43,31 @@ def test_filter_prediction_df_quantiles_keeps_only_requested():
     out = filter_prediction_df_quantiles(df, quantiles=[0.1, 0.5, 0.9], keep_mean=True)
     assert list(out.columns) == ["item_id", "timestamp", "mean", "0.1", "0.5", "0.9"]
 
+
+
+def test_columnar_predictions_expand_back_to_records():
+    df = make_prediction_frame(items=3, steps=4, quantiles=[0.1, 0.9])
+    df.loc[5, "0.9"] = float("nan")
+    records = format_predictions(df, output_format="records")
+    # 行按时间交错排列时仍按 item 聚合，item 内保持原有行序
+    interleaved = df.sort_values("timestamp", kind="stable")
+    columnar = format_predictions(interleaved, output_format="columnar", freq="h")
+
+    assert [obj["item_id"] for obj in columnar] == ["item_00000", "item_00001", "item_00002"]
+    assert columnar[0]["start"] == records[0]["timestamp"]
+    assert columnar[0]["freq"] == "h"
+    expanded = pd.DataFrame(
+        [
+            {"item_id": obj["item_id"], "mean": m, "0.1": lo, "0.9": hi}
+            for obj in columnar
+            for m, lo, hi in zip(obj["mean"], obj["0.1"], obj["0.9"])
+        ]
+    )
+    pd.testing.assert_frame_equal(expanded, pd.DataFrame(records).drop(columns=["timestamp"]))
+
+
+def test_validate_output_format():
+    assert validate_output_format(None) == "records"
+    assert validate_output_format("Columnar") == "columnar"
+    with pytest.raises(DataException):
+        validate_output_format("arrow")
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.core.exceptions import DataException, ErrorCode, ModelException  # noqa: E402
+from app.services.forecast_stream import open_forecast_stream  # noqa: E402
+from factories import make_prediction_frame  # noqa: E402
+
+
+def _fake_forecast(*, fail_at=None, on_predictions=None):
+    if fail_at == "parse":
+        raise DataException(error_code=ErrorCode.VALIDATION_ERROR, message="bad input")
+    on_predictions(make_prediction_frame(items=3, steps=2, quantiles=[0.5]), "h")
+    if fail_at == "metrics":
+        raise ModelException(error_code=ErrorCode.MODEL_PREDICT_FAILED, message="metrics failed")
+    return {"predictions": [], "prediction_length": 2, "metrics": {"WQL": 0.1}}
+
+
+async def _collect(**kwargs):
+    lines = await open_forecast_stream(_fake_forecast, **kwargs)
+    return [json.loads(line) for chunk in [c async for c in lines] for line in chunk.splitlines()]
+
+
+def test_stream_writes_items_then_metrics():
+    records = asyncio.run(_collect())
+    assert [r["type"] for r in records] == ["prediction"] * 3 + ["metrics"]
+    assert records[0]["item_id"] == "item_00000" and records[0]["freq"] == "h" and len(records[0]["mean"]) == 2
+    assert records[-1] == {"type": "metrics", "prediction_length": 2, "metrics": {"WQL": 0.1}}
+
+
+def test_stream_errors_before_and_after_predictions():
+    # 预测发出前的异常直接抛出（由异常处理器返回标准错误响应）
+    with pytest.raises(DataException):
+        asyncio.run(_collect(fail_at="parse"))
+
+    records = asyncio.run(_collect(fail_at="metrics"))
+    assert [r["type"] for r in records] == ["prediction"] * 3 + ["error"]
+    assert records[-1]["error_code"] == "MODEL_PREDICT_FAILED"
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.core.exceptions import DataException  # noqa: E402
+from app.services.process import _infer_freq_per_item, _infer_item_freqs, parse_input_frames  # noqa: E402
+from factories import make_freq_frame  # noqa: E402
+from legacy_impls import legacy_infer_freq_per_item  # noqa: E402
+
+
+@pytest.mark.parametrize("freq", ["D", "3D", "h", "15min", "W-WED", "2W-SUN", "28D", "B", "ME", "MS", "QE-DEC", "YE-DEC"])
+def test_item_freqs_match_pd_infer_freq(freq):
+    df = make_freq_frame(items=4, steps=12, freq=freq)
+    expected = {item: pd.infer_freq(g["timestamp"]) for item, g in df.groupby("item_id")}
+    assert _infer_item_freqs(df).to_dict() == expected
+    assert _infer_item_freqs(df.sample(frac=1.0, random_state=0)).to_dict() == expected
+    # 整周频率带起点星期，错开起点时各序列不一致：两种实现都不给出 freq
+    assert _infer_freq_per_item(df).freq == legacy_infer_freq_per_item(df)
+
+
+def test_irregular_short_and_duplicate_series_are_skipped():
+    df = pd.DataFrame(
+        {
+            "item_id": ["a"] * 3 + ["b"] * 2 + ["c"] * 3 + ["d"] * 3,
+            "timestamp": pd.to_datetime(
+                ["2024-01-01", "2024-01-02", "2024-01-05"]
+                + ["2024-01-01", "2024-01-02"]
+                + ["2024-01-01", "2024-01-01", "2024-01-02"]
+                + ["2024-01-01", "2024-01-02", "2024-01-03"]
+            ),
+        }
+    )
+    assert _infer_item_freqs(df).to_dict() == {"d": "D"}
+
+
+def test_disagreeing_items_are_reported():
+    daily = make_freq_frame(items=3, steps=10, freq="D")
+    hourly = make_freq_frame(items=1, steps=10, freq="h").assign(item_id="hourly")
+    history = pd.concat([daily, hourly], ignore_index=True)
+
+    with pytest.raises(DataException) as exc_info:
+        parse_input_frames(
+            history,
+            test_df=None,
+            covariates_df=None,
+            meta={},
+            prediction_length=2,
+            with_cov=False,
+            freq_override=None,
+            max_series=100,
+            max_points_per_series=100,
+        )
+    details = exc_info.value.details
+    assert details["dominant_freq"] == "D"
+    assert details["freq_counts"] == {"D": 3, "h": 1}
+    assert details["disagreeing_items"] == ["hourly"]
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.core.exception_handlers import app_exception_handler  # noqa: E402
+from app.core.exceptions import ServiceBusyException  # noqa: E402
+from app.services.inference_executor import InferenceExecutor, yield_inference_slot  # noqa: E402
+
+
+def test_concurrency_and_queue_capacity_are_enforced():
+    executor = InferenceExecutor(max_concurrency=2, max_queue=1, retry_after_seconds=7)
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def _work():
+        started.release()
+        release.wait(timeout=10)
+        return "ok"
+
+    try:
+        futures = [executor.submit(_work) for _ in range(3)]
+        started.acquire(timeout=5)
+        started.acquire(timeout=5)
+        stats = executor.stats()
+        assert (stats["inflight"], stats["running"], stats["queued"]) == (3, 2, 1)
+
+        with pytest.raises(ServiceBusyException) as exc_info:
+            executor.submit(_work)
+        assert executor.stats()["rejected"] == 1
+
+        response = asyncio.run(app_exception_handler(None, exc_info.value))
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
+
+        release.set()
+        assert [f.result(timeout=5) for f in futures] == ["ok"] * 3
+        # 释放在 future 的完成回调中执行，可能略晚于 result() 返回
+        deadline = time.monotonic() + 5
+        while executor.stats()["inflight"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert executor.stats()["inflight"] == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_slots_are_released_when_task_raises():
+    executor = InferenceExecutor(max_concurrency=1, max_queue=0, retry_after_seconds=1)
+
+    def _boom():
+        raise ValueError("boom")
+
+    async def _scenario():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await executor.run(_boom)
+        return await executor.run(lambda: "ok")
+
+    try:
+        assert asyncio.run(_scenario()) == "ok"
+        assert executor.stats()["inflight"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_yielded_slot_lets_queued_task_run():
+    executor = InferenceExecutor(max_concurrency=1, max_queue=1, retry_after_seconds=1)
+    release = threading.Event()
+
+    def _waiter():
+        with yield_inference_slot():
+            release.wait(timeout=10)
+        return "waiter"
+
+    try:
+        waiter = executor.submit(_waiter)
+        # 名额已被让出：第二个任务不必等 waiter 结束
+        assert executor.submit(lambda: "runner").result(timeout=5) == "runner"
+        stats = executor.stats()
+        assert (stats["running"], stats["yielded"], stats["queued"]) == (0, 1, 0)
+        release.set()
+        assert waiter.result(timeout=5) == "waiter"
+    finally:
+        release.set()
+        executor.shutdown()
+    # 不在执行器线程中调用时为空操作
+    with yield_inference_slot():
+        pass
+
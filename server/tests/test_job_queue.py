@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.job_context import report_stage  # noqa: E402
+from app.services.job_queue import JobQueue  # noqa: E402
+from app.services.job_store import JobStore  # noqa: E402
+
+
+async def _wait_all(queue: JobQueue, records, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while any(queue.get(r.job_id).status in {"queued", "running"} for r in records):
+        assert time.monotonic() < deadline, "jobs did not finish in time"
+        await asyncio.sleep(0.01)
+
+
+def test_kind_limit_and_interactive_overtakes_batch():
+    async def _scenario():
+        queue = JobQueue(num_workers=2, kind_limits={"finetune": 1}, aging_seconds=3600)
+        order = []
+        active = {"finetune": 0, "max_finetune": 0}
+        lock = threading.Lock()
+
+        def _job(kind, name):
+            with lock:
+                order.append(name)
+                if kind == "finetune":
+                    active["finetune"] += 1
+                    active["max_finetune"] = max(active["max_finetune"], active["finetune"])
+            time.sleep(0.05)
+            with lock:
+                if kind == "finetune":
+                    active["finetune"] -= 1
+            return name
+
+        records = [queue.submit("finetune", _job, "finetune", f"ft{i}", params={"i": i}) for i in range(3)]
+        records.append(queue.submit("zeroshot", _job, "zeroshot", "zs"))
+        queue.start()
+        try:
+            await _wait_all(queue, records)
+        finally:
+            await queue.stop()
+        return queue, records, order, active
+
+    queue, records, order, active = asyncio.run(_scenario())
+    assert all(queue.get(r.job_id).status == "succeeded" for r in records)
+    assert records[0].params == {"i": 0}
+    assert active["max_finetune"] == 1
+    # zeroshot 最后提交，但属于 interactive 通道，应先于排队中的 finetune 执行
+    assert order.index("zs") < order.index("ft1")
+
+
+def test_aging_prevents_batch_starvation():
+    queue = JobQueue(num_workers=1, aging_seconds=1.0)
+    batch = queue.submit("finetune", lambda: None)
+    queue._pending[0].enqueued_at -= 5.0
+    queue.submit("zeroshot", lambda: None)
+    assert queue._pick_next().job_id == batch.job_id
+
+
+def _double(x):
+    return {"value": x * 2}
+
+
+def test_store_recovers_queued_jobs_and_purges_finished(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+
+    first = JobQueue(store=JobStore(db_path))
+    first.register_handler("zeroshot", _double)
+    queued = first.submit("zeroshot", _double, 21)
+    lost = first.submit("zeroshot", lambda: None)
+    first.flush()
+    first.store.close()
+
+    async def _restart():
+        second = JobQueue(store=JobStore(db_path))
+        second.register_handler("zeroshot", _double)
+        second.start()
+        try:
+            await _wait_all(second, [queued])
+        finally:
+            await second.stop(drain_timeout=1.0)
+        return second
+
+    second = asyncio.run(_restart())
+    done = second.get(queued.job_id)
+    assert done.status == "succeeded"
+    assert done.result == {"value": 42}
+    assert queued.job_id not in second.jobs
+    assert second.get(lost.job_id).status == "failed"
+
+    assert second.store.purge_expired(ttl_seconds=-1) == 2
+    assert second.get(queued.job_id) is None
+
+
+def _cooperative(steps):
+    for i in range(steps):
+        report_stage(f"step-{i}")
+        time.sleep(0.02)
+    return "done"
+
+
+def test_cancel_and_timeout_stop_running_jobs():
+    async def _scenario():
+        queue = JobQueue(num_workers=2)
+        running = queue.submit("finetune", _cooperative, 500)
+        timed = queue.submit("zeroshot", _cooperative, 500, timeout_seconds=0.1)
+        queued = queue.submit("finetune", _cooperative, 1)
+        queue.start()
+        try:
+            await asyncio.sleep(0.05)
+            assert queue.cancel(queued.job_id).status == "cancelled"
+            queue.cancel(running.job_id)
+            await _wait_all(queue, [running, timed])
+        finally:
+            await queue.stop()
+        return queue, running, timed
+
+    queue, running, timed = asyncio.run(_scenario())
+    assert queue.get(running.job_id).status == "cancelled"
+    assert queue.get(timed.job_id).status == "timed_out"
+    assert queue.get(timed.job_id).progress["stage"].startswith("step-")
+
+
+def test_deferred_metrics_release_resources_when_run_or_cancelled():
+    from contextlib import ExitStack
+
+    from app.services.forecast_metrics import DeferredMetrics
+
+    released = []
+
+    def _deferred(name):
+        stack = ExitStack()
+        stack.callback(released.append, name)
+        deferred = DeferredMetrics(lambda: {"WQL": -0.1}, cleanup=stack)
+        deferred.add_done_callback(lambda m: released.append(f"{name}:done"))
+        return deferred
+
+    async def _scenario():
+        queue = JobQueue(num_workers=1)
+        ran = queue.submit("metrics", _deferred("ran"), persist=False)
+        dropped = queue.submit("metrics", _deferred("dropped"), persist=False)
+        queue.cancel(dropped.job_id)
+        queue.start()
+        try:
+            await _wait_all(queue, [ran])
+        finally:
+            await queue.stop()
+        return queue, ran, dropped
+
+    queue, ran, dropped = asyncio.run(_scenario())
+    assert queue.get(ran.job_id).result == {"metrics": {"WQL": -0.1}}
+    assert queue.get(dropped.job_id).status == "cancelled"
+    assert released == ["dropped", "ran", "ran:done"]
+
+
+def test_submit_does_not_wait_for_store_writes(tmp_path):
+    db_path = tmp_path / "nested" / "jobs.sqlite3"
+    store = JobStore(str(db_path))
+    # 构造时不打开 SQLite 文件
+    assert not db_path.parent.exists()
+
+    insert = store.insert
+    gate = threading.Event()
+
+    def _slow_insert(row, payload):
+        gate.wait(timeout=5)
+        insert(row, payload)
+
+    store.insert = _slow_insert
+    queue = JobQueue(store=store)
+    queue.register_handler("zeroshot", _double)
+
+    started = time.perf_counter()
+    record = queue.submit("zeroshot", _double, 1, params={"n": 1})
+    assert time.perf_counter() - started < 1
+    assert queue.get(record.job_id).status == "queued"
+
+    gate.set()
+    queue.flush(timeout=5)
+    assert store.get(record.job_id)["params"] == {"n": 1}
+    assert db_path.exists()
+
+
+def test_async_reads_of_finished_jobs_run_off_the_event_loop():
+    store = JobStore("")
+    reader_threads = []
+    get, counts = store.get, store.counts
+
+    def _get(job_id):
+        reader_threads.append(threading.get_ident())
+        return get(job_id)
+
+    def _counts():
+        reader_threads.append(threading.get_ident())
+        return counts()
+
+    store.get, store.counts = _get, _counts
+
+    async def _scenario():
+        queue = JobQueue(store=store)
+        record = queue.submit("zeroshot", _double, 2)
+        queue.start()
+        try:
+            await _wait_all(queue, [record])
+            reader_threads.clear()
+            loop_thread = threading.get_ident()
+            done = await queue.get_async(record.job_id)
+            cancelled = await queue.cancel_async(record.job_id)
+            missing = await queue.get_async("missing")
+            stats = await queue.stats_async()
+        finally:
+            await queue.stop()
+        return loop_thread, done, cancelled, missing, stats
+
+    loop_thread, done, cancelled, missing, stats = asyncio.run(_scenario())
+    assert done.status == cancelled.status == "succeeded"
+    assert done.result == {"value": 4}
+    assert missing is None
+    assert stats["store"]["jobs_by_status"] == {"succeeded": 1}
+    assert len(reader_threads) == 4
+    assert loop_thread not in reader_threads
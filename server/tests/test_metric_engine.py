@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.forecast_metrics import (  # noqa: E402
+    compute_forecast_metrics,
+    make_holdout_evaluate_fn,
+    share_holdout_predictions,
+)
+from app.services.metric_engine import (  # noqa: E402
+    compute_holdout_metrics,
+    metric_result_keys,
+    seasonal_period,
+)
+from app.services.metrics_helpers import filter_metric_result, split_holdout_frame  # noqa: E402
+from app.services.process import ParsedMarkdownInput  # noqa: E402
+
+
+QUANTILES = [0.1, 0.5, 0.9]
+
+
+def _frames(n_items: int = 6, length: int = 20, horizon: int = 4):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(
+        {
+            "item_id": np.repeat([f"i{k}" for k in range(n_items)], length),
+            "timestamp": np.tile(pd.date_range("2024-01-01", periods=length, freq="D"), n_items),
+            "target": rng.gamma(2.0, 10.0, size=n_items * length),
+        }
+    )
+    train_df, holdout_df = split_holdout_frame(df, horizon)
+    mean = holdout_df["target"].to_numpy() + rng.normal(0, 3, size=len(holdout_df))
+    pred_df = holdout_df[["item_id", "timestamp"]].assign(
+        mean=mean, **{"0.1": mean - 5.0, "0.5": mean, "0.9": mean + 5.0}
+    )
+    # 打乱预测行顺序：对齐不应依赖行序
+    return train_df, holdout_df, pred_df.sample(frac=1.0, random_state=0)
+
+
+def _reference(train_df, holdout_df, pred_df, season_length):
+    merged = holdout_df.merge(pred_df, on=["item_id", "timestamp"])
+    y = merged["target"].to_numpy()
+    denom = np.abs(y).sum()
+    wape = np.abs(y - merged["mean"].to_numpy()).sum() / denom
+    losses = []
+    for q in QUANTILES:
+        yq = merged[f"{q:g}"].to_numpy()
+        losses.append(2.0 * np.abs((yq - y) * ((y <= yq) - q)).sum() / denom)
+    mase = []
+    for item_id, group in merged.groupby("item_id"):
+        hist = train_df[train_df["item_id"] == item_id]["target"].to_numpy()
+        scale = np.abs(hist[season_length:] - hist[:-season_length]).mean()
+        mase.append(np.abs(group["target"] - group["mean"]).mean() / scale)
+    coverage = {f"{q:g}": float((y <= merged[f"{q:g}"]).mean()) for q in QUANTILES}
+    return -wape, -float(np.mean(losses)), -float(np.mean(mase)), coverage
+
+
+def test_matches_reference_implementation():
+    train_df, holdout_df, pred_df = _frames()
+    out = compute_holdout_metrics(
+        holdout_df,
+        pred_df,
+        quantiles=QUANTILES,
+        metrics=["WQL", "WAPE", "MASE", "COVERAGE"],
+        train_df=train_df,
+        season_length=7,
+    )
+    wape, wql, mase, coverage = _reference(train_df, holdout_df, pred_df, 7)
+    assert out["WAPE"] == pytest.approx(wape)
+    assert out["WQL"] == pytest.approx(wql)
+    assert out["MASE"] == pytest.approx(mase)
+    assert out["COVERAGE"] == pytest.approx(coverage)
+
+
+def test_breakdowns_by_item_and_horizon():
+    train_df, holdout_df, pred_df = _frames(horizon=4)
+    out = compute_holdout_metrics(holdout_df, pred_df, quantiles=QUANTILES, metrics=["WAPE", "WQL"])
+    assert len(out["WAPE_by_horizon"]) == 4
+    assert sorted(out["WQL_by_item"]) == [f"i{k}" for k in range(6)]
+
+    one_item = holdout_df[holdout_df["item_id"] == "i2"]
+    single = compute_holdout_metrics(one_item, pred_df, quantiles=QUANTILES, metrics=["WAPE"])
+    assert out["WAPE_by_item"]["i2"] == pytest.approx(single["WAPE"])
+
+    first_step = holdout_df.groupby("item_id").head(1)
+    step0 = compute_holdout_metrics(first_step, pred_df, quantiles=QUANTILES, metrics=["WAPE"])
+    assert out["WAPE_by_horizon"][0] == pytest.approx(step0["WAPE"])
+
+    no_items = compute_holdout_metrics(holdout_df, pred_df, quantiles=QUANTILES, metrics=["WAPE"], by_item=False)
+    assert "WAPE_by_item" not in no_items
+
+
+def test_result_feeds_filter_metric_result():
+    train_df, holdout_df, pred_df = _frames()
+    out = compute_holdout_metrics(
+        holdout_df, pred_df, quantiles=QUANTILES, metrics=["WQL", "WAPE", "MASE"], train_df=train_df
+    )
+    filtered = filter_metric_result(out, metric_result_keys(["WQL"]))
+    assert set(filtered) == {"WQL", "WQL_by_horizon", "WQL_by_item"}
+
+
+def test_seasonal_period():
+    assert seasonal_period("D") == 7
+    assert seasonal_period("h") == 24
+    assert seasonal_period("2h") == 12
+    assert seasonal_period("ME") == 12
+    assert seasonal_period("W") == 1
+    assert seasonal_period(None) == 1
+
+
+def _counting_predict(calls, horizon):
+    def _predict(train_df, known_cov_df):
+        calls.append(len(train_df))
+        last = train_df.sort_values(["item_id", "timestamp"]).groupby("item_id").tail(1)
+        rows = []
+        for row in last.itertuples(index=False):
+            for step in range(1, horizon + 1):
+                value = row.target + step
+                rows.append(
+                    {
+                        "item_id": row.item_id,
+                        "timestamp": row.timestamp + pd.Timedelta(days=step),
+                        "mean": value,
+                        "0.1": value - 5.0,
+                        "0.5": value,
+                        "0.9": value + 5.0,
+                    }
+                )
+        return pd.DataFrame(rows)
+
+    return _predict
+
+
+def _forecast_metrics(predict_fn, history_df, horizon):
+    parsed = ParsedMarkdownInput(
+        history_df=history_df,
+        future_cov_df=None,
+        test_df=None,
+        freq="D",
+        known_covariates_names=[],
+        category_covariates_names=[],
+    )
+    return compute_forecast_metrics(
+        parsed=parsed,
+        metrics=["WQL", "WAPE", "MASE", "COVERAGE", "IC", "IR"],
+        prediction_length=horizon,
+        with_cov=False,
+        evaluate_fn=make_holdout_evaluate_fn(predict_fn, prediction_length=horizon, quantiles=QUANTILES, freq="D"),
+        predict_fn=predict_fn,
+    )
+
+
+def test_all_metrics_share_one_holdout_prediction():
+    train_df, holdout_df, _ = _frames(horizon=4)
+    history_df = pd.concat([train_df, holdout_df]).sort_values(["item_id", "timestamp"]).reset_index(drop=True)
+
+    calls = []
+    unshared = _forecast_metrics(_counting_predict(calls, 4), history_df, 4)
+    assert len(calls) == 2
+
+    calls.clear()
+    shared_fn = share_holdout_predictions(_counting_predict(calls, 4), prediction_length=4)
+    shared = _forecast_metrics(shared_fn, history_df, 4)
+    assert len(calls) == 1
+    assert shared == unshared
+
+
+def test_validation_predictions_replace_holdout_predict():
+    train_df, holdout_df, _ = _frames(horizon=4)
+    history_df = pd.concat([train_df, holdout_df]).sort_values(["item_id", "timestamp"]).reset_index(drop=True)
+    validation_pred_df = _counting_predict([], 4)(train_df, None)
+
+    calls = []
+    shared_fn = share_holdout_predictions(
+        _counting_predict(calls, 4),
+        prediction_length=4,
+        history_df=history_df,
+        validation_pred_df=validation_pred_df,
+    )
+    out = _forecast_metrics(shared_fn, history_df, 4)
+    assert calls == []
+    assert {"WQL", "WAPE", "MASE", "COVERAGE", "IC", "IR"}.issubset(out)
+
+    # 与 holdout 不对应的验证预测（时间戳错位）不应被采用
+    shifted = validation_pred_df.assign(timestamp=validation_pred_df["timestamp"] + pd.Timedelta(days=1))
+    shared_fn = share_holdout_predictions(
+        _counting_predict(calls, 4),
+        prediction_length=4,
+        history_df=history_df,
+        validation_pred_df=shifted,
+    )
+    _forecast_metrics(shared_fn, history_df, 4)
+    assert len(calls) == 1
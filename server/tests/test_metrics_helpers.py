@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.metrics_helpers import (  # noqa: E402
+    replace_pred_timestamps_with_future,
+    replace_pred_timestamps_with_holdout,
+)
+from factories import make_timestamp_frames  # noqa: E402
+from legacy_impls import (  # noqa: E402
+    legacy_replace_pred_timestamps_with_future,
+    legacy_replace_pred_timestamps_with_holdout,
+)
+
+
+def _assert_same(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    assert str(actual["timestamp"].dtype) == str(expected["timestamp"].dtype)
+
+
+@pytest.mark.parametrize("freq", ["D", "h", "W", "ME", "MS", "B"])
+def test_future_timestamps_match_legacy(freq):
+    frames = make_timestamp_frames(items=5, steps=4, history=9, freq=freq)
+    history = frames["history"]
+    # 一个 item 没有历史（保持原时间戳），一个 item 的历史末尾不在锚点上，预测比 prediction_length 多一行
+    history = history[history["item_id"] != "item_00004"].copy()
+    history.loc[history.index[8], "timestamp"] += pd.Timedelta(hours=5)
+    pred = pd.concat([frames["pred"], frames["pred"].tail(1).assign(timestamp=pd.Timestamp("2030-01-01"))])
+    pred["item_id"] = pred["item_id"].astype(object)
+
+    expected = legacy_replace_pred_timestamps_with_future(pred, history, prediction_length=3, freq=freq)
+    actual = replace_pred_timestamps_with_future(pred, history, prediction_length=3, freq=freq)
+    _assert_same(actual, expected)
+
+
+def test_future_timestamps_keep_timezone_and_numeric_ids():
+    history = pd.DataFrame(
+        {
+            "item_id": [1, 1, 2, 2],
+            "timestamp": pd.to_datetime(["2024-03-09", "2024-03-10", "2024-03-09", "2024-03-11"]).tz_localize(
+                "America/New_York"
+            ),
+        }
+    )
+    pred = pd.DataFrame({"item_id": [1, 1, 2, 2], "timestamp": ["2000-01-01", "2000-01-02"] * 2, "mean": range(4)})
+    expected = legacy_replace_pred_timestamps_with_future(pred, history, prediction_length=2, freq="h")
+    actual = replace_pred_timestamps_with_future(pred, history, prediction_length=2, freq="h")
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_holdout_timestamps_match_legacy():
+    frames = make_timestamp_frames(items=4, steps=5, history=12)
+    holdout = frames["holdout"]
+    # item_00001 的 holdout 比预测短；item_00003 没有 holdout（预测行被丢弃）
+    holdout = holdout.drop(holdout[holdout["item_id"] == "item_00001"].index[:2])
+    holdout = holdout[holdout["item_id"] != "item_00003"]
+    pred = frames["pred"].sample(frac=1.0, random_state=0)
+
+    expected = legacy_replace_pred_timestamps_with_holdout(pred, holdout)
+    actual = replace_pred_timestamps_with_holdout(pred, holdout)
+    _assert_same(actual, expected)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services import model_cache  # noqa: E402
+from app.services.model_cache import PredictorCache  # noqa: E402
+
+
+def _patch_loader(monkeypatch, sizes):
+    calls = []
+
+    def _fake_load(model_id):
+        calls.append(model_id)
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setattr(model_cache, "_load_predictor_from_disk", _fake_load)
+    monkeypatch.setattr(model_cache, "_dir_size_bytes", lambda path: sizes[path.name])
+    return calls
+
+
+def test_concurrent_requests_share_one_load(monkeypatch):
+    calls = _patch_loader(monkeypatch, {"m1": 10})
+    cache = PredictorCache(max_bytes=100, max_entries=4)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("m1").predictor)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ["m1"]
+    assert len({id(p) for p in results}) == 1
+
+
+def test_lru_eviction_skips_pinned(monkeypatch):
+    _patch_loader(monkeypatch, {"a": 40, "b": 40, "c": 40})
+    cache = PredictorCache(max_bytes=100, max_entries=10)
+
+    cache.pin("a")
+    cache.get("b")
+    cache.get("c")
+
+    resident = [e["model_id"] for e in cache.stats()["entries"]]
+    assert sorted(resident) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+    cache.unpin("a")
+    cache.get("b")
+    resident = [e["model_id"] for e in cache.stats()["entries"]]
+    assert sorted(resident) == ["b", "c"]
+
+
+def test_lease_sets_quantiles_on_a_copy(monkeypatch):
+    class _Predictor:
+        quantile_levels = [0.1, 0.5, 0.9]
+
+    shared = _Predictor()
+    monkeypatch.setattr(model_cache, "_load_predictor_from_disk", lambda model_id: shared)
+    monkeypatch.setattr(model_cache, "_dir_size_bytes", lambda path: 1)
+    cache = PredictorCache(max_bytes=100, max_entries=4)
+
+    # 同一 model_id 的两个租用可以同时持有，各自的 quantiles 互不影响
+    with cache.lease("m1", quantiles=[0.2]) as first, cache.lease("m1", quantiles=[0.8]) as second:
+        assert first.quantile_levels == [0.2]
+        assert second.quantile_levels == [0.8]
+    assert shared.quantile_levels == [0.1, 0.5, 0.9]
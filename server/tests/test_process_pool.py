@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.job_context import JobCancelled, JobContext, report_stage  # noqa: E402
+from app.services.process_pool import ProcessWorkerPool, WorkerJobError  # noqa: E402
+
+
+def _pid_job(value):
+    report_stage("working")
+    return {"pid": os.getpid(), "value": value}
+
+
+def _failing_job():
+    raise ValueError("boom")
+
+
+def _sleepy_job():
+    time.sleep(60)
+
+
+def test_runs_in_worker_and_recycles_after_max_jobs():
+    pool = ProcessWorkerPool(max_workers=1, max_jobs_per_worker=2)
+    try:
+        first = pool.run(_pid_job, (1,), {}, JobContext("a"))
+        second = pool.run(_pid_job, (2,), {}, JobContext("b"))
+        third = pool.run(_pid_job, (3,), {}, JobContext("c"))
+        with pytest.raises(WorkerJobError) as exc_info:
+            pool.run(_failing_job, (), {}, JobContext("d"))
+    finally:
+        pool.shutdown()
+
+    assert first["pid"] != os.getpid()
+    assert first["pid"] == second["pid"]
+    assert third["pid"] != second["pid"]
+    assert third["value"] == 3
+    assert "ValueError: boom" in (exc_info.value.remote_trace or "")
+    assert pool.recycled == 2
+
+
+def test_timeout_terminates_worker_process():
+    pool = ProcessWorkerPool(max_workers=1)
+    started = time.monotonic()
+    try:
+        with pytest.raises(JobCancelled) as exc_info:
+            pool.run(_sleepy_job, (), {}, JobContext("slow", timeout_seconds=1.0))
+    finally:
+        pool.shutdown()
+    assert exc_info.value.reason == "timed_out"
+    assert time.monotonic() - started < 15
+    assert pool.killed == 1
+
+
+def test_job_queue_drops_kinds_that_cannot_run_in_workers(caplog):
+    from app.services.job_queue import JobQueue
+    from app.services.zero_shot_forecast import zeroshot_forecast_from_upload
+
+    pool = ProcessWorkerPool(max_workers=1)
+    with caplog.at_level("WARNING", logger="app.services.job_queue"):
+        queue = JobQueue(process_pool=pool, process_kinds=["finetune", "zeroshot", "metrics"])
+    assert queue.process_kinds == {"finetune", "zeroshot"}
+    assert "metrics" in caplog.text
+    # zeroshot 任务（模块级函数 + bytes 内容）可以发送到工作进程
+    pickle.dumps((zeroshot_forecast_from_upload, (b"```json\n{}\n```",), {"prediction_length": 2}))
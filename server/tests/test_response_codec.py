@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from starlette.requests import Request
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services import response_codec  # noqa: E402
+from app.services.forecast_output import format_predictions  # noqa: E402
+from app.services.response_codec import (  # noqa: E402
+    METADATA_KEY,
+    encode_result_table,
+    json_response,
+    negotiate_encoding,
+    negotiate_result_format,
+    predictions_frame,
+)
+from factories import make_prediction_frame  # noqa: E402
+
+
+def _request(**headers: str) -> Request:
+    raw = [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_negotiate_result_format_by_q_value():
+    assert negotiate_result_format(None) == "json"
+    assert negotiate_result_format("*/*") == "json"
+    assert negotiate_result_format("application/vnd.apache.arrow.stream") == "arrow"
+    assert negotiate_result_format("application/x-parquet, application/json;q=0.5") == "parquet"
+    assert negotiate_result_format("application/vnd.apache.parquet;q=0.2, application/json") == "json"
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_encode_result_table_round_trip(fmt):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+
+    pred_df = make_prediction_frame(5, 3, [0.1, 0.5, 0.9])
+    data = encode_result_table(pred_df, {"metrics": {"WQL": 0.1}}, fmt=fmt)
+
+    if fmt == "parquet":
+        table = pyarrow.parquet.read_table(pa.BufferReader(data))
+    else:
+        table = pyarrow.ipc.open_stream(data).read_all()
+    assert json.loads(table.schema.metadata[METADATA_KEY]) == {"metrics": {"WQL": 0.1}}
+    out = table.to_pandas()
+    assert pd.api.types.is_datetime64_any_dtype(out["timestamp"])
+    assert out["item_id"].tolist() == pred_df["item_id"].tolist()
+    assert out["mean"].tolist() == pred_df["mean"].tolist()
+
+
+def test_predictions_frame_expands_columnar():
+    pred_df = make_prediction_frame(4, 5, [0.1, 0.5, 0.9])
+    columnar = format_predictions(pred_df, output_format="columnar", freq="h")
+
+    out = predictions_frame(columnar)
+    assert out["item_id"].tolist() == pred_df["item_id"].tolist()
+    assert out["timestamp"].astype(str).tolist() == pred_df["timestamp"].tolist()
+    assert out["0.5"].tolist() == pred_df["0.5"].tolist()
+
+
+def test_json_response_compresses_large_bodies(monkeypatch):
+    body = {"predictions": format_predictions(make_prediction_frame(50, 10, [0.5]))}
+    assert asyncio.run(json_response(_request(), body)) is body
+
+    # 编码与压缩在线程池中执行，不占用事件循环线程
+    encode_threads = []
+    json_bytes = response_codec._json_bytes
+
+    def _recording_json_bytes(value):
+        encode_threads.append(threading.get_ident())
+        return json_bytes(value)
+
+    monkeypatch.setattr(response_codec, "_json_bytes", _recording_json_bytes)
+
+    async def _encode(request, value):
+        return threading.get_ident(), await json_response(request, value)
+
+    loop_thread, response = asyncio.run(_encode(_request(accept_encoding="gzip"), body))
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(response.body))["predictions"]) == 500
+    assert encode_threads and loop_thread not in encode_threads
+
+    small = asyncio.run(json_response(_request(accept_encoding="gzip"), {"ok": True}))
+    assert "content-encoding" not in small.headers
+    assert json.loads(small.body) == {"ok": True}
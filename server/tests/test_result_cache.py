@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.process import ParsedMarkdownInput  # noqa: E402
+from app.services.result_cache import (  # noqa: E402
+    ForecastResultCache,
+    cached_forecast_result,
+    forecast_cache_key,
+)
+
+
+def _parsed(target_offset: float = 0.0) -> ParsedMarkdownInput:
+    history = pd.DataFrame(
+        {
+            "item_id": ["a"] * 5 + ["b"] * 5,
+            "timestamp": list(pd.date_range("2024-01-01", periods=5, freq="D")) * 2,
+            "target": [float(i) + target_offset for i in range(10)],
+        }
+    )
+    return ParsedMarkdownInput(
+        history_df=history,
+        future_cov_df=None,
+        test_df=None,
+        freq="D",
+        known_covariates_names=[],
+        category_covariates_names=[],
+    )
+
+
+def _key(parsed: ParsedMarkdownInput, **overrides) -> str:
+    params = dict(prediction_length=2, quantiles=[0.1, 0.5, 0.9], metrics=["WQL"], with_cov=False, context_length=5)
+    params.update(overrides)
+    return forecast_cache_key("zeroshot", parsed, **params)
+
+
+def _pred_df(rows: int = 4) -> pd.DataFrame:
+    return pd.DataFrame({"item_id": ["a"] * rows, "timestamp": ["2024-01-06"] * rows, "mean": [1.0] * rows})
+
+
+def test_cache_key_depends_on_data_and_params():
+    assert _key(_parsed()) == _key(_parsed())
+    assert _key(_parsed()) != _key(_parsed(target_offset=1.0))
+    assert _key(_parsed()) != _key(_parsed(), prediction_length=3)
+    assert _key(_parsed()) != _key(_parsed(), quantiles=[0.5])
+    assert _key(_parsed()) != _key(_parsed(), context_length=4)
+    assert _key(_parsed()) != _key(_parsed(), model_id="m1")
+
+
+def test_lru_eviction_and_ttl():
+    cache = ForecastResultCache(max_bytes=10**9, max_entries=2, ttl_seconds=60)
+    for key in ("k1", "k2"):
+        cache.put(key, _pred_df(), {"WQL": 0.1}, {"model_used": "m"})
+    assert cache.get("k1") is not None
+    cache.put("k3", _pred_df(), None)
+    assert cache.get("k2") is None
+    assert cache.get("k1") is not None and cache.get("k3") is not None
+    assert cache.stats()["evictions"] == 1
+
+    cache.ttl_seconds = 0.01
+    time.sleep(0.02)
+    assert cache.get("k1") is None
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    cache = ForecastResultCache(max_bytes=10**9, max_entries=8, ttl_seconds=60, disk_dir=str(tmp_path))
+    cache.put("k1", _pred_df(), {"WQL": 0.1}, {"model_used": "m"})
+
+    restarted = ForecastResultCache(max_bytes=10**9, max_entries=8, ttl_seconds=60, disk_dir=str(tmp_path))
+    entry = restarted.get("k1")
+    assert entry is not None
+    assert entry.pred_df.equals(_pred_df())
+    assert restarted.stats()["disk_hits"] == 1
+
+    result = cached_forecast_result(
+        entry, freq="D", prediction_length=2, quantiles=[0.5], output_format="records"
+    )
+    assert result["cached"] is True
+    assert result["model_used"] == "m"
+    assert result["metrics"] == {"WQL": 0.1}
+    assert len(result["predictions"]) == 4
+
+    assert restarted.clear() == 2
+    assert ForecastResultCache(max_bytes=0, max_entries=0, ttl_seconds=60, disk_dir=str(tmp_path)).get("k1") is None
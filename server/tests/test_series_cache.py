@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.series_cache import SeriesForecastCache  # noqa: E402
+
+
+def _history(n_items: int = 5, length: int = 12) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "item_id": np.repeat([f"s{i}" for i in range(n_items)], length),
+            "timestamp": np.tile(pd.date_range("2024-01-01", periods=length, freq="D"), n_items),
+            "target": rng.normal(size=n_items * length),
+        }
+    )
+
+
+def _fake_predict(calls):
+    def _predict(history_df, future_cov_df):
+        calls.append(sorted(history_df["item_id"].astype(str).unique()))
+        last = history_df.sort_values(["item_id", "timestamp"]).groupby("item_id").tail(1)
+        rows = []
+        for row in last.itertuples(index=False):
+            for step in range(1, 3):
+                rows.append(
+                    {
+                        "item_id": str(row.item_id),
+                        "timestamp": row.timestamp + pd.Timedelta(days=step),
+                        "mean": row.target * step,
+                        "0.5": row.target * step + 0.5,
+                    }
+                )
+        return pd.DataFrame(rows)
+
+    return _predict
+
+
+def _predict(cache, predict_fn, history):
+    return cache.predict(
+        predict_fn, history, None, prediction_length=2, quantiles=[0.5], context_length=8, freq="D"
+    )
+
+
+def test_only_changed_series_are_predicted():
+    calls = []
+    predict_fn = _fake_predict(calls)
+    cache = SeriesForecastCache(max_bytes=10**8, max_entries=1000, ttl_seconds=60)
+
+    history = _history()
+    first = _predict(cache, predict_fn, history)
+    assert calls == [[f"s{i}" for i in range(5)]]
+
+    changed = history.copy()
+    changed.loc[changed["item_id"] == "s3", "target"] += 1.0
+    second = _predict(cache, predict_fn, changed)
+    assert calls[-1] == ["s3"]
+
+    expected = _fake_predict([])(changed, None)
+    pd.testing.assert_frame_equal(second.reset_index(drop=True), expected, check_dtype=False)
+    assert not second["mean"].equals(first["mean"])
+    assert cache.stats()["hits"] == 4
+
+
+def test_context_window_outside_history_does_not_change_key():
+    calls = []
+    predict_fn = _fake_predict(calls)
+    cache = SeriesForecastCache(max_bytes=10**8, max_entries=1000, ttl_seconds=60)
+
+    history = _history(n_items=2)
+    _predict(cache, predict_fn, history)
+    # 只改动早于最后 context_length 个点的数据：送入模型的窗口不变，应全部命中
+    older = history.copy()
+    older.loc[older.groupby("item_id").cumcount() == 0, "target"] = 99.0
+    _predict(cache, predict_fn, older)
+    assert len(calls) == 1
+
+
+def test_disabled_cache_passes_through():
+    calls = []
+    cache = SeriesForecastCache(max_bytes=0, max_entries=0, ttl_seconds=60)
+    _predict(cache, _fake_predict(calls), _history(n_items=2))
+    _predict(cache, _fake_predict(calls), _history(n_items=2))
+    assert len(calls) == 2
+
+
+def test_hits_keep_item_id_dtype_and_ignore_request_context_length():
+    calls = []
+    predict_fn = _fake_predict(calls)
+    cache = SeriesForecastCache(max_bytes=10**8, max_entries=1000, ttl_seconds=60)
+
+    history = _history(n_items=3, length=6)
+    history["item_id"] = history["item_id"].str[1:].astype(int)
+    first = _predict(cache, predict_fn, history)
+    # context_length 变化但每条序列送入模型的窗口不变（序列比两者都短）：全部命中
+    second = cache.predict(
+        predict_fn, history, None, prediction_length=2, quantiles=[0.5], context_length=16, freq="D"
+    )
+
+    assert len(calls) == 1
+    assert first["item_id"].dtype == history["item_id"].dtype
+    assert second["item_id"].tolist() == first["item_id"].tolist()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import io
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.core.exceptions import DataException  # noqa: E402
+from app.services.process import _normalize_id_key, parse_markdown_bytes, records_to_frame  # noqa: E402
+from app.services.stream_parser import parse_markdown_stream  # noqa: E402
+
+
+LIMITS = dict(max_series=10, max_points_per_series=50, max_prediction_length=20, max_upload_bytes=1 << 20)
+
+
+def _markdown(payload) -> bytes:
+    return ("# 输入说明\n\n```JSON\n" + json.dumps(payload, ensure_ascii=False, indent=2) + "\n```\n").encode("utf-8")
+
+
+def _payload():
+    dates = pd.date_range("2024-01-01", periods=12, freq="D")
+    history = []
+    for item in ("a", "b"):
+        for i, ts in enumerate(dates[:10]):
+            rec = {"id": item} if item == "b" else {}
+            rec.update({"timestamp": str(ts.date()), "target": float(i) * 1.5e-3, "promo": i % 2, "store": "x" if i else "y"})
+            if item == "a":
+                rec["item_id"] = item
+            history.append(rec)
+    covariates = [
+        {"item_id": item, "timestamp": str(ts.date()), "promo": 1, "store": "x"}
+        for item in ("a", "b")
+        for ts in dates[10:]
+    ]
+    return {
+        "freq": "D",
+        "known_covariates_names": ["promo", "store"],
+        "category_cov_name": ["store"],
+        "history_data": history,
+        "covariates": covariates,
+    }
+
+
+@pytest.mark.parametrize("with_cov", [True, False])
+@pytest.mark.parametrize("chunk_size", [7, 4096])
+def test_stream_matches_bytes_parser(with_cov, chunk_size):
+    content = _markdown(_payload())
+    kwargs = dict(prediction_length=2, with_cov=with_cov, freq_override=None, **LIMITS)
+    expected = parse_markdown_bytes(content, **kwargs)
+    actual = parse_markdown_stream(io.BytesIO(content), chunk_size=chunk_size, **kwargs)
+
+    pd.testing.assert_frame_equal(actual.history_df, expected.history_df)
+    if with_cov:
+        pd.testing.assert_frame_equal(actual.future_cov_df, expected.future_cov_df)
+    else:
+        assert actual.future_cov_df is None
+    assert actual.freq == expected.freq
+    assert actual.known_covariates_names == expected.known_covariates_names
+    assert actual.category_covariates_names == expected.category_covariates_names
+
+
+def test_stream_survives_buffer_compaction(monkeypatch):
+    # 缓冲区截断发生在最后一次读（EOF）时，已解析值的偏移量不能沿用截断前的位置
+    from app.services import stream_parser
+
+    monkeypatch.setattr(stream_parser, "_COMPACT_THRESHOLD", 16)
+    content = _markdown(_payload())
+    kwargs = dict(prediction_length=2, with_cov=True, freq_override=None, **LIMITS)
+    expected = parse_markdown_bytes(content, **kwargs)
+    for chunk_size in (5, 64, 1000):
+        actual = parse_markdown_stream(io.BytesIO(content), chunk_size=chunk_size, **kwargs)
+        pd.testing.assert_frame_equal(actual.history_df, expected.history_df)
+        pd.testing.assert_frame_equal(actual.future_cov_df, expected.future_cov_df)
+
+
+class _GuardedStream(io.BytesIO):
+    def __init__(self, data: bytes, limit: int) -> None:
+        super().__init__(data)
+        self.limit = limit
+
+    def read(self, size=-1):
+        assert self.tell() < self.limit, "stream was read past the rejection point"
+        return super().read(size)
+
+
+def test_rejects_too_many_series_before_reading_whole_upload():
+    history = [{"item_id": str(i), "timestamp": "2024-01-01", "target": 1.0} for i in range(2000)]
+    content = _markdown({"freq": "D", "history_data": history})
+    stream = _GuardedStream(content, limit=len(content) // 2)
+    with pytest.raises(DataException) as exc_info:
+        parse_markdown_stream(stream, prediction_length=1, with_cov=False, freq_override=None, chunk_size=1024, **LIMITS)
+    assert exc_info.value.message == "序列数量超过服务限制"
+
+
+@pytest.mark.parametrize(
+    "records",
+    [
+        [{"id": "a", "timestamp": "2024-01-01", "target": 1}, {"id": "b", "timestamp": "2024-01-02", "target": 2.5}],
+        [{"item_id": "a", "target": 1.0}, {"id": "b", "target": 2.0, "extra": "x"}],
+    ],
+)
+def test_records_to_frame_matches_list_of_dicts(records):
+    expected = pd.DataFrame(_normalize_id_key([dict(r) for r in records]))
+    pd.testing.assert_frame_equal(records_to_frame(records), expected)
+
+
+def _series_payload(payload):
+    # 与 _payload 等价的按序列紧凑格式：a 用 start + freq，b 用显式 timestamp 数组
+    def _blocks(records, explicit_for, broadcast):
+        out = []
+        for item in ("a", "b"):
+            rows = [r for r in records if r.get("item_id", r.get("id")) == item]
+            block = {"item_id": item}
+            if item == explicit_for:
+                block["timestamp"] = [r["timestamp"] for r in rows]
+            else:
+                block["start"] = rows[0]["timestamp"]
+            for key in rows[0]:
+                if key not in {"item_id", "id", "timestamp"}:
+                    values = [r[key] for r in rows]
+                    block[key] = values[0] if key == broadcast and len(set(values)) == 1 else values
+            out.append(block)
+        return out
+
+    compact = dict(payload)
+    compact["history_data"] = _blocks(payload["history_data"], explicit_for="b", broadcast=None)
+    compact["covariates"] = _blocks(payload["covariates"], explicit_for=None, broadcast="store")
+    return compact
+
+
+@pytest.mark.parametrize("chunk_size", [7, 4096])
+def test_series_format_matches_record_format(chunk_size):
+    payload = _payload()
+    kwargs = dict(prediction_length=2, with_cov=True, freq_override=None, **LIMITS)
+    expected = parse_markdown_bytes(_markdown(payload), **kwargs)
+
+    content = _markdown(_series_payload(payload))
+    for actual in (
+        parse_markdown_bytes(content, **kwargs),
+        parse_markdown_stream(io.BytesIO(content), chunk_size=chunk_size, **kwargs),
+    ):
+        pd.testing.assert_frame_equal(actual.history_df, expected.history_df, check_like=True)
+        pd.testing.assert_frame_equal(actual.future_cov_df, expected.future_cov_df, check_like=True)
+        assert actual.freq == expected.freq
+
+
+def test_series_format_rejects_ragged_arrays():
+    history = [{"item_id": "a", "start": "2024-01-01", "target": [1.0, 2.0, 3.0], "promo": [1, 0]}]
+    with pytest.raises(DataException) as exc_info:
+        parse_markdown_bytes(
+            _markdown({"freq": "D", "history_data": history}),
+            prediction_length=1,
+            with_cov=False,
+            freq_override=None,
+            **LIMITS,
+        )
+    assert exc_info.value.details["column"] == "promo"
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import importlib.util
+import io
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.core.exceptions import DataException  # noqa: E402
+from app.services.process import parse_markdown_bytes  # noqa: E402
+from app.services.table_parser import detect_upload_format, parse_upload  # noqa: E402
+
+
+requires_pyarrow = pytest.mark.skipif(importlib.util.find_spec("pyarrow") is None, reason="pyarrow not installed")
+LIMITS = dict(max_series=10, max_points_per_series=50, max_prediction_length=20, max_upload_bytes=1 << 20)
+
+
+def _frames():
+    dates = pd.date_range("2024-01-01", periods=12, freq="D")
+    history = pd.DataFrame(
+        [
+            {"item_id": item, "timestamp": str(ts.date()), "target": float(i), "promo": i % 2, "store": "xy"[i % 2]}
+            for item in ("a", "b")
+            for i, ts in enumerate(dates[:10])
+        ]
+    )
+    covariates = pd.DataFrame(
+        [
+            {"item_id": item, "timestamp": str(ts.date()), "promo": 1, "store": "x"}
+            for item in ("a", "b")
+            for ts in dates[10:]
+        ]
+    )
+    return history, covariates
+
+
+def _markdown(history: pd.DataFrame, covariates: pd.DataFrame) -> bytes:
+    payload = {
+        "known_covariates_names": ["promo", "store"],
+        "category_cov_name": ["store"],
+        "history_data": history.to_dict(orient="records"),
+        "covariates": covariates.to_dict(orient="records"),
+    }
+    return ("```json\n" + json.dumps(payload) + "\n```\n").encode("utf-8")
+
+
+def _csv(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def _parquet(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.assign(timestamp=pd.to_datetime(df["timestamp"])).to_parquet(buf, index=False)
+    return buf.getvalue()
+
+
+def _arrow(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.assign(timestamp=pd.to_datetime(df["timestamp"])).to_feather(buf)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize(
+    "fmt,encode",
+    [
+        ("csv", _csv),
+        pytest.param("parquet", _parquet, marks=requires_pyarrow),
+        pytest.param("arrow", _arrow, marks=requires_pyarrow),
+    ],
+)
+def test_table_upload_matches_markdown(fmt, encode):
+    history, covariates = _frames()
+    kwargs = dict(prediction_length=2, with_cov=True, freq_override=None, **LIMITS)
+    expected = parse_markdown_bytes(_markdown(history, covariates), **kwargs)
+
+    actual = parse_upload(
+        io.BytesIO(encode(history)),
+        input_format=fmt,
+        covariates_source=encode(covariates),
+        known_covariates_names=["promo", "store"],
+        category_cov_name=["store"],
+        **kwargs,
+    )
+
+    pd.testing.assert_frame_equal(actual.history_df, expected.history_df)
+    pd.testing.assert_frame_equal(actual.future_cov_df, expected.future_cov_df)
+    assert actual.freq == expected.freq
+    assert actual.known_covariates_names == expected.known_covariates_names
+    assert actual.category_covariates_names == expected.category_covariates_names
+
+
+def test_rejects_unknown_format_and_oversized_parts():
+    assert detect_upload_format("input.PARQUET") == "parquet"
+    with pytest.raises(DataException):
+        detect_upload_format("input.xlsx")
+
+    history, covariates = _frames()
+    limits = dict(LIMITS, max_upload_bytes=len(_csv(history)) + 10)
+    with pytest.raises(DataException) as exc:
+        parse_upload(
+            _csv(history),
+            input_format="csv",
+            covariates_source=_csv(covariates),
+            prediction_length=2,
+            with_cov=True,
+            freq_override=None,
+            **limits,
+        )
+    assert exc.value.message == "上传文件超过大小限制"
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services.inference_executor import InferenceExecutor  # noqa: E402
+from app.services.zero_shot_batcher import ZeroShotMicroBatcher  # noqa: E402
+
+
+class _FakeEngine:
+    """
+    每条序列预测为最后一个观测值；target 含 NaN 的输入整体报错。
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = []
+
+    def predict(self, history_df, *, prediction_length, quantiles, context_length, future_cov_df=None):
+        self.calls.append({"history": history_df.copy(), "context_length": context_length})
+        if self.fail or history_df["target"].isna().any():
+            raise ValueError("bad input")
+        last = history_df.sort_values(["item_id", "timestamp"]).groupby("item_id", sort=False).tail(1)
+        return pd.DataFrame(
+            {
+                "item_id": last["item_id"].to_numpy(),
+                "timestamp": last["timestamp"].to_numpy() + pd.Timedelta(days=1),
+                "mean": last["target"].to_numpy(),
+            }
+        )
+
+
+def _history(item_id, values):
+    return pd.DataFrame(
+        {
+            "item_id": [item_id] * len(values),
+            "timestamp": pd.date_range("2024-01-01", periods=len(values), freq="D"),
+            "target": values,
+        }
+    )
+
+
+def _predict_concurrently(batcher, engine, requests):
+    results = [None] * len(requests)
+
+    def _call(idx, history, context_length):
+        try:
+            results[idx] = batcher.predict(
+                engine, history, prediction_length=1, quantiles=[0.5], context_length=context_length, freq="D"
+            )
+        except Exception as exc:
+            results[idx] = exc
+
+    threads = []
+    for idx, (history, context_length) in enumerate(requests):
+        threads.append(threading.Thread(target=_call, args=(idx, history, context_length)))
+        threads[-1].start()
+        time.sleep(0.02)
+    for t in threads:
+        t.join(timeout=10)
+    return results
+
+
+def test_batch_splits_results_per_request_with_same_item_id():
+    engine = _FakeEngine()
+    batcher = ZeroShotMicroBatcher(window_ms=5000, max_series=2)
+
+    started = time.perf_counter()
+    results = _predict_concurrently(
+        batcher, engine, [(_history("a", [1.0, 2.0, 3.0]), 2), (_history("a", [7.0, 8.0, 9.0]), 3)]
+    )
+
+    # 序列数达到 max_series 立即执行，不等窗口结束
+    assert time.perf_counter() - started < 2
+    assert len(engine.calls) == 1
+    merged = engine.calls[0]["history"]
+    assert merged.groupby("item_id").size().to_dict() == {"0\x1fa": 2, "1\x1fa": 3}
+    assert [r["item_id"].tolist() for r in results] == [["a"], ["a"]]
+    assert [r["mean"].tolist() for r in results] == [[3.0], [9.0]]
+    assert batcher.batched_requests == 2
+
+
+def test_failed_batch_retries_each_request():
+    engine = _FakeEngine()
+    batcher = ZeroShotMicroBatcher(window_ms=5000, max_series=2)
+
+    good, bad = _predict_concurrently(
+        batcher, engine, [(_history("a", [1.0, 2.0]), 8), (_history("b", [1.0, float("nan")]), 8)]
+    )
+
+    assert good["mean"].tolist() == [2.0]
+    assert isinstance(bad, ValueError)
+    assert len(engine.calls) == 3
+
+
+def test_exception_reaches_every_caller():
+    engine = _FakeEngine(fail=True)
+    batcher = ZeroShotMicroBatcher(window_ms=5000, max_series=2)
+
+    results = _predict_concurrently(batcher, engine, [(_history("a", [1.0]), 8), (_history("b", [2.0]), 8)])
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_single_request_goes_straight_to_engine():
+    engine = _FakeEngine()
+    batcher = ZeroShotMicroBatcher(window_ms=0, max_series=100)
+    history = pd.DataFrame(
+        {"item_id": [1, 1], "timestamp": pd.date_range("2024-01-01", periods=2, freq="D"), "target": [1.0, 5.0]}
+    )
+
+    pred = batcher.predict(engine, history, prediction_length=1, quantiles=[0.5], context_length=4, freq="D")
+
+    assert engine.calls[0]["context_length"] == 4
+    assert engine.calls[0]["history"]["item_id"].tolist() == [1, 1]
+    assert pred["mean"].tolist() == [5.0]
+    assert batcher.batches == 0
+
+
+def test_waiting_requests_do_not_hold_executor_slots():
+    engine = _FakeEngine()
+    batcher = ZeroShotMicroBatcher(window_ms=5000, max_series=3)
+    # 只有一个运行名额：leader 等待窗口时若不让出名额，其余请求无法进入同一批
+    executor = InferenceExecutor(max_concurrency=1, max_queue=2, retry_after_seconds=1)
+
+    def _predict(history):
+        return batcher.predict(engine, history, prediction_length=1, quantiles=[0.5], context_length=8, freq="D")
+
+    started = time.perf_counter()
+    try:
+        futures = [executor.submit(_predict, _history(item_id, [1.0, float(i)])) for i, item_id in enumerate("abc")]
+        results = [f.result(timeout=10) for f in futures]
+    finally:
+        executor.shutdown()
+
+    assert time.perf_counter() - started < 2
+    assert len(engine.calls) == 1
+    assert [r["mean"].tolist() for r in results] == [[0.0], [1.0], [2.0]]
+
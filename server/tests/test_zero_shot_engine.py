@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+if str(SERVER_DIR) not in sys.path:
+    sys.path.insert(0, str(SERVER_DIR))
+
+
+from app.services import zero_shot_engine  # noqa: E402
+from app.services.zero_shot_engine import ZeroShotEngine  # noqa: E402
+
+
+class _FakePipeline:
+    def __init__(self):
+        self.calls = []
+
+    @classmethod
+    def from_pretrained(cls, path, device_map=None):
+        return cls()
+
+    def predict_df(self, df, future_df=None, *, prediction_length, quantile_levels, **kwargs):
+        self.calls.append({"df": df, "future_df": future_df})
+        rows = []
+        for item_id, g in df.groupby("item_id", sort=False):
+            last = g["timestamp"].max()
+            for step in range(1, prediction_length + 1):
+                row = {
+                    "item_id": item_id,
+                    "timestamp": last + pd.Timedelta(days=step),
+                    "target_name": "target",
+                    "predictions": float(g["target"].iloc[-1]),
+                }
+                row.update({str(q): float(q) for q in quantile_levels})
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def _inputs():
+    cat = pd.CategoricalDtype(categories=[0, 1, 2])
+    history = pd.DataFrame(
+        {
+            "item_id": ["a"] * 4 + ["b"] * 2,
+            "timestamp": list(pd.date_range("2024-01-01", periods=4, freq="D"))
+            + list(pd.date_range("2024-01-03", periods=2, freq="D")),
+            "target": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+            "promo": pd.Series([0, 1, 2, 1, 0, 2]).astype(cat),
+        }
+    )
+    future = pd.DataFrame(
+        {
+            "item_id": ["a", "b"],
+            "timestamp": pd.to_datetime(["2024-01-05", "2024-01-05"]),
+            "promo": pd.Series([2, 1]).astype(cat),
+        }
+    )
+    return history, future
+
+
+def test_engine_passes_categoricals_and_normalizes_output(monkeypatch):
+    monkeypatch.setattr(zero_shot_engine, "_lazy_import_chronos2", lambda: _FakePipeline)
+    engine = ZeroShotEngine("fake-path", "cpu")
+    history, future = _inputs()
+
+    pred = engine.predict(history, prediction_length=1, quantiles=[0.1, 0.9], context_length=3, future_cov_df=future)
+
+    call = engine.load().calls[0]
+    for frame in (call["df"], call["future_df"]):
+        assert isinstance(frame["promo"].dtype, pd.CategoricalDtype)
+        assert list(frame["promo"].cat.categories) == ["0", "1", "2"]
+    # 上下文按序列各自截取最后 context_length 个点，短序列保持完整
+    assert call["df"].groupby("item_id").size().to_dict() == {"a": 3, "b": 2}
+
+    assert list(pred.columns) == ["item_id", "timestamp", "mean", "0.1", "0.9"]
+    assert pred.set_index("item_id")["mean"].to_dict() == {"a": 4.0, "b": 6.0}